@@ -0,0 +1,11 @@
+#  __init__.py
+
+# The modules import each other by their plain names (they are also run as
+# scripts from this directory), so make that work for the installed entry points.
+# Appended, so these module names never shadow installed packages.
+import os
+import sys
+
+_package_dir = os.path.dirname(os.path.abspath(__file__))
+if _package_dir not in sys.path:
+    sys.path.append(_package_dir)
@@ -0,0 +1,152 @@
+#  adaptive_concurrency.py
+
+"""
+AIMD (additive increase, multiplicative decrease) limit on concurrent downloads.
+
+The download engine starts no more transfers than AimdLimiter.limit and feeds
+it what it observes: bytes received, the time to first byte of each response
+and transfer errors. Every window (a few seconds) the limiter looks at the
+aggregate throughput and the median time to first byte:
+
+- an error from the server or the connection (429, 5xx, timeouts, dropped
+  transfers) halves the limit at once, at most once per window,
+- a median time to first byte well above the best seen so far means requests
+  queue at the server: the limit shrinks by a quarter,
+- a window after an increase that did not raise the throughput means the link
+  (or the bandwidth cap) is full: the increase is undone and the limit held
+  for a while before probing again,
+- otherwise the limit grows by one.
+
+So the number of transfers follows what the server and the link can take:
+it rises on a fast idle connection and settles just below the point where
+more transfers stop helping.
+"""
+
+import statistics
+import threading
+import time
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import metrics
+
+DEFAULT_WINDOW = 2.0            # seconds per evaluation
+ERROR_DECREASE = 0.5            # limit factor after an error
+LATENCY_DECREASE = 0.75         # limit factor when responses slow down
+LATENCY_TOLERANCE = 2.0         # median time to first byte allowed, as a multiple of the best window
+LATENCY_SLACK = 0.05            # seconds; smaller rises are noise
+MIN_GAIN = 0.05                 # an increase must add 5% throughput to be kept
+HOLD_WINDOWS = 5                # windows to hold the limit after a plateau
+BASELINE_DRIFT = 1.02           # the best latency creeps up per window, so one lucky window is forgotten
+
+
+class AimdLimiter:
+    """Safe to share between the download workers."""
+
+    def __init__(self, initial, minimum=1, maximum=16, window=DEFAULT_WINDOW, on_change=None):
+        """on_change(limit, reason) is called from a worker thread whenever the limit changes."""
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = self.clamp(initial)
+        self.window = window
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        now = time.monotonic()
+        self.window_started = now
+        self.window_bytes = 0
+        self.window_latencies = []
+        self.window_errors = 0
+        self.last_decrease = 0.0
+        self.best_latency = None
+        self.previous_throughput = None
+        self.probing = False        # the last change was an increase, not judged yet
+        self.hold = 0
+        self.throughput = 0.0       # bytes/s of the last complete window
+
+    def clamp(self, limit):
+        return max(self.minimum, min(int(limit), self.maximum))
+
+    # Called from the download workers
+    def record_bytes(self, amount):
+        with self.lock:
+            self.window_bytes += amount
+            change = self._evaluate()
+        self._notify(change)
+
+    def record_latency(self, seconds):
+        """Time from sending a request to receiving the response headers."""
+        with self.lock:
+            self.window_latencies.append(seconds)
+            change = self._evaluate()
+        self._notify(change)
+
+    def record_error(self):
+        """A transfer failed in a way that suggests overload (throttled, server error, timeout, dropped)."""
+        with self.lock:
+            self.window_errors += 1
+            now = time.monotonic()
+            change = None
+            if now - self.last_decrease >= self.window:
+                change = self._set_limit(self.limit * ERROR_DECREASE, "error", now)
+        self._notify(change)
+
+    # Called with the lock held
+    def _evaluate(self):
+        now = time.monotonic()
+        elapsed = now - self.window_started
+        if elapsed < self.window:
+            return None
+        throughput = self.window_bytes / elapsed
+        latency = statistics.median(self.window_latencies) if self.window_latencies else None
+        errors = self.window_errors
+        self.window_started = now
+        self.window_bytes = 0
+        self.window_latencies = []
+        self.window_errors = 0
+        if not throughput and latency is None:
+            # Nothing transferred (e.g. only verified or linked files): no evidence either way
+            return None
+
+        self.throughput = throughput
+        previous, self.previous_throughput = self.previous_throughput, throughput
+        probing, self.probing = self.probing, False
+        if latency is not None:
+            self.best_latency = latency if self.best_latency is None else min(latency,
+                                                                              self.best_latency * BASELINE_DRIFT)
+        if errors:
+            # Decreased when the error was reported
+            return None
+        if (latency is not None and latency > self.best_latency * LATENCY_TOLERANCE
+                and latency - self.best_latency > LATENCY_SLACK):
+            return self._set_limit(self.limit * LATENCY_DECREASE, "latency", now)
+        if probing and previous is not None and throughput < previous * (1 + MIN_GAIN):
+            self.hold = HOLD_WINDOWS
+            return self._set_limit(self.limit - 1, "plateau", now)
+        if self.hold:
+            self.hold -= 1
+            return None
+        change = self._set_limit(self.limit + 1, "increase", now)
+        self.probing = change is not None
+        return change
+
+    def _set_limit(self, limit, reason, now):
+        limit = self.clamp(limit)
+        if limit == self.limit:
+            return None
+        if limit < self.limit:
+            self.last_decrease = now
+            metrics.increment("download_concurrency_decreases_total")
+        else:
+            metrics.increment("download_concurrency_increases_total")
+        self.limit = limit
+        return limit, reason
+
+    def _notify(self, change):
+        if change is None:
+            return
+        limit, reason = change
+        logger.debug(f"Download concurrency {limit} ({reason})")
+        if self.on_change:
+            self.on_change(limit, reason)
@@ -0,0 +1,481 @@
+#  cli.py
+
+"""
+Headless command line interface for scheduled syncs on servers.
+
+Uses the same INI settings and library as the GUI but never imports Qt.
+Progress and results are written to stdout as JSON lines (one object per
+event, each with an "event" key); log messages go to stderr.
+
+    python cli.py sync                      # fetch new orders for all years, download them
+    python cli.py fetch --years 2020-2024 [--full]
+    python cli.py download --all --workers 8
+    python cli.py download --all --bandwidth-limit 2000   # KB/s for all downloads together
+    python cli.py download --resume                 # continue the download queue and clear its pause
+    python cli.py download 2025-01234 2025-01235
+    python cli.py search "climate change" --limit 20
+    python cli.py search tariffs --president "Donald Trump" --years 2017-2020
+    python cli.py libraries                         # list the named libraries
+    python cli.py export orders.parquet --archive pdfs.tar --text
+    python cli.py export changes.jsonl.gz --since-last  # only what changed since the last export
+    python cli.py --library "Team A" download --all
+"""
+
+import argparse
+import datetime
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+from WrapConfig import INIHandler, RuntimeConfig
+from WrapCapExecOrders import ExecutiveOrderManager
+
+from download_engine import (DownloadEngine, DownloadJob, DEFAULT_WORKERS, MAX_WORKERS, DEFAULT_FSYNC_INTERVAL_MB,
+                             DEFAULT_BANDWIDTH_LIMIT_KB, fsync_interval_from_mb, bandwidth_limit_from_kb)
+from file_integrity import cleanup_stale_parts
+from content_store import open_content_store
+from download_queue import DownloadQueue, PRIORITY_ALL, PRIORITY_SELECTION
+from federal_register import FederalRegisterClient
+from fetch_scheduler import FetchScheduler, DEFAULT_CONCURRENCY, MAX_CONCURRENCY, DEFAULT_RATE
+from http_cache import open_http_cache, DEFAULT_MAX_MB, DEFAULT_TTL_MINUTES
+from library_sync import LibrarySync, BEG_YEAR
+from library_store import open_library, LIBRARY_FILE_NAME
+from library_registry import LibraryRegistry
+from library_export import LibraryExporter, ExportError
+from facet_index import FacetIndex, FacetSelection, NO_SELECTION
+from search_index import SearchIndex, SEARCH_INDEX_FILE_NAME, index_file
+from pdf_text import text_extraction_available
+import library_records
+import metrics
+
+INI_SECTION = 'CRExecOrder'
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_CANCELLED = 130
+
+
+class CommandError(Exception):
+    pass
+
+
+def emit(event, **fields):
+    """Write one JSON progress/result line to stdout."""
+    print(json.dumps({"event": event, **fields}, default=str), flush=True)
+
+
+class Settings:
+    """The GUI's INI settings, optionally overridden from the command line."""
+
+    def __init__(self, args):
+        ini_handler = INIHandler(args.ini or RuntimeConfig().ini_file_name)
+        self.registry = LibraryRegistry(ini_handler, INI_SECTION)
+        if args.library and args.library not in self.registry.libraries:
+            raise CommandError(f"No library named {args.library}; see the libraries command")
+        self.eo_data_dir = args.dir or self.registry.directory(args.library)
+        if not self.eo_data_dir and args.command != "libraries":
+            raise CommandError("No executive order directory: set it in the GUI settings or pass --dir")
+        self.download_workers = self.read_int(ini_handler, 'download_workers', DEFAULT_WORKERS)
+        self.fsync_interval = fsync_interval_from_mb(
+            self.read_int(ini_handler, 'fsync_interval_mb', DEFAULT_FSYNC_INTERVAL_MB))
+        self.fetch_concurrency = self.read_int(ini_handler, 'fetch_concurrency', DEFAULT_CONCURRENCY)
+        self.fetch_rate = self.read_int(ini_handler, 'fetch_rate', DEFAULT_RATE)
+        self.adaptive_downloads = bool(self.read_int(ini_handler, 'adaptive_downloads', 1))
+        self.bandwidth_limit = bandwidth_limit_from_kb(
+            self.read_int(ini_handler, 'bandwidth_limit_kb', DEFAULT_BANDWIDTH_LIMIT_KB))
+        self.federal_register_url = ini_handler.read_value(INI_SECTION, 'federal_register_url') or None
+        self.http_cache_mb = 0 if args.no_cache else self.read_int(ini_handler, 'http_cache_mb', DEFAULT_MAX_MB)
+        self.http_cache_ttl_minutes = self.read_int(ini_handler, 'http_cache_ttl_minutes', DEFAULT_TTL_MINUTES)
+        self.shared_store_directory = ini_handler.read_value(INI_SECTION, 'shared_store_directory') or None
+
+    @staticmethod
+    def read_int(ini_handler, option, default):
+        try:
+            return int(ini_handler.read_value(INI_SECTION, option) or default)
+        except ValueError:
+            logger.warning(f"Invalid {option} setting, using default")
+            return default
+
+
+class Library:
+    """Manager and store for one run; closed when the command finishes."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.data_dir = Path(settings.eo_data_dir)
+        self.manager = ExecutiveOrderManager()
+        self.store = open_library(self.manager, self.data_dir / LIBRARY_FILE_NAME)
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.store.close()
+
+    def pdf_path(self, doc_id):
+        file_name = self.manager.get_file_name(doc_id)
+        return None if file_name == "Unknown" else self.data_dir / file_name
+
+
+def run_cancellable(fn, cancel):
+    """Run fn() on a worker thread so Ctrl-C can call cancel() and still wait for a clean stop."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, name="eo-cli")
+    thread.start()
+    interrupted = False
+    while thread.is_alive():
+        try:
+            thread.join(0.2)
+        except KeyboardInterrupt:
+            interrupted = True
+            cancel()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("result"), interrupted
+
+
+def parse_years(text):
+    """'2024' or '2020-2024' -> (start, end)."""
+    try:
+        start, _, end = text.partition("-")
+        start, end = int(start), int(end or start)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY or YYYY-YYYY, got {text!r}")
+    if start > end:
+        start, end = end, start
+    return max(start, BEG_YEAR), end
+
+
+def parse_date(text):
+    """'2024-01-20' -> the same ISO date string, validated."""
+    try:
+        return datetime.date.fromisoformat(text).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {text!r}")
+
+
+# Commands
+def fetch(library, start_year, end_year, full=False):
+    settings = library.settings
+    cache = open_http_cache(library.data_dir, settings.http_cache_mb)
+    client = FederalRegisterClient(settings.federal_register_url, cache=cache, ttl=settings.http_cache_ttl_minutes * 60)
+    library_sync = LibrarySync(library.manager, client, library.store,
+                               scheduler=FetchScheduler(concurrency=settings.fetch_concurrency, rate=settings.fetch_rate),
+                               lock=library.lock)
+    counters = ("api_requests_total", "api_cache_hits_total", "api_not_modified_total")
+    before = [metrics.METRICS.counter(name) for name in counters]
+    started = time.perf_counter()
+    emit("fetch_started", start_year=start_year, end_year=end_year, full=full)
+    try:
+        result, interrupted = run_cancellable(
+            lambda: library_sync.sync_years(
+                start_year, end_year, full=full,
+                on_progress=lambda year, page, total_pages: emit("fetch_page", year=year, page=page,
+                                                                 total_pages=total_pages)),
+            library_sync.scheduler.cancel)
+    finally:
+        if cache is not None:
+            cache.close()
+    elapsed = time.perf_counter() - started
+    if interrupted or result is None:
+        emit("fetch_cancelled", elapsed_s=round(elapsed, 3))
+        return EXIT_CANCELLED
+    requests_sent, cache_hits, not_modified = (metrics.METRICS.counter(name) - count
+                                               for name, count in zip(counters, before))
+    emit("fetch_finished", added=result.added, updated=result.updated, years_skipped=result.years_skipped,
+         years=end_year - start_year + 1, requests=requests_sent, cache_hits=cache_hits, not_modified=not_modified,
+         elapsed_s=round(elapsed, 3))
+    return EXIT_OK
+
+
+def download(library, doc_ids, workers, priority=PRIORITY_SELECTION, queued=False, resume=False):
+    """
+    Queue doc_ids and download them. queued: download everything queued
+    instead, best first, including what an earlier run or the GUI left.
+    The queue's pause (set in the GUI) does not stop this run and is only
+    cleared with resume.
+    """
+    jobs = []
+    for doc_id in doc_ids:
+        url = library_records.get_pdf_url(library.manager, doc_id)
+        path = library.pdf_path(doc_id)
+        if not url or path is None:
+            emit("file", doc_id=doc_id, ok=False, error="no PDF url or file name")
+            continue
+        size, sha256 = library_records.get_file_info(library.manager, doc_id)
+        jobs.append(DownloadJob(doc_id=doc_id, url=url, path=path, size=size, sha256=sha256))
+    queue = DownloadQueue(library.store)
+    queue.add(jobs, priority)
+    queue.set_paused(False, persist=resume)
+    run_doc_ids = None if queued else {job.doc_id for job in jobs}
+
+    cleanup_stale_parts(library.data_dir)
+    content_store = open_content_store(library.settings.shared_store_directory)
+    if content_store is not None:
+        content_store.collect_garbage()
+    settings = library.settings
+    engine = DownloadEngine(workers=workers, fsync_interval=settings.fsync_interval, content_store=content_store,
+                            adaptive=settings.adaptive_downloads, bandwidth_limit=settings.bandwidth_limit,
+                            on_concurrency_change=lambda limit, reason: emit("concurrency", workers=limit,
+                                                                             reason=reason))
+    transferred = {"bytes": 0, "linked": 0}
+    started = time.perf_counter()
+    emit("download_started", files=queue.count() if queued else len(run_doc_ids), workers=engine.workers, adaptive=settings.adaptive_downloads,
+         bandwidth_limit=settings.bandwidth_limit)
+
+    def on_finished(doc_id, ok, error, info):
+        if ok:
+            with library.lock:
+                details = library_records.record_file_info(library.manager, doc_id, info)
+                if details is not None:
+                    library.store.save(documents={doc_id: details}, fields=library_records.FILE_STATE_FIELDS)
+                queue.remove(doc_id)
+                if not info.skipped:
+                    transferred["bytes"] += info.size
+                transferred["linked"] += info.linked
+            emit("file", doc_id=doc_id, ok=True, skipped=info.skipped, resumed=info.resumed, linked=info.linked,
+                 bytes=info.size)
+        else:
+            with library.lock:
+                queue.record_failure(doc_id, error)
+            emit("file", doc_id=doc_id, ok=False, error=error)
+
+    try:
+        summary, interrupted = run_cancellable(lambda: engine.run(queue.jobs(run_doc_ids), on_finished=on_finished),
+                                               engine.cancel)
+    finally:
+        queue.release()
+        if content_store is not None:
+            content_store.close()
+    elapsed = time.perf_counter() - started
+    emit("download_finished",
+         succeeded=len(summary.succeeded), skipped=len(summary.skipped), linked=transferred["linked"],
+         failed=len(summary.failed),
+         queued=queue.count(), cancelled=summary.cancelled or interrupted, bytes=transferred["bytes"],
+         workers=engine.concurrency(), elapsed_s=round(elapsed, 3),
+         files_per_s=round(len(summary.succeeded) / elapsed, 2) if elapsed else None,
+         mb_per_s=round(transferred["bytes"] / elapsed / 1e6, 3) if elapsed else None)
+
+    update_search_index(library, summary.succeeded + summary.skipped)
+    if summary.cancelled or interrupted:
+        return EXIT_CANCELLED
+    return EXIT_FAILED if summary.failed else EXIT_OK
+
+
+def update_search_index(library, doc_ids):
+    if not text_extraction_available() or not doc_ids:
+        return
+    index = SearchIndex(library.data_dir / SEARCH_INDEX_FILE_NAME)
+    try:
+        indexed = 0
+        for doc_id in doc_ids:
+            path = library.pdf_path(doc_id)
+            details = library_records.get_document(library.manager, doc_id) or {}
+            if path is not None and index_file(index, doc_id, path, details.get("title", "")):
+                indexed += 1
+        emit("indexed", files=indexed)
+    finally:
+        index.close()
+
+
+def search(library, query, limit, update_index=True, selection=NO_SELECTION):
+    """
+    Title matches first, then PDF text matches by rank, as in the GUI's
+    filter, narrowed to the FacetSelection; also reports the facet counts.
+    """
+    documents = library.manager.get_downloaded_documents()
+    downloaded = library.manager.get_display_titles(documents)
+    if update_index:
+        update_search_index(library, list(downloaded))
+
+    needle = query.lower()
+    results = [(doc_id, None) for doc_id, title in sorted(downloaded.items(), key=lambda item: item[1], reverse=True)
+               if needle in title.lower()]
+    seen = {doc_id for doc_id, _ in results}
+    index_path = library.data_dir / SEARCH_INDEX_FILE_NAME
+    if query and index_path.exists():
+        index = SearchIndex(index_path)
+        try:
+            # With facets the best text matches may be filtered out; rank them all (-1: no limit)
+            index_limit = limit if selection.is_empty() else -1
+            results.extend((doc_id, score) for doc_id, score in index.search(query, index_limit)
+                           if doc_id in downloaded and doc_id not in seen)
+        finally:
+            index.close()
+
+    facets = FacetIndex()
+    facets.build(documents)
+    facet_result = facets.search(selection, {doc_id for doc_id, _ in results} if query else None)
+    if facet_result.accepted is not None:
+        results = [(doc_id, score) for doc_id, score in results if doc_id in facet_result.accepted]
+    emit("facets", presidents=facet_result.presidents, years=facet_result.years)
+
+    for rank, (doc_id, score) in enumerate(results[:limit], 1):
+        emit("result", rank=rank, doc_id=doc_id, title=downloaded[doc_id], score=score,
+             path=str(library.pdf_path(doc_id)))
+    emit("search_finished", query=query, results=min(len(results), limit))
+    return EXIT_OK
+
+
+def list_libraries(settings):
+    registry = settings.registry
+    for name in registry.names():
+        emit("library", name=name, directory=registry.directory(name), active=name == registry.active)
+    emit("libraries_finished", libraries=len(registry.names()))
+    return EXIT_OK
+
+
+def export(library, records_path, archive_path=None, since_last=False, include_text=False):
+    exporter = LibraryExporter(library.store, library.data_dir)
+    emit("export_started", path=str(records_path), archive=archive_path and str(archive_path), since_last=since_last)
+    try:
+        result, interrupted = run_cancellable(
+            lambda: exporter.export(records_path, archive_path, since_last=since_last, include_text=include_text),
+            exporter.cancel)
+    except ExportError as e:
+        raise CommandError(str(e))
+    if interrupted or result.cancelled:
+        emit("export_cancelled", records=result.records, elapsed_s=round(result.elapsed, 3))
+        return EXIT_CANCELLED
+    emit("export_finished", records=result.records, files=result.files, missing=result.missing, bytes=result.bytes,
+         revision=result.revision, since_revision=result.since_revision, elapsed_s=round(result.elapsed, 3))
+    return EXIT_OK
+
+
+def not_downloaded_newest_first(library):
+    return library_records.newest_first(library.manager, library.manager.get_not_downloaded_documents())
+
+
+# Entry point
+def add_download_options(parser):
+    parser.add_argument("--bandwidth-limit", type=int, metavar="KB",
+                        help="combined download rate in KB/s (0: unlimited; default: from the settings)")
+    parser.add_argument("--fixed-workers", action="store_true",
+                        help="keep the number of concurrent downloads fixed instead of adapting it")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="crlibrary-cli", description="Headless executive order library sync.")
+    parser.add_argument("--ini", help="INI file (default: the GUI's)")
+    parser.add_argument("--dir", help="executive order directory (default: from the INI file)")
+    parser.add_argument("--library", help="named library to use (default: the one active in the GUI)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress details to stderr")
+    parser.add_argument("--metrics", help="export counters and timings when done (.prom or .jsonl)")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the cache of Federal Register pages")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync_parser = commands.add_parser("sync", help="fetch new orders for all years and download them")
+    sync_parser.add_argument("--workers", type=int, help=f"concurrent downloads (1-{MAX_WORKERS})")
+    add_download_options(sync_parser)
+
+    fetch_parser = commands.add_parser("fetch", help="fetch the list of orders")
+    fetch_parser.add_argument("--years", type=parse_years, help="YYYY or YYYY-YYYY (default: current year)")
+    fetch_parser.add_argument("--full", action="store_true", help="refetch the years in full instead of only new orders")
+    fetch_parser.add_argument("--concurrency", type=int, help=f"concurrent list requests (1-{MAX_CONCURRENCY})")
+    fetch_parser.add_argument("--rate", type=float, help="list requests per second")
+
+    download_parser = commands.add_parser("download", help="download PDFs")
+    download_parser.add_argument("doc_ids", nargs="*", help="document numbers to download")
+    download_parser.add_argument("--all", action="store_true", help="download every order not downloaded yet")
+    download_parser.add_argument("--resume", action="store_true",
+                                 help="only continue the download queue left by an earlier run or the GUI, "
+                                      "and clear its pause")
+    download_parser.add_argument("--workers", type=int, help=f"concurrent downloads (1-{MAX_WORKERS})")
+    add_download_options(download_parser)
+
+    search_parser = commands.add_parser("search", help="search downloaded orders by title and PDF text")
+    search_parser.add_argument("query", nargs="?", default="", help="words in the title or text (default: all)")
+    search_parser.add_argument("--president", help="only orders of this president, e.g. 'Joe Biden'")
+    search_parser.add_argument("--years", type=parse_years, help="only orders signed in YYYY or YYYY-YYYY")
+    search_parser.add_argument("--signed-from", type=parse_date, help="only orders signed on or after YYYY-MM-DD")
+    search_parser.add_argument("--signed-to", type=parse_date, help="only orders signed on or before YYYY-MM-DD")
+    search_parser.add_argument("--limit", type=int, default=50)
+    search_parser.add_argument("--no-index", action="store_true", help="do not index new PDFs before searching")
+
+    commands.add_parser("libraries", help="list the named libraries")
+
+    export_parser = commands.add_parser("export", help="export the library's records and PDFs")
+    export_parser.add_argument("path", help="records file: .parquet (needs pyarrow), .jsonl or .jsonl.gz")
+    export_parser.add_argument("--archive", help="also pack the downloaded PDFs into this .tar, .tar.gz or .zip")
+    export_parser.add_argument("--since-last", action="store_true",
+                               help="only orders added or changed since the last export")
+    export_parser.add_argument("--text", action="store_true",
+                               help="include the PDF text from the search index or preview cache")
+    return parser
+
+
+def run(args):
+    settings = Settings(args)
+    if args.command == "libraries":
+        return list_libraries(settings)
+    if getattr(args, "concurrency", None):
+        settings.fetch_concurrency = args.concurrency
+    if getattr(args, "rate", None):
+        settings.fetch_rate = args.rate
+    if getattr(args, "bandwidth_limit", None) is not None:
+        settings.bandwidth_limit = bandwidth_limit_from_kb(args.bandwidth_limit)
+    if getattr(args, "fixed_workers", False):
+        settings.adaptive_downloads = False
+    workers = getattr(args, "workers", None) or settings.download_workers
+    current_year = datetime.date.today().year
+
+    library = Library(settings)
+    try:
+        if args.command == "sync":
+            status = fetch(library, BEG_YEAR, current_year)
+            if status != EXIT_OK:
+                return status
+            return download(library, not_downloaded_newest_first(library), workers, PRIORITY_ALL, queued=True)
+        if args.command == "fetch":
+            start_year, end_year = args.years or (current_year, current_year)
+            return fetch(library, start_year, end_year, full=args.full)
+        if args.command == "download":
+            if args.all + bool(args.doc_ids) + args.resume != 1:
+                raise CommandError("give one of --all, --resume or one or more document numbers")
+            if args.all:
+                return download(library, not_downloaded_newest_first(library), workers, PRIORITY_ALL, queued=True)
+            if args.resume:
+                return download(library, [], workers, queued=True, resume=True)
+            return download(library, args.doc_ids, workers)
+        if args.command == "search":
+            first_year, last_year = args.years or (None, None)
+            selection = FacetSelection(president=args.president, first_year=first_year, last_year=last_year,
+                                       signed_from=args.signed_from, signed_to=args.signed_to)
+            return search(library, args.query, args.limit, update_index=not args.no_index, selection=selection)
+        if args.command == "export":
+            return export(library, args.path, args.archive, since_last=args.since_last, include_text=args.text)
+    finally:
+        library.close()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr,
+                        format='%(name)s - %(levelname)s - %(message)s')
+    try:
+        return run(args)
+    except CommandError as e:
+        emit("error", message=str(e))
+        return EXIT_USAGE
+    except Exception as e:
+        logger.exception("Command failed")
+        emit("error", message=str(e))
+        return EXIT_FAILED
+    finally:
+        if args.metrics:
+            metrics.METRICS.export(args.metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
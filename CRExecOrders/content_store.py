@@ -0,0 +1,230 @@
+#  content_store.py
+
+"""
+Content-addressed PDF store shared by all libraries.
+
+Every verified PDF is kept once under its SHA-256 (<root>/ab/abcdef....pdf)
+and an index maps document numbers to hashes. A library that needs an order
+another library already has gets a link to the stored file instead of a
+download: a hardlink where the store and the library share a file system,
+otherwise a reflink (copy-on-write clone, e.g. Btrfs or XFS) or, as a last
+resort, a plain copy. Hardlinks and reflinks cost no extra disk space.
+
+Stored files are shared between libraries and must be treated as read-only.
+A hardlinked library file edited in place changes the stored copy too, so a
+stored file is hashed again before it is linked into another library; one
+that no longer matches its SHA-256 is dropped and the order downloaded.
+collect_garbage() removes stored files no document refers to any more (e.g.
+the previous version of a replaced order) at most once every GC_INTERVAL.
+"""
+
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+from file_integrity import FileInfo, sha256_file
+
+INDEX_FILE_NAME = "content_index.sqlite3"
+FICLONE = 0x40049409    # Linux ioctl: clone a file's extents into another file
+BLOB_SUFFIX = ".pdf"
+TEMP_SUFFIX = ".tmp"
+GC_MARKER = "last_gc"
+GC_INTERVAL = 24 * 3600     # seconds between garbage collections
+TEMP_GRACE = 3600           # a temporary file younger than this may still be in use
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id      TEXT PRIMARY KEY,
+    sha256      TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    added_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_sha256 ON documents (sha256);
+"""
+
+
+def reflink(source, target):
+    """Clone source into a new file target; raises OSError where the file system cannot."""
+    import fcntl
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.unlink(target)
+            raise
+
+
+def link_or_copy(source, target):
+    """Make target the same content as source as cheaply as possible; returns how ("hardlink", "reflink", "copy")."""
+    try:
+        os.link(source, target)
+        return "hardlink"
+    except OSError:
+        pass
+    try:
+        reflink(source, target)
+        return "reflink"
+    except (OSError, ImportError):
+        pass
+    shutil.copyfile(source, target)
+    return "copy"
+
+
+class ContentStore:
+    """Safe to share between threads (download workers add to it concurrently)."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.root / INDEX_FILE_NAME, check_same_thread=False,
+                                          isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def blob_path(self, sha256):
+        return self.root / sha256[:2] / f"{sha256}{BLOB_SUFFIX}"
+
+    def lookup(self, doc_id):
+        """(sha256, size) stored for doc_id, or None."""
+        with self.lock:
+            return self.connection.execute("SELECT sha256, size FROM documents WHERE doc_id=?",
+                                           (doc_id,)).fetchone()
+
+    def add(self, doc_id, path, info):
+        """Take a verified file into the store (linked, so usually free) and record it for doc_id."""
+        # Recorded before the file is placed, so a garbage collection never takes it for unreferenced
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO documents (doc_id, sha256, size, added_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(doc_id) DO UPDATE SET sha256=excluded.sha256, size=excluded.size, "
+                "added_at=excluded.added_at",
+                (doc_id, info.sha256, info.size, time.time()))
+        blob = self.blob_path(info.sha256)
+        if not blob.exists():
+            blob.parent.mkdir(exist_ok=True)
+            temp = blob.with_name(f"{blob.name}.{threading.get_ident()}{TEMP_SUFFIX}")
+            try:
+                link_or_copy(path, temp)
+                os.replace(temp, blob)
+            except OSError as e:
+                temp.unlink(missing_ok=True)
+                logger.warning(f"Could not add {path} to the shared PDF store: {e}")
+                with self.lock:
+                    self.connection.execute("DELETE FROM documents WHERE doc_id=? AND sha256=?",
+                                            (doc_id, info.sha256))
+                return False
+        return True
+
+    def materialize(self, job):
+        """
+        Place the stored copy of job's document at job.path. Returns a FileInfo
+        (linked=True), or None when the store has no usable copy. A recorded
+        hash that differs from the stored one (a newer version) is not used,
+        and the stored file is only linked once it still has its hash.
+        """
+        entry = self.lookup(job.doc_id)
+        if entry is None:
+            return None
+        sha256, size = entry
+        if job.sha256 and job.sha256 != sha256:
+            return None
+        blob = self.blob_path(sha256)
+        try:
+            intact = blob.stat().st_size == size and sha256_file(blob).hexdigest() == sha256
+        except OSError:
+            intact = False
+        if not intact:
+            logger.warning(f"Shared copy of {job.doc_id} is missing or was changed, dropping it")
+            self.discard(sha256)
+            return None
+
+        job.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = job.path.with_name(f"{job.path.name}.link")
+        temp.unlink(missing_ok=True)
+        try:
+            method = link_or_copy(blob, temp)
+            os.replace(temp, job.path)
+        except OSError as e:
+            temp.unlink(missing_ok=True)
+            logger.warning(f"Could not take {job.doc_id} from the shared PDF store, downloading it: {e}")
+            return None
+        logger.debug(f"{job.doc_id} taken from the shared PDF store ({method})")
+        return FileInfo(size=size, sha256=sha256, skipped=True, linked=True)
+
+    def discard(self, sha256):
+        """Drop a stored file and every document recorded with it."""
+        with self.lock:
+            self.connection.execute("DELETE FROM documents WHERE sha256=?", (sha256,))
+        self.blob_path(sha256).unlink(missing_ok=True)
+
+    def collect_garbage(self, force=False):
+        """
+        Remove stored files no document refers to and abandoned temporary
+        files. Skipped (returns None) within GC_INTERVAL of the last run by
+        any process, unless force; otherwise returns the number of files removed.
+        """
+        marker = self.root / GC_MARKER
+        try:
+            if not force and time.time() - marker.stat().st_mtime < GC_INTERVAL:
+                return None
+        except FileNotFoundError:
+            pass
+        marker.touch()
+        blobs, temps = {}, []
+        for directory in self.root.iterdir():
+            if not directory.is_dir():
+                continue
+            for path in directory.iterdir():
+                if path.name.endswith(BLOB_SUFFIX):
+                    blobs[path.name[:-len(BLOB_SUFFIX)]] = path
+                elif path.name.endswith(TEMP_SUFFIX):
+                    temps.append(path)
+        # Listed first: add() records a file before placing it, so whatever is unreferenced now stays so
+        with self.lock:
+            referenced = {row[0] for row in self.connection.execute("SELECT DISTINCT sha256 FROM documents")}
+        removed = 0
+        for sha256, path in blobs.items():
+            if sha256 not in referenced:
+                path.unlink(missing_ok=True)
+                removed += 1
+        for path in temps:
+            try:
+                if time.time() - path.stat().st_mtime > TEMP_GRACE:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        if removed:
+            logger.info(f"Removed {removed} unused files from the shared PDF store")
+        return removed
+
+    def stats(self):
+        with self.lock:
+            documents, blobs, total = self.connection.execute(
+                "SELECT (SELECT COUNT(*) FROM documents), COUNT(*), COALESCE(SUM(size), 0) "
+                "FROM (SELECT DISTINCT sha256, size FROM documents)").fetchone()
+        return {"documents": documents, "files": blobs, "bytes": total}
+
+
+def open_content_store(root):
+    """The store at root, or None when root is empty (sharing disabled) or the store cannot be opened."""
+    if not root:
+        return None
+    try:
+        return ContentStore(root)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Shared PDF store disabled: {e}")
+        return None
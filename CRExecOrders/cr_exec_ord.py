@@ -1,11 +1,15 @@
 import subprocess
 import sys
+import threading
+import time
+
+PROCESS_START = time.perf_counter()
 
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel,
                                QStatusBar, QMessageBox, QComboBox, QPushButton,QHBoxLayout, QSpinBox,
-                               QTabWidget)
+                               QTabWidget, QCheckBox, QProgressBar, QInputDialog, QFileDialog, QDateEdit)
 from PySide6.QtGui import QIcon
-from PySide6.QtCore import Qt, QDate
+from PySide6.QtCore import Qt, QDate, QTimer, QFileSystemWatcher
 from pathlib import Path
 
 import logging
@@ -23,25 +27,58 @@ logger = logging.getLogger(__name__)
 
 from WrapSideSix.layouts.grid_layout import WSGridLayoutHandler, WSGridRecord, WSGridPosition
 from WrapSideSix.toolbars.toolbar_icon import WSToolbarIcon, DropdownItem
-from WrapSideSix.widgets.list_widget import WSListSelectionWidget, WSSortOrder
 from WrapSideSix import WSLineButtonClear
 from WrapConfig import INIHandler, RuntimeConfig
-from WrapCapExecOrders import (ExecutiveOrderManager, ExecutiveOrderDownloader)
+from WrapCapExecOrders import ExecutiveOrderManager
 
 from dialog_about import AboutDialog
 from dialog_settings import SettingsDialog
+from dialog_performance import PerformanceDialog
+from dialog_export import ExportDialog
+from download_queue import DownloadQueue, PRIORITY_ALL, PRIORITY_SELECTION
+from download_engine import (DownloadEngine, DownloadJob, DEFAULT_WORKERS, DEFAULT_FSYNC_INTERVAL_MB,
+                             DEFAULT_BANDWIDTH_LIMIT_KB, fsync_interval_from_mb, bandwidth_limit_from_kb)
+from file_integrity import cleanup_stale_parts, looks_like_complete_pdf
+from content_store import open_content_store
+from directory_reconciler import DirectoryReconciler
+from federal_register import FederalRegisterClient
+from fetch_scheduler import FetchScheduler, DEFAULT_CONCURRENCY, DEFAULT_RATE
+from http_cache import open_http_cache, DEFAULT_MAX_MB, DEFAULT_TTL_MINUTES
+from library_sync import LibrarySync, BEG_YEAR
+from library_store import open_library, LIBRARY_FILE_NAME
+from library_index import LibraryIndex
+from facet_index import FacetSelection
+from library_registry import LibraryRegistry, LibraryRegistryError
+from library_export import LibraryExporter, last_export
+from search_index import SearchIndex, SEARCH_INDEX_FILE_NAME
+from listing_model import DocumentListView
+from pdf_preview import PreviewPipeline, PREVIEW_CACHE_FILE_NAME, DEFAULT_PREVIEW_WORKERS
+from preview_panel import PreviewPanel
+from title_filter import IncrementalFilter
+from task_manager import Task, TaskManager
+from startup_timing import StartupTimer, STARTUP_REPORT_FILE_NAME
+from metrics import RateMeter, timed
+import library_records
+import metrics
 
 import WrapSideSix.icons.icons_mat_des
+# Registered once for the whole program, dialogs included
 WrapSideSix.icons.icons_mat_des.qInitResources()
 
 PROGRAM_TITLE = "ChatRecall Executive Order Downloader"
 INITIAL_STATUS_BAR_MESSAGE = "Welcome to ChatRecall Executive Orders"
-BEG_YEAR = 1994
-LIBRARY_FILE_NAME = "Executive_Order_library"
+FILTER_DEBOUNCE_MS = 150
+THROUGHPUT_INTERVAL_MS = 1000
+METRICS_EXPORT_INTERVAL_MS = 15000
+RECONCILE_DEBOUNCE_MS = 1000
+LISTING_REPOPULATE_THRESHOLD = 500
+CHANGE_POLL_MS = 2000
 
 class CRExecOrder(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.startup_timer = StartupTimer(PROCESS_START)
+        self.startup_timer.mark("imports")
         self.setWindowTitle(PROGRAM_TITLE)
         self.setMinimumWidth(800)
 
@@ -74,16 +111,35 @@ class CRExecOrder(QMainWindow):
         self.download_year_end_combobox.setRange(BEG_YEAR, current_year)
         self.download_year_begin_combobox.setValue(current_year)
         self.download_year_end_combobox.setValue(current_year)
+        self.incremental_sync_checkbox = QCheckBox("Only new")
+        self.incremental_sync_checkbox.setChecked(True)
+        self.incremental_sync_checkbox.setToolTip("Fetch only orders published since the last fetch of each year")
 
         self.keyword_search = WSLineButtonClear() #QLineEdit()
         self.president_search = QComboBox()
+        self.president_search.setMinimumContentsLength(24)
+        self.year_from_search = QComboBox()
+        self.year_to_search = QComboBox()
+        self.signed_search_check = QCheckBox("Signed from")
+        self.signed_from_search = QDateEdit()
+        self.signed_to_search = QDateEdit()
+        for date_edit in (self.signed_from_search, self.signed_to_search):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("yyyy-MM-dd")
+            date_edit.setEnabled(False)
+        self.facet_count_label = QLabel()
+        # Keyword matches (None: no keyword) and full-text ranking, combined with the facets in apply_filters
+        self.keyword_matches = None
+        self.keyword_ranking = None
 
         not_downloaded_actions = {
             "Download Selection": lambda item_id, item_name: self.not_downloaded_on_item_right_clicked(item_id, item_name),
         }
 
-        self.not_downloaded_list = WSListSelectionWidget(multi_select=True, actions=not_downloaded_actions)
-        self.downloaded_list = WSListSelectionWidget(multi_select=False)
+        self.not_downloaded_list = DocumentListView(multi_select=True, actions=not_downloaded_actions)
+        self.downloaded_list = DocumentListView(multi_select=False)
+        self.preview_panel = PreviewPanel()
+        self.title_filter = IncrementalFilter()
 
         self.download_library_button = QPushButton("Fetch List")
         icon_select = QIcon(":/icons/mat_des/download_24dp.png")  # Path to your icon file
@@ -101,16 +157,99 @@ class CRExecOrder(QMainWindow):
         icon_none = QIcon(":/icons/mat_des/clear_all_24dp.png")
         self.select_none_button.setIcon(icon_none)
 
-        # Dialogs
-        self.dialog_about = AboutDialog(self)
-        self.dialog_settings = SettingsDialog(self)
+        # Pauses or resumes the download queue
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.setEnabled(False)
+
+        # Library switcher, shown next to the tabs
+        self.library_combobox = QComboBox()
+        self.library_combobox.setMinimumContentsLength(12)
+        self.add_library_button = QPushButton("Add Library")
+        self.remove_library_button = QPushButton("Remove")
+        self.remove_library_button.setToolTip("Remove the library from the list; its files are kept")
+
+        # Dialogs are created the first time they are shown
+        self.dialog_about = None
+        self.dialog_settings = None
+        self.dialog_performance = None
 
+        # One INI handler, shared with the settings dialog
         self.run_time = RuntimeConfig()
+        self.ini_handler = INIHandler(self.run_time.ini_file_name)
+        self.library_registry = LibraryRegistry(self.ini_handler)
+        # name: (manager, store, library index, directory reconciler, download queue, manager lock) of every
+        # library opened so far, for switching without a reload
+        self.loaded_libraries = {}
         self.library_path = None
+        self.library_store = None
+        self.library_index = None
+        self.download_queue = None
+        # Held by the library lane and the download thread while they change the manager's records
+        self.manager_lock = None
+        self.search_index = None
+        self.preview_pipeline = None
         self.eo_data_dir = None
-        self.ini_handler = None
+        self.download_workers = DEFAULT_WORKERS
+        self.fsync_interval = fsync_interval_from_mb()
+        self.fetch_concurrency = DEFAULT_CONCURRENCY
+        self.fetch_rate = DEFAULT_RATE
+        self.preview_workers = DEFAULT_PREVIEW_WORKERS
+        self.http_cache_mb = DEFAULT_MAX_MB
+        self.http_cache_ttl_minutes = DEFAULT_TTL_MINUTES
+        self.http_cache = None
+        self.shared_store_directory = None
+        self.content_store = None
+        self.federal_register_url = None
+        self.metrics_export_path = None
         self.update_default_attributes()
 
+        # Background tasks
+        self.task_manager = TaskManager(self)
+        self.task_label = QLabel()
+        self.task_progress_bar = QProgressBar()
+        self.task_progress_bar.setMaximumWidth(200)
+        self.task_cancel_button = QPushButton("Cancel")
+        self.download_task = None
+        self.download_engine = None
+        self.closing = False
+        self.download_total = 0
+        self.download_done = 0
+        self.download_failed = 0
+        self.download_linked = 0
+        self.download_started = 0.0
+        self.download_bytes_start = 0
+        self.download_rate = RateMeter()
+
+        # Live download throughput and periodic metrics export
+        self.throughput_timer = QTimer(self)
+        self.throughput_timer.setInterval(THROUGHPUT_INTERVAL_MS)
+        self.throughput_timer.timeout.connect(self.update_download_status)
+        self.metrics_export_timer = QTimer(self)
+        self.metrics_export_timer.setInterval(METRICS_EXPORT_INTERVAL_MS)
+        self.metrics_export_timer.timeout.connect(self.export_metrics)
+        self.update_metrics_export()
+
+        # Picks up PDFs added or removed in the data dir by other programs
+        self.directory_watcher = QFileSystemWatcher(self)
+        self.reconciler = None
+        self.reconcile_pending = False
+        self.reconcile_timer = QTimer(self)
+        self.reconcile_timer.setSingleShot(True)
+        self.reconcile_timer.setInterval(RECONCILE_DEBOUNCE_MS)
+        self.reconcile_timer.timeout.connect(self.reconcile_directory)
+
+        # Picks up orders saved by other processes using the same library, e.g. a scheduled crlibrary-cli sync
+        self.change_feed_pending = False
+        self.change_timer = QTimer(self)
+        self.change_timer.setInterval(CHANGE_POLL_MS)
+        self.change_timer.timeout.connect(self.poll_library_changes)
+
+        # Search-as-you-type
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self.filter_timer.timeout.connect(self.apply_title_filter)
+
         self.init_ui()
         self.init_toolbar()
         self.init_status_bar()
@@ -124,11 +263,16 @@ class CRExecOrder(QMainWindow):
 
         self.library_path = Path(self.eo_data_dir) / LIBRARY_FILE_NAME
 
-        self.downloader = ExecutiveOrderDownloader(doc_dir=self.eo_data_dir, manager=self.manager)
-        self.manager.load_from_file(self.library_path)
-        self.populate_not_downloaded_listing()
-        self.populate_downloaded_listing()
+        # Created with the loaded manager in on_library_loaded
+        self.library_sync = None
+        self.load_library()
         self.toolbar.hide_action_by_name("filter")
+        self.startup_timer.mark("window_created")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Runs once the event loop has painted the window
+        QTimer.singleShot(0, lambda: self.startup_timer.mark("window_shown"))
 
     # init helper methods
     def init_ui(self):
@@ -149,7 +293,10 @@ class CRExecOrder(QMainWindow):
 
             WSGridRecord(widget=self.download_library_button,
                          position=WSGridPosition(row=1, column=2),
-                         row_span=2, alignment=Qt.AlignmentFlag.AlignLeft),
+                         alignment=Qt.AlignmentFlag.AlignLeft),
+            WSGridRecord(widget=self.incremental_sync_checkbox,
+                         position=WSGridPosition(row=2, column=2),
+                         alignment=Qt.AlignmentFlag.AlignLeft),
         ]
 
         self.download_years_handler.add_widget_records(download_years_widgets)
@@ -163,6 +310,9 @@ class CRExecOrder(QMainWindow):
                          col_stretch=0, alignment=Qt.AlignmentFlag.AlignLeft),
             WSGridRecord(widget=self.select_none_button,
                          position=WSGridPosition(row=0, column=2),
+                         col_stretch=0, alignment=Qt.AlignmentFlag.AlignLeft),
+            WSGridRecord(widget=self.pause_button,
+                         position=WSGridPosition(row=0, column=3),
                          col_stretch=0, alignment=Qt.AlignmentFlag.AlignLeft)
 
         ]
@@ -191,13 +341,15 @@ class CRExecOrder(QMainWindow):
             WSGridRecord(widget=self.keyword_search,
                          position=WSGridPosition(row=0, column=1)),
 
-            WSGridRecord(widget=QLabel(""),
+            WSGridRecord(widget=self.facet_bar(),
                          position=WSGridPosition(row=1, column=0),
                          col_span=2),
 
             WSGridRecord(widget=self.downloaded_list,
                              position=WSGridPosition(row=2, column=0),
                              col_span=2),
+            WSGridRecord(widget=self.preview_panel,
+                         position=WSGridPosition(row=2, column=2)),
 
         ]
         self.downloaded_grid_layout_handler.add_widget_records(downloaded_grid_widgets)
@@ -205,6 +357,16 @@ class CRExecOrder(QMainWindow):
         self.tab_widget.addTab(self.not_download_grid_layout_handler.as_widget(), "Not Downloaded")
         self.tab_widget.addTab(self.downloaded_grid_layout_handler.as_widget(), "Downloaded")
 
+        library_switcher = QWidget()
+        library_layout = QHBoxLayout(library_switcher)
+        library_layout.setContentsMargins(0, 0, 0, 0)
+        library_layout.addWidget(QLabel("Library:"))
+        library_layout.addWidget(self.library_combobox)
+        library_layout.addWidget(self.add_library_button)
+        library_layout.addWidget(self.remove_library_button)
+        self.tab_widget.setCornerWidget(library_switcher, Qt.Corner.TopRightCorner)
+        self.update_library_combobox()
+
         self.setCentralWidget(self.tab_widget)
 
     def init_menu(self):
@@ -228,8 +390,16 @@ class CRExecOrder(QMainWindow):
             self.show_settings,
             ":/icons/mat_des/settings_24dp.png")
 
+        self.toolbar.add_action_to_toolbar(
+            "export",
+            "Export",
+            "Export the library's records and PDFs",
+            self.show_export,
+            ":/icons/mat_des/upload_24dp.png")
+
         dropdown_with_icons = [
             DropdownItem("Help", self.show_not_implemented_dialog),
+            DropdownItem("Performance", self.show_performance),
             DropdownItem("About", self.show_about),
         ]
 
@@ -248,12 +418,44 @@ class CRExecOrder(QMainWindow):
 
     def init_status_bar(self):
         self.setStatusBar(self.status_bar)
+        self.status_bar.addPermanentWidget(self.task_label)
+        self.status_bar.addPermanentWidget(self.task_progress_bar)
+        self.status_bar.addPermanentWidget(self.task_cancel_button)
+        self.update_task_widgets()
         self.update_status_bar()
 
     def update_default_attributes(self):
-        self.ini_handler = INIHandler(self.run_time.ini_file_name)
-        # Re-initiated so self.ini_handler.reload() not needed
-        self.eo_data_dir = self.ini_handler.read_value('CRExecOrder', 'exec_ord_directory') or self.eo_data_dir
+        # The settings dialog saves through the same handler, so its values are current;
+        # its directory is the active library's
+        self.library_registry.load()
+        self.eo_data_dir = self.library_registry.directory() or self.eo_data_dir
+        self.download_workers = self.read_int_setting('download_workers', DEFAULT_WORKERS)
+        self.fsync_interval = fsync_interval_from_mb(self.read_int_setting('fsync_interval_mb', DEFAULT_FSYNC_INTERVAL_MB))
+        self.fetch_concurrency = self.read_int_setting('fetch_concurrency', DEFAULT_CONCURRENCY)
+        self.fetch_rate = self.read_int_setting('fetch_rate', DEFAULT_RATE)
+        self.adaptive_downloads = bool(self.read_int_setting('adaptive_downloads', 1))
+        self.bandwidth_limit = bandwidth_limit_from_kb(self.read_int_setting('bandwidth_limit_kb',
+                                                                             DEFAULT_BANDWIDTH_LIMIT_KB))
+        self.preview_workers = self.read_int_setting('preview_workers', DEFAULT_PREVIEW_WORKERS)
+        self.http_cache_mb = self.read_int_setting('http_cache_mb', DEFAULT_MAX_MB)
+        self.http_cache_ttl_minutes = self.read_int_setting('http_cache_ttl_minutes', DEFAULT_TTL_MINUTES)
+        # Optional override, e.g. to point at a local stub server
+        self.federal_register_url = self.ini_handler.read_value('CRExecOrder', 'federal_register_url') or None
+        # Optional metrics export: a .prom file (Prometheus text) or a .jsonl log
+        self.metrics_export_path = self.ini_handler.read_value('CRExecOrder', 'metrics_export') or None
+        # Optional store of PDFs shared by all libraries
+        shared_store_directory = self.ini_handler.read_value('CRExecOrder', 'shared_store_directory') or None
+        if shared_store_directory != self.shared_store_directory:
+            self.close_content_store()
+            self.shared_store_directory = shared_store_directory
+            self.content_store = open_content_store(shared_store_directory)
+
+    def read_int_setting(self, option, default):
+        try:
+            return int(self.ini_handler.read_value('CRExecOrder', option) or default)
+        except ValueError:
+            logger.warning(f"Invalid {option} setting, using default")
+            return default
 
     def connect_signals(self):
         self.tab_widget.currentChanged.connect(self.on_tab_changed)
@@ -262,13 +464,29 @@ class CRExecOrder(QMainWindow):
         self.download_year_end_combobox.valueChanged.connect(self.update_begin_year)
 
         self.download_library_button.clicked.connect(self.download_library_button_action)
-        self.downloaded_list.doubleClicked.connect(self.downloaded_on_double_click)
+        self.downloaded_list.documentDoubleClicked.connect(self.downloaded_on_double_click)
+        self.downloaded_list.currentDocumentChanged.connect(self.show_preview)
+        self.preview_panel.previewReady.connect(self.on_preview_ready)
+        self.directory_watcher.directoryChanged.connect(lambda path: self.reconcile_timer.start())
+        self.keyword_search.textChanged.connect(self.filter_timer.start)
+        for combobox in (self.president_search, self.year_from_search, self.year_to_search):
+            combobox.activated.connect(lambda index: self.apply_filters())
+        self.signed_search_check.toggled.connect(self.on_signed_search_toggled)
+        self.signed_from_search.dateChanged.connect(lambda date: self.apply_filters())
+        self.signed_to_search.dateChanged.connect(lambda date: self.apply_filters())
 
         self.download_selected_button.clicked.connect(self.download_library_list_selected)
         self.download_all_button.clicked.connect(self.download_library_list_all)
         self.select_none_button.clicked.connect(self.select_none_not_downloaded)
+        self.pause_button.clicked.connect(self.toggle_download_pause)
+
+        self.library_combobox.currentTextChanged.connect(self.switch_library)
+        self.add_library_button.clicked.connect(self.add_library)
+        self.remove_library_button.clicked.connect(self.remove_library)
 
-        self.not_downloaded_list.rightClicked.connect(self.not_downloaded_on_item_right_clicked)
+        self.task_cancel_button.clicked.connect(self.task_manager.cancel_all)
+        self.task_manager.task_started.connect(lambda task: self.update_task_widgets())
+        self.task_manager.task_done.connect(lambda task: self.update_task_widgets())
 
     # Tab change methods
     def on_tab_changed(self, index):
@@ -305,63 +523,626 @@ class CRExecOrder(QMainWindow):
         logger.debug("Start downloading library entries")
         start_year = self.download_year_begin_combobox.value()
         end_year = self.download_year_end_combobox.value()
-
-        if start_year == end_year:
-            self.manager.fetch_executive_orders(start_year)  # Single year
-        else:
-            self.manager.fetch_executive_orders(f"{start_year}-{end_year}")
-
-        self.manager.save_to_file(file_name=self.library_path)
+        full = not self.incremental_sync_checkbox.isChecked()
+        library_sync = self.library_sync
+
+        def fetch(task):
+            library_sync.scheduler.reset()
+            task.on_cancel(library_sync.scheduler.cancel)
+            with metrics.span("fetch_list"):
+                return library_sync.sync_years(
+                    start_year, end_year, full=full,
+                    on_progress=lambda year, page, total_pages: task.report(
+                        0, 0, f"{year}: page {page} of {max(total_pages, 1)}"))
+
+        task = Task("Fetch list", fetch, library=True)
+        task.signals.finished.connect(self.on_fetch_finished)
+        task.signals.failed.connect(self.on_fetch_failed)
+        task.signals.cancelled.connect(self.on_fetch_cancelled)
+        self.download_library_button.setEnabled(False)
+        self.submit_task(task)
+
+    def on_fetch_finished(self, result):
         logger.debug("Done downloading library entries")
+        self.update_status_bar(f"Fetched {result.added} new and {result.updated} updated orders")
+        self.on_fetch_done(result.changed)
+
+    def on_fetch_failed(self, error):
+        # Pages fetched so far are checkpointed; the next fetch resumes from there
+        self.update_status_bar(f"Fetch interrupted: {error}")
+        self.on_fetch_done()
+
+    def on_fetch_cancelled(self):
+        self.update_status_bar("Fetch cancelled; the next fetch resumes where it stopped")
+        self.on_fetch_done()
+
+    def on_fetch_done(self, changed=None):
+        self.download_library_button.setEnabled(True)
+        if changed is None:
+            # Failed or cancelled: whatever was merged before stopping is unknown here
+            self.library_index.invalidate()
+            refresh_downloaded = True
+        else:
+            refresh_downloaded = False
+            for doc_id in changed:
+                previous, current = self.library_index.update(doc_id)
+                refresh_downloaded = refresh_downloaded or bool(previous or current)
         self.populate_not_downloaded_listing()
+        if refresh_downloaded:
+            # A downloaded order's title may have changed; its list is sorted by title
+            self.populate_downloaded_listing()
 
     def download_library_list_selected(self):
         """Get selected items' doc_ids (keys)"""
-        selected_items = self.not_downloaded_list.get_all_selected_items()
+        selected_items = self.not_downloaded_list.selected_documents()
 
         # Extract only the IDs from each tuple and store them in a list
         selected_keys = [item_id for item_id, _ in selected_items]
-        # This is equivalent to:
-        # selected_keys = []
-        # for item in selected_items:
-        #     item_id = item[0]  # Get the first value of the tuple (the ID)
-        #     selected_keys.append(item_id)
-
-        total_files = len(selected_keys)
-        if total_files == 0:
+
+        if not selected_keys:
             self.update_status_bar("No items selected for download.")
             return
 
-        self.update_status_bar(f"Downloading {total_files} files...")
-        QApplication.processEvents()
-
-        self.downloader.download_from_list([doc.strip() for doc in selected_keys], self.library_path)
-        self.populate_not_downloaded_listing()
-        self.populate_downloaded_listing()
-        self.manager.save_to_file(file_name=self.library_path)
+        # An explicit selection goes ahead of everything queued with "All"
+        self.start_download([doc.strip() for doc in selected_keys], PRIORITY_SELECTION)
 
     def download_library_list_all(self):
         self.select_all_not_downloaded()
-        self.download_library_list_selected()
+        doc_ids = library_records.newest_first(self.manager, self.library_index.partition(downloaded=False))
+        if not doc_ids:
+            self.update_status_bar("No items selected for download.")
+            return
+        self.start_download(doc_ids, PRIORITY_ALL)
 
     def select_none_not_downloaded(self):
         self.not_downloaded_list.clearSelection()
 
+    # Background task methods
+    def submit_task(self, task):
+        task.signals.progress.connect(self.on_task_progress)
+        task.signals.status.connect(lambda message: self.update_status_bar(f"{task.name}: {message}", 0))
+        self.task_manager.submit(task)
+        self.update_task_widgets()
+
+    def on_task_progress(self, done, total):
+        # A total of 0 shows a busy indicator
+        self.task_progress_bar.setRange(0, total)
+        self.task_progress_bar.setValue(done)
+
+    def update_task_widgets(self):
+        names = [task.name for task in self.task_manager.tasks]
+        self.task_label.setText(", ".join(names))
+        for widget in (self.task_label, self.task_progress_bar, self.task_cancel_button):
+            widget.setVisible(bool(names))
+        if not names:
+            self.task_progress_bar.reset()
+
+    def load_library(self):
+        """Open (and if needed migrate) the library on the library lane, then fill the lists."""
+        name = self.library_registry.active
+        library_path = self.library_path
+        eo_data_dir = self.eo_data_dir
+        content_store = self.content_store
+
+        def load(task):
+            with metrics.span("library_load"):
+                manager = ExecutiveOrderManager()
+                manager_lock = threading.RLock()
+                store = open_library(manager, library_path)
+                # Files added or removed while the program was not running
+                reconciler = DirectoryReconciler(manager, store, eo_data_dir, lock=manager_lock)
+                reconciler.reconcile()
+                # Display titles and partitions are built here so the GUI thread only fills the models
+                library_index = LibraryIndex(manager)
+                library_index.build()
+                # Creates its table if needed, so here rather than on the GUI thread
+                download_queue = DownloadQueue(store)
+            cleanup_stale_parts(eo_data_dir)
+            if content_store is not None:
+                content_store.collect_garbage()
+            return name, manager, store, library_index, reconciler, download_queue, manager_lock
+
+        task = Task("Load library", load, library=True)
+        task.signals.finished.connect(self.on_library_loaded)
+        task.signals.failed.connect(lambda error: self.update_status_bar(f"Failed to load library: {error}", 0))
+        self.set_library_actions_enabled(False)
+        self.submit_task(task)
+
+    def on_library_loaded(self, result):
+        self.startup_timer.mark("library_loaded")
+        name, *library = result
+        previous = self.loaded_libraries.get(name)
+        if previous is not None:
+            # Reloaded, e.g. after its directory changed in the settings
+            previous[1].close()
+        self.loaded_libraries[name] = tuple(library)
+        self.activate_library(name, loaded=True)
+
+    def activate_library(self, name, loaded=False):
+        """Show an opened library. loaded: opened just now rather than switched back to."""
+        (self.manager, self.library_store, self.library_index, self.reconciler, self.download_queue,
+         self.manager_lock) = self.loaded_libraries[name]
+        self.watch_directory(self.eo_data_dir)
+        if not loaded:
+            # Changes made while another library was shown
+            self.reconcile_timer.start()
+        self.change_timer.start()
+        self.library_sync = self.create_library_sync()
+        self.stop_search_index()
+        self.stop_preview_pipeline()
+
+        # Fill the visible tab now and the hidden one on the next event loop turn
+        populate = [self.populate_not_downloaded_listing, self.populate_downloaded_listing]
+        if self.tab_widget.currentIndex() == 1:
+            populate.reverse()
+        populate[0]()
+        self.set_library_actions_enabled(True)
+        if not loaded:
+            QTimer.singleShot(0, lambda: self.finish_library_switch(populate[1]))
+            return
+        self.startup_timer.mark("active_tab_populated")
+        QTimer.singleShot(0, lambda: self.finish_library_load(populate[1]))
+
+    def finish_library_switch(self, populate_hidden_tab):
+        populate_hidden_tab()
+        self.start_search_index()
+        self.start_preview_pipeline()
+        self.update_pause_button()
+
+    def finish_library_load(self, populate_hidden_tab):
+        populate_hidden_tab()
+        self.start_search_index()
+        self.start_preview_pipeline()
+        self.resume_queued_downloads()
+        self.startup_timer.mark("interactive")
+        self.startup_timer.append_report(Path(self.eo_data_dir) / STARTUP_REPORT_FILE_NAME,
+                                         documents=len(library_records.all_documents(self.manager)))
+
+    def set_library_actions_enabled(self, enabled):
+        self.download_library_button.setEnabled(enabled)
+        self.set_download_buttons_enabled(enabled)
+
+    # Library switching methods
+    def update_library_combobox(self):
+        self.library_combobox.blockSignals(True)
+        self.library_combobox.clear()
+        self.library_combobox.addItems(self.library_registry.names())
+        self.library_combobox.setCurrentText(self.library_registry.active or "")
+        self.library_combobox.blockSignals(False)
+        self.remove_library_button.setEnabled(len(self.library_registry.names()) > 1)
+
+    def switch_library(self, name):
+        if not name or name == self.library_registry.active:
+            return
+        if self.task_manager.is_busy():
+            # Downloads and fetches write to the library they were started for
+            self.update_status_bar("Libraries cannot be switched while tasks are running.")
+            self.update_library_combobox()
+            return
+        self.library_registry.set_active(name)
+        self.library_registry.save()
+        self.open_active_library()
+
+    def open_active_library(self):
+        """Show the active library: at once if it was opened before, otherwise after loading it."""
+        name = self.library_registry.active
+        self.eo_data_dir = self.library_registry.directory()
+        self.library_path = Path(self.eo_data_dir) / LIBRARY_FILE_NAME
+        self.update_library_combobox()
+        if name in self.loaded_libraries:
+            self.activate_library(name)
+            self.update_status_bar(f"Library {name}")
+        else:
+            self.load_library()
+
+    def add_library(self):
+        if self.task_manager.is_busy():
+            self.update_status_bar("Libraries cannot be added while tasks are running.")
+            return
+        name, ok = QInputDialog.getText(self, "Add Library", "Library name:")
+        if not ok or not name.strip():
+            return
+        start_dir = str(Path(self.eo_data_dir).parent) if self.eo_data_dir else str(Path.home())
+        directory = QFileDialog.getExistingDirectory(self, f"Directory of {name.strip()}", start_dir)
+        if not directory:
+            return
+        try:
+            self.library_registry.add(name, directory)
+        except LibraryRegistryError as e:
+            QMessageBox.warning(self, "Add Library", str(e))
+            return
+        self.library_registry.save()
+        self.update_library_combobox()
+        self.switch_library(name.strip())
+
+    def remove_library(self):
+        name = self.library_registry.active
+        if self.task_manager.is_busy() or len(self.library_registry.names()) < 2:
+            self.update_status_bar("The library cannot be removed now.")
+            return
+        answer = QMessageBox.question(self, "Remove Library",
+                                      f"Remove {name} from the list of libraries? Its files are not deleted.")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        self.stop_search_index()
+        self.stop_preview_pipeline()
+        self.not_downloaded_list.populate_list({})
+        self.downloaded_list.populate_list({})
+        removed = self.loaded_libraries.pop(name, None)
+        if removed is not None:
+            removed[1].close()
+        self.library_store = None
+        self.download_queue = None
+        self.reconciler = None
+        self.manager_lock = None
+        self.watch_directory(None)
+        self.library_registry.remove(name)
+        self.library_registry.save()
+        self.open_active_library()
+
+    # Background download methods
+    def start_download(self, doc_ids, priority=PRIORITY_SELECTION):
+        """Queue doc_ids and start working through the queue, unless a download is already doing so."""
+        jobs = self.build_download_jobs(doc_ids)
+        if not jobs:
+            self.update_status_bar("Nothing to download.")
+            return
+
+        # Added to the queue by the download thread
+        self.download_queue.submit(jobs, priority)
+        if self.download_task is not None:
+            # The running download adds them before its next file
+            self.update_status_bar(f"Queued {len(jobs)} files")
+            return
+        self.start_queue_download()
+
+    def resume_queued_downloads(self):
+        """Continue a queue left from the last session in the background, unless it was paused."""
+        pending = self.download_queue.count()
+        if pending and self.download_task is None and not self.download_queue.is_paused():
+            logger.info(f"Resuming {pending} queued downloads")
+            self.start_queue_download()
+        self.update_pause_button()
+
+    def toggle_download_pause(self):
+        if self.download_task is not None:
+            # Running files finish; the rest stays queued. The download persists the pause when it stops
+            self.download_queue.set_paused(True, persist=False)
+            self.update_status_bar("Pausing downloads after the running files...", 0)
+        elif self.download_queue.count():
+            self.start_queue_download()
+        self.update_pause_button()
+
+    def update_pause_button(self):
+        running = self.download_task is not None
+        paused = self.download_queue is not None and self.download_queue.is_paused()
+        self.pause_button.setText("Resume" if paused or not running else "Pause")
+        self.pause_button.setEnabled((running and not paused) or
+                                     (not running and self.download_queue is not None and
+                                      bool(self.download_queue.count())))
+
+    def start_queue_download(self):
+        queue = self.download_queue
+        self.download_total = queue.count() + queue.submitted_count()
+        if not self.download_total:
+            self.update_status_bar("Nothing to download.")
+            return
+        # Persisted by the download
+        queue.set_paused(False, persist=False)
+        self.download_done = 0
+        self.download_failed = 0
+        self.download_skipped = 0
+        self.download_linked = 0
+        self.download_started = time.monotonic()
+        self.download_bytes_start = metrics.METRICS.counter("download_bytes_total")
+        self.download_rate = RateMeter()
+        self.update_status_bar(f"Downloading {self.download_total} files...", 0)
+        self.throughput_timer.start()
+
+        engine = DownloadEngine(workers=self.download_workers, fsync_interval=self.fsync_interval,
+                                content_store=self.content_store, adaptive=self.adaptive_downloads,
+                                bandwidth_limit=self.bandwidth_limit)
+        self.download_engine = engine
+
+        manager, store, manager_lock = self.manager, self.library_store, self.manager_lock
+
+        def download(task):
+            # Every queue and store write happens here: a store busy with a fetch, a reconcile or
+            # another process never blocks the window, which only updates its lists
+            queue.set_paused(False)
+            queue.flush()
+            done, total = 0, queue.count()
+            task.report(done, total)
+
+            def on_added(added):
+                nonlocal total
+                total += added
+                task.report(done, total)
+
+            def on_finished(doc_id, ok, error, info):
+                nonlocal done
+                if ok:
+                    # A fetch or the change feed may be merging the same record on the lane
+                    with manager_lock:
+                        details = library_records.record_file_info(manager, doc_id, info)
+                        if details is not None:
+                            store.save(documents={doc_id: details}, fields=library_records.FILE_STATE_FIELDS)
+                    queue.remove(doc_id)
+                else:
+                    queue.record_failure(doc_id, error)
+                done += 1
+                task.report_item_finished(doc_id, ok, error, info)
+                task.report(done, total)
+
+            task.on_cancel(engine.cancel)
+            try:
+                return engine.run(queue.jobs(on_added=on_added), on_progress=task.report_item_progress,
+                                  on_finished=on_finished)
+            finally:
+                # Submitted after the queue reader ran dry: on_download_finished starts another run
+                queue.flush()
+                # Unfinished entries may be taken by another process now
+                queue.release()
+                # Cancelled files keep their partial data; Resume continues them. Closing the
+                # window cancels too, but the queue resumes at the next start
+                if queue.is_paused() or (task.is_cancelled() and not self.closing):
+                    queue.set_paused(True)
+
+        self.download_task = Task("Download", download)
+        self.download_task.signals.item_finished.connect(self.on_download_file_finished)
+        self.download_task.signals.progress.connect(self.on_download_progress)
+        for signal in (self.download_task.signals.finished, self.download_task.signals.failed,
+                       self.download_task.signals.cancelled):
+            signal.connect(lambda *args: self.on_download_finished())
+        self.download_task.signals.cancelled.connect(lambda: self.update_status_bar("Download cancelled"))
+        self.submit_task(self.download_task)
+        self.on_task_progress(0, self.download_total)
+        self.update_pause_button()
+
+    def on_download_progress(self, done, total):
+        # The download thread counts what it adds to the queue
+        self.download_total = total
+
+    def build_download_jobs(self, doc_ids):
+        jobs = []
+        for doc_id in doc_ids:
+            url = library_records.get_pdf_url(self.manager, doc_id)
+            file_name = self.manager.get_file_name(doc_id)
+            if not url or file_name == "Unknown":
+                logger.error(f"Error: No PDF url or file name for document {doc_id}")
+                continue
+            size, sha256 = library_records.get_file_info(self.manager, doc_id)
+            jobs.append(DownloadJob(doc_id=doc_id, url=url, path=Path(self.eo_data_dir) / file_name,
+                                    size=size, sha256=sha256))
+        return jobs
+
+    def on_download_file_finished(self, doc_id, ok, error, info):
+        """The file is recorded in the store and the queue already; update the lists."""
+        if self.closing:
+            return
+        self.download_done += 1
+        if ok:
+            if info.linked:
+                self.download_linked += 1
+            elif info.skipped:
+                self.download_skipped += 1
+            self.submit_preview(doc_id, info.sha256)
+            self.move_to_downloaded_listing(doc_id)
+        else:
+            self.download_failed += 1
+            logger.error(f"Download failed for {doc_id}: {error}")
+        self.update_download_status()
+
+    def update_download_status(self):
+        """Status bar line with live MB/s and an ETA from the average file rate so far."""
+        downloaded_bytes = metrics.METRICS.counter("download_bytes_total") - self.download_bytes_start
+        self.download_rate.update(downloaded_bytes)
+        message = f"Downloaded {self.download_done} of {self.download_total} files"
+        message += f" - {self.download_rate.rate() / 1e6:.1f} MB/s"
+        engine = self.download_engine
+        if engine is not None:
+            message += f", {engine.concurrency()} at a time"
+            if engine.bandwidth_limit:
+                message += f" (limit {engine.bandwidth_limit / 1e6:.1f} MB/s)"
+        elapsed = time.monotonic() - self.download_started
+        if self.download_done and elapsed > 0:
+            remaining = (self.download_total - self.download_done) / (self.download_done / elapsed)
+            message += f", ETA {int(remaining // 60)}:{int(remaining % 60):02d}"
+        self.update_status_bar(message, 0)
+
+    def on_download_finished(self):
+        cancelled = self.download_task.is_cancelled()
+        self.download_task = None
+        self.download_engine = None
+        self.throughput_timer.stop()
+        if self.closing:
+            # Stopped by closing the window: the queue resumes at the next start
+            return
+        # Queued after the run's queue reader ran dry (e.g. a selection near the end): not downloaded yet
+        queue = self.download_queue
+        more = not cancelled and not queue.is_paused() and (queue.available() or queue.submitted_count())
+        if self.reconcile_pending:
+            self.reconcile_timer.start()
+        if more:
+            self.start_queue_download()
+            return
+        self.update_pause_button()
+        elapsed = time.monotonic() - self.download_started
+        downloaded_bytes = metrics.METRICS.counter("download_bytes_total") - self.download_bytes_start
+
+        transferred = self.download_done - self.download_failed - self.download_skipped - self.download_linked
+        message = f"Downloaded {transferred} files"
+        if self.download_linked:
+            message += f", {self.download_linked} shared from other libraries"
+        if self.download_skipped:
+            message += f", {self.download_skipped} already present"
+        if self.download_failed:
+            message += f", {self.download_failed} failed"
+        if elapsed > 0 and downloaded_bytes:
+            message += f" ({downloaded_bytes / 1e6:.1f} MB at {downloaded_bytes / elapsed / 1e6:.1f} MB/s)"
+        if cancelled:
+            message += " (cancelled)"
+        elif self.download_queue.is_paused():
+            message += " (paused)"
+        queued = self.download_queue.count()
+        if queued and (cancelled or self.download_queue.is_paused()):
+            message += f", {queued} still queued"
+        self.update_status_bar(message)
+
+    def facet_bar(self):
+        widget = QWidget()
+        layout = QHBoxLayout(widget)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(QLabel("President:"))
+        layout.addWidget(self.president_search)
+        layout.addWidget(QLabel("Years:"))
+        layout.addWidget(self.year_from_search)
+        layout.addWidget(QLabel("to"))
+        layout.addWidget(self.year_to_search)
+        layout.addWidget(self.signed_search_check)
+        layout.addWidget(self.signed_from_search)
+        layout.addWidget(QLabel("to"))
+        layout.addWidget(self.signed_to_search)
+        layout.addStretch()
+        layout.addWidget(self.facet_count_label)
+        return widget
+
+    def set_download_buttons_enabled(self, enabled):
+        self.download_selected_button.setEnabled(enabled)
+        self.download_all_button.setEnabled(enabled)
+
     # Populate actions
+    @timed("populate_not_downloaded")
     def populate_not_downloaded_listing(self):
-        library_titles_prelim = self.manager.get_not_downloaded_documents()
-        library_titles = self.manager.get_display_titles(library_titles_prelim)
-        self.not_downloaded_list.populate_list(
-            [(doc_id, display_title) for doc_id, display_title in library_titles.items()]
-        )
+        self.not_downloaded_list.populate_list(self.library_index.titles, self.library_index.partition(downloaded=False))
 
+    @timed("populate_downloaded")
     def populate_downloaded_listing(self):
-        library_titles_prelim = self.manager.get_downloaded_documents()
-        library_titles = self.manager.get_display_titles(library_titles_prelim)
-        self.downloaded_list.populate_list(
-            [(doc_id, display_title) for doc_id, display_title in library_titles.items()],
-            sort_mode=WSSortOrder.DESCENDING
-        )
+        self.title_filter.set_keys(self.library_index.partition_keys(downloaded=True))
+        self.downloaded_list.populate_list(self.library_index.titles, self.library_index.partition(downloaded=True))
+        self.apply_title_filter()
+
+    def move_to_downloaded_listing(self, doc_id):
+        """Move one order between the lists with row-level updates instead of repopulating both."""
+        # Removed before the index update, which may change the title the row is sorted by
+        self.not_downloaded_list.remove_document(doc_id)
+        self.library_index.update(doc_id)
+        self.downloaded_list.insert_document(doc_id)
+        self.title_filter.update(doc_id, self.library_index.title(doc_id))
+        # Refreshes the facet counts too
+        self.filter_timer.start()
+
+    def update_listings_for(self, doc_ids):
+        """Update the lists for orders changed in the manager: row by row, or refilled when there are many."""
+        if len(doc_ids) > LISTING_REPOPULATE_THRESHOLD:
+            for doc_id in doc_ids:
+                self.library_index.update(doc_id)
+            self.populate_not_downloaded_listing()
+            self.populate_downloaded_listing()
+            return
+        for doc_id in doc_ids:
+            self.update_listings(doc_id)
+        self.filter_timer.start()
+
+    def update_listings(self, doc_id):
+        """Move one order to the list of its current download state."""
+        self.not_downloaded_list.remove_document(doc_id)
+        self.downloaded_list.remove_document(doc_id)
+        previous, current = self.library_index.update(doc_id)
+        if current is None:
+            self.title_filter.remove(doc_id)
+            return
+        (self.downloaded_list if current else self.not_downloaded_list).insert_document(doc_id)
+        if current:
+            self.title_filter.update(doc_id, self.library_index.title(doc_id))
+        else:
+            self.title_filter.remove(doc_id)
+
+    # Directory reconcile methods
+    def watch_directory(self, directory):
+        watched = self.directory_watcher.directories()
+        if watched:
+            self.directory_watcher.removePaths(watched)
+        if directory and not self.directory_watcher.addPath(str(directory)):
+            logger.warning(f"Cannot watch {directory} for changes; restart to pick up files added elsewhere")
+
+    def reconcile_directory(self):
+        """Apply PDFs added, replaced or removed by other programs, on the library lane."""
+        if self.reconciler is None or self.closing:
+            return
+        if self.download_task is not None:
+            # Files being downloaded are recorded by the download itself; look again once it is done
+            self.reconcile_pending = True
+            return
+        self.reconcile_pending = False
+        reconciler = self.reconciler
+
+        def reconcile(task):
+            with metrics.span("directory_reconcile"):
+                return reconciler.reconcile()
+
+        task = Task("Check folder", reconcile, library=True)
+        task.signals.finished.connect(lambda result: self.on_directory_reconciled(reconciler, result))
+        task.signals.failed.connect(lambda error: logger.warning(f"Directory reconcile failed: {error}"))
+        self.submit_task(task)
+
+    def on_directory_reconciled(self, reconciler, result):
+        if reconciler is not self.reconciler or not result.doc_ids:
+            # Another library is shown now; it is reconciled when switched back to
+            return
+        self.update_listings_for(result.found + result.missing)
+        for doc_id in result.found + result.changed + result.missing:
+            self.submit_preview(doc_id)
+        message = f"Folder changed: {len(result.found)} orders added, {len(result.missing)} removed"
+        if result.changed:
+            message += f", {len(result.changed)} replaced"
+        self.update_status_bar(message)
+
+    # Change feed methods
+    def poll_library_changes(self):
+        """Read the orders other processes saved since the last poll and apply them, on the library lane."""
+        store = self.library_store
+        if store is None or self.closing or self.change_feed_pending or not store.has_changes():
+            return
+        manager, library_index, manager_lock = self.manager, self.library_index, self.manager_lock
+
+        def read_changes(task):
+            # Applied on the lane, which is where fetches, reconciles and loads iterate the manager, and
+            # under the manager lock the download thread records files with
+            with manager_lock:
+                documents, revision = store.changes()
+                previous = {doc_id: library_records.is_downloaded(manager, doc_id) for doc_id in documents}
+                changed = library_records.apply_changes(manager, documents)
+                store.synced(revision)
+                return changed, [doc_id for doc_id in changed
+                                 if library_records.is_downloaded(manager, doc_id) and not previous[doc_id]]
+
+        self.change_feed_pending = True
+        task = Task("Library changes", read_changes, library=True)
+        task.signals.finished.connect(lambda result: self.on_library_changes(store, library_index, result))
+        task.signals.failed.connect(lambda error: self.on_library_changes_failed(error))
+        self.submit_task(task)
+
+    def on_library_changes(self, store, library_index, result):
+        """The manager holds the changed records already; move only those orders in the lists."""
+        self.change_feed_pending = False
+        changed, downloaded = result
+        if self.closing or not changed:
+            return
+        if store is not self.library_store:
+            # Another library is shown now: its lists are filled from its index when switched back to
+            for doc_id in changed:
+                library_index.update(doc_id)
+            return
+        self.update_listings_for(changed)
+        for doc_id in downloaded:
+            self.submit_preview(doc_id)
+        self.update_status_bar(f"Library updated by another program: {len(changed)} orders changed, "
+                               f"{len(downloaded)} downloaded")
+
+    def on_library_changes_failed(self, error):
+        self.change_feed_pending = False
+        logger.warning(f"Reading library changes failed: {error}")
 
     # Double click and Right click methods
     def downloaded_on_double_click(self, doc_id, doc_name):
@@ -387,6 +1168,12 @@ class CRExecOrder(QMainWindow):
             logger.error(f"Error: File not found - {pdf_path}")
             return
 
+        if not looks_like_complete_pdf(pdf_path):
+            # e.g. written by an older version that did not download to a temporary file first
+            logger.error(f"Error: {pdf_path} is incomplete or not a PDF")
+            self.update_status_bar(f"{file_name} is incomplete, download it again", 0)
+            return
+
         # ✅ Step 4: Print the full path (for debugging)
         logger.debug(f"Opening file: {pdf_path}")
 
@@ -403,59 +1190,285 @@ class CRExecOrder(QMainWindow):
 
     def not_downloaded_on_item_right_clicked(self, item_id, item_name):
         logger.debug(f"Right Clicked: ID={item_id}, Name={item_name}")
-        self.downloader.download_single(item_id, self.library_path)
-        self.populate_not_downloaded_listing()
-        self.populate_downloaded_listing()
-        self.manager.save_to_file(file_name=self.library_path)
+        self.start_download([item_id])
 
     # Filter actions
+    @timed("title_filter")
+    def apply_title_filter(self):
+        """Live filter while typing: title matches only, narrowed from the previous result."""
+        self.filter_timer.stop()
+        self.keyword_matches = self.title_filter.match(self.keyword_search.text())
+        self.keyword_ranking = None
+        self.apply_filters()
+
+    @timed("filter_action")
     def filter_action(self):
-        keyword = self.keyword_search.text().lower()
-        results = {
-            doc: details
-            for doc, details in self.manager.get_display_titles().items()
-            if keyword in details.lower()
-        }
-        logger.debug(f"Filter results: {results}")
-        self.downloaded_list.populate_list(list(results.items()),
-            sort_mode=WSSortOrder.DESCENDING)
+        """Title matches first, then orders whose PDF text matches, best match first."""
+        query = self.keyword_search.text()
+        accepted = self.title_filter.match(query)
+        if accepted is None:
+            self.keyword_matches = self.keyword_ranking = None
+            self.apply_filters()
+            return
+
+        ranking = dict.fromkeys(accepted, float("-inf"))
+        if self.search_index is not None:
+            for doc_id, score in self.search_index.search(query):
+                if doc_id in self.title_filter.keys:
+                    ranking.setdefault(doc_id, score)
+        logger.debug(f"Filter results: {len(ranking)}")
+        self.keyword_matches = set(ranking)
+        self.keyword_ranking = ranking
+        self.apply_filters()
+
+    @timed("facet_filter")
+    def apply_filters(self):
+        """Keyword matches intersected with the president, year and signing-date facets; refreshes the counts."""
+        if self.library_index is None:
+            return
+        facets = self.library_index.facets(downloaded=True)
+        result = facets.search(self.facet_selection(), self.keyword_matches)
+        self.downloaded_list.set_filter(result.accepted, self.keyword_ranking)
+
+        self.set_facet_items(self.president_search, "All presidents", result.presidents, sorted(result.presidents))
+        years = sorted(result.years)
+        self.set_facet_items(self.year_from_search, "Any", result.years, years)
+        self.set_facet_items(self.year_to_search, "Any", result.years, years)
+        self.signed_search_check.setEnabled(bool(facets.dates))
+        if not self.signed_search_check.isChecked() and facets.dates:
+            # Offer the library's signing dates, earliest to latest
+            first = QDate.fromString(facets.dates[0][0], "yyyy-MM-dd")
+            last = QDate.fromString(facets.dates[-1][0], "yyyy-MM-dd")
+            for date_edit, date in ((self.signed_from_search, first), (self.signed_to_search, last)):
+                date_edit.blockSignals(True)
+                date_edit.setDateRange(first, last)
+                date_edit.setDate(date)
+                date_edit.blockSignals(False)
+        self.facet_count_label.setText(f"{result.total} of {len(facets)} orders")
+
+    def facet_selection(self):
+        signed = self.signed_search_check.isChecked()
+        return FacetSelection(
+            president=self.president_search.currentData(),
+            first_year=self.year_from_search.currentData(),
+            last_year=self.year_to_search.currentData(),
+            signed_from=self.signed_from_search.date().toString("yyyy-MM-dd") if signed else None,
+            signed_to=self.signed_to_search.date().toString("yyyy-MM-dd") if signed else None,
+        )
+
+    @staticmethod
+    def set_facet_items(combobox, all_text, counts, keys):
+        """Show "all_text" and one "key (count)" item per key, keeping the current choice; texts are updated in place."""
+        current = combobox.currentData()
+        combobox.blockSignals(True)
+        if [combobox.itemData(row) for row in range(1, combobox.count())] != keys:
+            combobox.clear()
+            combobox.addItem(all_text, None)
+            for key in keys:
+                combobox.addItem("", key)
+            row = combobox.findData(current)
+            combobox.setCurrentIndex(max(row, 0))
+        for row, key in enumerate(keys, start=1):
+            combobox.setItemText(row, f"{key} ({counts[key]})")
+        combobox.blockSignals(False)
+
+    def on_signed_search_toggled(self, checked):
+        for date_edit in (self.signed_from_search, self.signed_to_search):
+            date_edit.setEnabled(checked)
+        self.apply_filters()
+
+    # Full-text index methods
+    def start_search_index(self):
+        # Searched here; filled by the preview pipeline from the text it extracts
+        self.search_index = SearchIndex(Path(self.eo_data_dir) / SEARCH_INDEX_FILE_NAME)
+
+    def stop_search_index(self):
+        if self.search_index is not None:
+            self.search_index.close()
+            self.search_index = None
+
+    # Preview methods
+    def start_preview_pipeline(self):
+        if self.preview_workers <= 0:
+            return
+        pipeline = PreviewPipeline(Path(self.eo_data_dir) / PREVIEW_CACHE_FILE_NAME,
+                                   on_ready=self.preview_panel.previewReady.emit, workers=self.preview_workers,
+                                   search_index_path=Path(self.eo_data_dir) / SEARCH_INDEX_FILE_NAME)
+        pipeline.start()
+        if not pipeline.is_running():
+            # No PDF library installed; the panel shows the library record only
+            return
+        self.preview_pipeline = pipeline
+        # Previews and index entries of files downloaded before; cached and indexed ones are skipped
+        for doc_id in library_records.newest_first(self.manager, self.library_index.downloaded):
+            self.submit_preview(doc_id)
+
+    def stop_preview_pipeline(self):
+        if self.preview_pipeline is not None:
+            self.preview_pipeline.stop()
+            self.preview_pipeline = None
+        self.preview_panel.clear()
+
+    def pdf_path(self, doc_id):
+        file_name = self.manager.get_file_name(doc_id)
+        return None if file_name == "Unknown" else Path(self.eo_data_dir) / file_name
+
+    def submit_preview(self, doc_id, sha256=None, urgent=False):
+        """Extract the preview of doc_id's file and index its text (or drop it from the index when gone)."""
+        path = self.pdf_path(doc_id)
+        if self.preview_pipeline is not None and path is not None:
+            details = library_records.get_document(self.manager, doc_id) or {}
+            self.preview_pipeline.submit(doc_id, path, sha256, urgent=urgent, title=details.get("title", ""))
+
+    def show_preview(self, doc_id):
+        details = library_records.get_document(self.manager, doc_id) if doc_id else None
+        if details is None:
+            self.preview_panel.clear()
+            return
+        path = self.pdf_path(doc_id)
+        preview = None
+        if self.preview_pipeline is not None and path is not None:
+            preview = self.preview_pipeline.cached(doc_id, path, library_records.get_file_info(self.manager, doc_id)[1])
+            if preview is None:
+                self.submit_preview(doc_id, urgent=True)
+        self.preview_panel.show_document(details, preview, pending=self.preview_pipeline is not None)
+
+    def on_preview_ready(self, doc_id, preview):
+        if doc_id == self.downloaded_list.current_document():
+            self.preview_panel.show_document(library_records.get_document(self.manager, doc_id) or {}, preview)
 
     # Dialogs
+    def show_performance(self):
+        if self.dialog_performance is None:
+            self.dialog_performance = PerformanceDialog(self)
+        self.dialog_performance.show()
+        self.dialog_performance.raise_()
+
     def show_about(self):
+        if self.dialog_about is None:
+            self.dialog_about = AboutDialog(self)
         self.dialog_about.show()
 
+    def show_export(self):
+        if self.library_store is None:
+            self.update_status_bar("No library is loaded yet.")
+            return
+        dialog = ExportDialog(self, ini_handler=self.ini_handler, last_export=last_export(self.library_store))
+        if dialog.exec():
+            self.start_export(**dialog.options())
+
+    def start_export(self, records_path, archive_path=None, since_last=False, include_text=False):
+        """Export on the general pool: it reads its own snapshot of the store, so downloads go on meanwhile."""
+        exporter = LibraryExporter(self.library_store, self.eo_data_dir)
+
+        def export(task):
+            task.on_cancel(exporter.cancel)
+            task.report(0, 0, "Reading the library")
+            return exporter.export(records_path, archive_path, since_last=since_last, include_text=include_text,
+                                   on_progress=lambda done, total: task.report(done, total))
+
+        task = Task("Export", export)
+        task.signals.finished.connect(lambda result: self.on_export_finished(records_path, result))
+        task.signals.failed.connect(lambda error: self.update_status_bar(f"Export failed: {error}", 0))
+        task.signals.cancelled.connect(lambda: self.update_status_bar("Export cancelled"))
+        self.submit_task(task)
+
+    def on_export_finished(self, records_path, result):
+        message = f"Exported {result.records} orders"
+        if result.files:
+            message += f" and {result.files} PDFs ({result.bytes / 1e6:.1f} MB)"
+        if result.missing:
+            message += f"; {result.missing} PDFs were missing"
+        self.update_status_bar(f"{message} to {records_path} in {result.elapsed:.1f} s", 0)
+
     def show_settings(self):
         logger.debug("showing dialog")
+        if self.task_manager.is_busy():
+            self.update_status_bar("Settings are unavailable while tasks are running.")
+            return
+        if self.dialog_settings is None:
+            self.dialog_settings = SettingsDialog(self, ini_handler=self.ini_handler)
+        else:
+            # The active library may have changed since the dialog was last shown
+            self.dialog_settings.set_fields()
         if self.dialog_settings.exec():
             logger.info("Settings dialog accepted. Updating attributes...")
             self.update_default_attributes()
-            logger.debug("Recreating ExecutiveOrderManager and downloader with updated data dir.")
-
-            # Recreate manager and downloader to pick up new paths
-            self.manager = ExecutiveOrderManager()
-            self.downloader = ExecutiveOrderDownloader(doc_dir=self.eo_data_dir, manager=self.manager)
-
-            # Load new library file if needed
+            if self.library_registry.active is not None:
+                self.library_registry.save()
+            self.update_library_combobox()
+            self.update_metrics_export()
+            logger.debug("Reloading the library from the updated data dir.")
+
+            # A new manager, store and download queue are swapped in once loading finishes.
+            # On first start __init__ loads the library itself.
+            reload = self.library_path is not None
             self.library_path = Path(self.eo_data_dir) / LIBRARY_FILE_NAME
-            self.manager.load_from_file(self.library_path)
-
-            # Repopulate listings
-            self.populate_not_downloaded_listing()
-            self.populate_downloaded_listing()
+            if reload:
+                self.load_library()
 
     # Other widget actions
 
+    # Metrics export
+    def update_metrics_export(self):
+        if self.metrics_export_path:
+            self.metrics_export_timer.start()
+        else:
+            self.metrics_export_timer.stop()
+
+    def export_metrics(self):
+        if self.metrics_export_path:
+            metrics.METRICS.export(self.metrics_export_path)
+
     # Helper methods
+    def create_library_sync(self):
+        # Called with no fetch running; the cache follows the data dir and settings
+        self.close_http_cache()
+        self.http_cache = open_http_cache(self.eo_data_dir, self.http_cache_mb)
+        client = FederalRegisterClient(self.federal_register_url, cache=self.http_cache,
+                                       ttl=self.http_cache_ttl_minutes * 60)
+        return LibrarySync(self.manager, client, self.library_store,
+                           scheduler=FetchScheduler(concurrency=self.fetch_concurrency, rate=self.fetch_rate),
+                           lock=self.manager_lock)
+
+    def close_http_cache(self):
+        if self.http_cache is not None:
+            self.http_cache.close()
+            self.http_cache = None
+
+    def close_content_store(self):
+        if self.content_store is not None:
+            self.content_store.close()
+            self.content_store = None
+
     def select_all_not_downloaded(self):
-        for i in range(self.not_downloaded_list.count()):
-            self.not_downloaded_list.item(i).setSelected(True)
+        # One range selection instead of selecting every row separately
+        self.not_downloaded_list.selectAll()
+
+    def closeEvent(self, event):
+        self.closing = True
+        self.change_timer.stop()
+        # A running download releases its queue entries as it stops
+        self.task_manager.shutdown()
+        self.export_metrics()
+        self.stop_search_index()
+        self.stop_preview_pipeline()
+        self.close_http_cache()
+        self.close_content_store()
+        for manager, store, *_ in self.loaded_libraries.values():
+            store.close()
+        super().closeEvent(event)
 
     def show_not_implemented_dialog(self):
         QMessageBox.information(self, "Not Implemented", "This feature is not yet implemented.", QMessageBox.StandardButton.Ok)
 
 
-if __name__ == "__main__":
+def main():
     app = QApplication(sys.argv)
     window = CRExecOrder()  # project_dir="/home/dave/Desktop/"
     window.show()
-    sys.exit(app.exec())
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#  dialog_export.py
+
+from PySide6.QtWidgets import (QApplication, QDialog, QVBoxLayout, QHBoxLayout, QDialogButtonBox, QLabel,
+                               QLineEdit, QPushButton, QCheckBox, QWidget, QFileDialog, QMessageBox)
+from PySide6.QtCore import QDir
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+from WrapSideSix.layouts.grid_layout import (WSGridRecord, WSGridLayoutHandler, WSGridPosition)
+from WrapConfig import INIHandler, RuntimeConfig
+
+from library_export import parquet_available
+
+RECORD_FILTERS = ["JSON Lines (*.jsonl)", "Gzipped JSON Lines (*.jsonl.gz)"]
+PARQUET_FILTER = "Parquet (*.parquet)"
+ARCHIVE_FILTERS = "Tar archive (*.tar);;Gzipped tar archive (*.tar.gz);;Zip archive (*.zip)"
+
+
+class ExportDialog(QDialog):
+    """Where and what to export; the export itself runs as a background task in the main window."""
+
+    def __init__(self, parent=None, ini_handler=None, last_export=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export Library")
+        self.setMinimumWidth(500)
+        self.ini_handler = ini_handler or INIHandler(RuntimeConfig().ini_file_name)
+        self.last_export = last_export
+
+        self.records_path = QLineEdit()
+        self.records_path.setToolTip(".parquet, .jsonl or .jsonl.gz" if parquet_available() else
+                                     ".jsonl or .jsonl.gz (Parquet needs pyarrow)")
+        self.records_browse_button = QPushButton("Browse...")
+        self.archive_check = QCheckBox("Pack the downloaded PDFs into")
+        self.archive_path = QLineEdit()
+        self.archive_path.setToolTip(".tar, .tar.gz or .zip")
+        self.archive_browse_button = QPushButton("Browse...")
+        self.include_text_check = QCheckBox("Include PDF text (from the search index or previews)")
+        self.since_last_check = QCheckBox("Only orders added or changed since the last export")
+        if last_export:
+            self.since_last_check.setToolTip(f"Last export: {last_export.get('records')} orders to "
+                                             f"{last_export.get('path')} at {last_export.get('exported_at')}")
+        else:
+            self.since_last_check.setEnabled(False)
+            self.since_last_check.setToolTip("The library has not been exported yet")
+
+        self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok |
+                                           QDialogButtonBox.StandardButton.Cancel)
+        self.button_box.button(QDialogButtonBox.StandardButton.Ok).setText("Export")
+        self.layout = QVBoxLayout()
+
+        self.init_ui()
+        self.connect_signals()
+        self.set_fields()
+
+    def init_ui(self):
+        grid_layout_handler = WSGridLayoutHandler()
+
+        main_grid_widgets = [
+            WSGridRecord(widget=QLabel("Records File"), position=WSGridPosition(row=0, column=0)),
+            WSGridRecord(widget=self.path_row(self.records_path, self.records_browse_button),
+                         position=WSGridPosition(row=0, column=1)),
+            WSGridRecord(widget=self.archive_check, position=WSGridPosition(row=1, column=0)),
+            WSGridRecord(widget=self.path_row(self.archive_path, self.archive_browse_button),
+                         position=WSGridPosition(row=1, column=1)),
+            WSGridRecord(widget=self.include_text_check, position=WSGridPosition(row=2, column=0), col_span=2),
+            WSGridRecord(widget=self.since_last_check, position=WSGridPosition(row=3, column=0), col_span=2),
+            WSGridRecord(widget=self.button_box, position=WSGridPosition(row=4, column=0), col_span=2),
+        ]
+
+        grid_layout_handler.add_widget_records(main_grid_widgets)
+        self.layout.addWidget(grid_layout_handler.as_widget())
+        self.setLayout(self.layout)
+
+    @staticmethod
+    def path_row(line_edit, button):
+        widget = QWidget()
+        layout = QHBoxLayout(widget)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(line_edit)
+        layout.addWidget(button)
+        return widget
+
+    def connect_signals(self):
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+        self.records_browse_button.clicked.connect(self.browse_records_path)
+        self.archive_browse_button.clicked.connect(self.browse_archive_path)
+        self.archive_check.toggled.connect(self.update_archive_widgets)
+
+    def set_fields(self):
+        records_path = self.ini_handler.read_value('CRExecOrder', 'export_path') or \
+            str(QDir(QDir.homePath()).filePath("executive_orders.jsonl"))
+        archive_path = self.ini_handler.read_value('CRExecOrder', 'export_archive_path') or ""
+        self.records_path.setText(records_path)
+        self.archive_path.setText(archive_path)
+        self.archive_check.setChecked(bool(archive_path))
+        self.update_archive_widgets()
+
+    def update_archive_widgets(self):
+        for widget in (self.archive_path, self.archive_browse_button):
+            widget.setEnabled(self.archive_check.isChecked())
+
+    def browse_records_path(self):
+        filters = ([PARQUET_FILTER] if parquet_available() else []) + RECORD_FILTERS
+        path, _ = QFileDialog.getSaveFileName(self, "Export Records To", self.records_path.text(), ";;".join(filters))
+        if path:
+            self.records_path.setText(path)
+
+    def browse_archive_path(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Pack PDFs Into", self.archive_path.text(), ARCHIVE_FILTERS)
+        if path:
+            self.archive_path.setText(path)
+
+    def options(self):
+        """Keyword arguments for LibraryExporter.export."""
+        return {
+            "records_path": self.records_path.text().strip(),
+            "archive_path": self.archive_path.text().strip() if self.archive_check.isChecked() else None,
+            "since_last": self.since_last_check.isChecked(),
+            "include_text": self.include_text_check.isChecked(),
+        }
+
+    def accept(self):
+        options = self.options()
+        if not options["records_path"]:
+            QMessageBox.warning(self, "Export", "Choose a file for the records.")
+            return
+        if self.archive_check.isChecked() and not options["archive_path"]:
+            QMessageBox.warning(self, "Export", "Choose a file for the PDF archive.")
+            return
+        if options["records_path"].lower().endswith(".parquet") and not parquet_available():
+            QMessageBox.warning(self, "Export", "Parquet export needs pyarrow; choose a .jsonl file instead.")
+            return
+        self.ini_handler.create_or_update_option('CRExecOrder', 'export_path', options["records_path"])
+        self.ini_handler.create_or_update_option('CRExecOrder', 'export_archive_path', options["archive_path"] or "")
+        self.ini_handler.save_changes()
+        super().accept()
+
+
+if __name__ == "__main__":
+    app = QApplication([])
+    dialog = ExportDialog()
+    if dialog.exec():
+        print(dialog.options())
+    else:
+        print("Dialog canceled")
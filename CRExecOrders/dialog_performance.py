@@ -0,0 +1,108 @@
+#  dialog_performance.py
+
+import sys
+
+from PySide6.QtWidgets import (QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                               QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PySide6.QtCore import Qt, QTimer
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import metrics
+
+REFRESH_INTERVAL_MS = 1000
+SPAN_COLUMNS = ["Span", "Count", "Mean ms", "p50 ms", "p90 ms", "p99 ms", "Max ms"]
+SPAN_KEYS = ["count", "mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms"]
+
+
+class PerformanceDialog(QDialog):
+    """Live view of the counters and timing spans in metrics.METRICS."""
+
+    def __init__(self, parent=None, registry=metrics.METRICS):
+        super().__init__(parent)
+        self.setWindowTitle("Performance")
+        self.registry = registry
+
+        layout = QVBoxLayout()
+
+        layout.addWidget(QLabel("Counters", self))
+        self.counters_table = self.create_table(["Counter", "Value"])
+        layout.addWidget(self.counters_table)
+
+        layout.addWidget(QLabel("Timing spans", self))
+        self.spans_table = self.create_table(SPAN_COLUMNS)
+        layout.addWidget(self.spans_table)
+
+        buttons = QHBoxLayout()
+        reset_button = QPushButton("Reset", self)
+        reset_button.clicked.connect(self.reset_metrics)
+        close_button = QPushButton("Close", self)
+        close_button.clicked.connect(self.close)
+        buttons.addWidget(reset_button)
+        buttons.addStretch()
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+        # Refreshed only while the dialog is visible
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_INTERVAL_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+        self.resize(700, 500)
+
+    def create_table(self, headers):
+        table = QTableWidget(0, len(headers), self)
+        table.setHorizontalHeaderLabels(headers)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        return table
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        snapshot = self.registry.snapshot()
+        counters = sorted(snapshot["counters"].items())
+        self.fill_table(self.counters_table, [[name, f"{value:,}"] for name, value in counters])
+        spans = sorted(snapshot["spans"].items())
+        self.fill_table(self.spans_table, [[name] + [self.format_value(stats.get(key)) for key in SPAN_KEYS]
+                                           for name, stats in spans])
+
+    def reset_metrics(self):
+        self.registry.reset()
+        self.refresh()
+
+    @staticmethod
+    def fill_table(table, rows):
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                table.setItem(row, column, item)
+
+    @staticmethod
+    def format_value(value):
+        if value is None:
+            return ""
+        return f"{value:,}" if isinstance(value, int) else f"{value:,.2f}"
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    with metrics.span("example"):
+        metrics.increment("example_total", 3)
+    dialog = PerformanceDialog()
+    dialog.show()
+    sys.exit(app.exec())
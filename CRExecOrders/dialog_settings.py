@@ -1,6 +1,7 @@
 #  dialog_settings.py
 
-from PySide6.QtWidgets import (QApplication, QDialog, QVBoxLayout, QDialogButtonBox, QLabel, QMessageBox)
+from PySide6.QtWidgets import (QApplication, QDialog, QVBoxLayout, QDialogButtonBox, QLabel, QMessageBox,
+                               QSpinBox, QCheckBox)
 from PySide6.QtCore import Qt, QDir
 
 import logging
@@ -13,20 +14,66 @@ from WrapSideSix.io.ws_io import WSGuiIO
 from WrapSideSix.widgets.line_edit_widget import WSLineButtonDirectory
 from WrapConfig import INIHandler, RuntimeConfig
 
-import WrapSideSix.icons.icons_mat_des
-WrapSideSix.icons.icons_mat_des.qInitResources()
+from download_engine import DEFAULT_WORKERS, MAX_WORKERS, DEFAULT_FSYNC_INTERVAL_MB, DEFAULT_BANDWIDTH_LIMIT_KB
+from fetch_scheduler import DEFAULT_CONCURRENCY, MAX_CONCURRENCY, DEFAULT_RATE, MAX_RATE
+from http_cache import DEFAULT_MAX_MB, DEFAULT_TTL_MINUTES
+from pdf_preview import DEFAULT_PREVIEW_WORKERS, MAX_PREVIEW_WORKERS
 
 
 class SettingsDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, ini_handler=None):
         super().__init__(parent)
         self.setWindowTitle("Settings")
         self.setMinimumWidth(500)
-        self.run_time = RuntimeConfig()
-        self.ini_handler = INIHandler(self.run_time.ini_file_name)
+        # The main window passes its own handler so the INI file is parsed once
+        self.ini_handler = ini_handler or INIHandler(RuntimeConfig().ini_file_name)
         self.settings_io = None
 
         self.eo_data_dir = WSLineButtonDirectory()
+        self.eo_data_dir.setToolTip("Directory of the library selected in the main window")
+        self.preview_workers = QSpinBox()
+        self.preview_workers.setRange(0, MAX_PREVIEW_WORKERS)
+        self.preview_workers.setSpecialValueText("Off")
+        self.preview_workers.setToolTip("Processes reading downloaded PDFs for the preview on the Downloaded tab\n"
+                                        "and the full-text index")
+        self.shared_store_directory = WSLineButtonDirectory()
+        self.shared_store_directory.setToolTip("Keeps one copy of each PDF for all libraries and links it into "
+                                               "them, so overlapping libraries share files. Empty: not shared.")
+        self.download_workers = QSpinBox()
+        self.download_workers.setRange(1, MAX_WORKERS)
+        self.adaptive_downloads = QCheckBox("Adjust to the connection")
+        self.adaptive_downloads.setToolTip(f"Start with Concurrent Downloads and raise or lower the number (1-{MAX_WORKERS}) "
+                                           "from the measured throughput, response times and server errors")
+        self.bandwidth_limit_kb = QSpinBox()
+        self.bandwidth_limit_kb.setRange(0, 1000000)
+        self.bandwidth_limit_kb.setSingleStep(100)
+        self.bandwidth_limit_kb.setSuffix(" KB/s")
+        self.bandwidth_limit_kb.setSpecialValueText("Unlimited")
+        self.bandwidth_limit_kb.setToolTip("Combined download rate of all PDF downloads, e.g. to leave room on a "
+                                           "shared link")
+        self.fsync_interval_mb = QSpinBox()
+        self.fsync_interval_mb.setRange(-1, 1024)
+        self.fsync_interval_mb.setSuffix(" MB")
+        self.fsync_interval_mb.setSpecialValueText("Never")
+        self.fsync_interval_mb.setToolTip("Flush downloads to disk every N MB. 0 flushes once per completed file, "
+                                          "Never leaves it to the operating system.")
+        self.fetch_concurrency = QSpinBox()
+        self.fetch_concurrency.setRange(1, MAX_CONCURRENCY)
+        self.fetch_rate = QSpinBox()
+        self.fetch_rate.setRange(1, MAX_RATE)
+        self.fetch_rate.setSuffix(" per second")
+        self.fetch_rate.setToolTip("Most list requests sent to the Federal Register per second, by all concurrent "
+                                   "fetches together. Cached pages do not count.")
+        self.http_cache_mb = QSpinBox()
+        self.http_cache_mb.setRange(0, 4096)
+        self.http_cache_mb.setSuffix(" MB")
+        self.http_cache_mb.setSpecialValueText("Off")
+        self.http_cache_mb.setToolTip("Disk space for cached Federal Register list pages")
+        self.http_cache_ttl_minutes = QSpinBox()
+        self.http_cache_ttl_minutes.setRange(0, 7 * 24 * 60)
+        self.http_cache_ttl_minutes.setSuffix(" min")
+        self.http_cache_ttl_minutes.setToolTip("How long the current year's cached pages are used before asking the "
+                                               "server whether they changed. Past years are cached for a year.")
 
         self.project_dir = QDir.homePath()
 
@@ -45,7 +92,28 @@ class SettingsDialog(QDialog):
             WSGridRecord(widget=QLabel("Required fields"), position=WSGridPosition(row=0, column=0), alignment=Qt.AlignmentFlag.AlignLeft),
             WSGridRecord(widget=QLabel("Executive Order Directory"), position=WSGridPosition(row=6, column=0)),
             WSGridRecord(widget=self.eo_data_dir, position=WSGridPosition(row=6, column=1)),
-            WSGridRecord(widget=self.button_box, position=WSGridPosition(row=10, column=0), col_span=2),
+            WSGridRecord(widget=QLabel("Optional fields"), position=WSGridPosition(row=7, column=0), alignment=Qt.AlignmentFlag.AlignLeft),
+            WSGridRecord(widget=QLabel("Concurrent Downloads"), position=WSGridPosition(row=8, column=0)),
+            WSGridRecord(widget=self.download_workers, position=WSGridPosition(row=8, column=1)),
+            WSGridRecord(widget=QLabel("Concurrent List Fetches"), position=WSGridPosition(row=9, column=0)),
+            WSGridRecord(widget=self.fetch_concurrency, position=WSGridPosition(row=9, column=1)),
+            WSGridRecord(widget=QLabel("List Request Rate"), position=WSGridPosition(row=10, column=0)),
+            WSGridRecord(widget=self.fetch_rate, position=WSGridPosition(row=10, column=1)),
+            WSGridRecord(widget=QLabel("Flush Downloads to Disk Every"), position=WSGridPosition(row=11, column=0)),
+            WSGridRecord(widget=self.fsync_interval_mb, position=WSGridPosition(row=11, column=1)),
+            WSGridRecord(widget=QLabel("List Cache Size"), position=WSGridPosition(row=12, column=0)),
+            WSGridRecord(widget=self.http_cache_mb, position=WSGridPosition(row=12, column=1)),
+            WSGridRecord(widget=QLabel("List Cache Lifetime (Current Year)"), position=WSGridPosition(row=13, column=0)),
+            WSGridRecord(widget=self.http_cache_ttl_minutes, position=WSGridPosition(row=13, column=1)),
+            WSGridRecord(widget=QLabel("Shared PDF Store"), position=WSGridPosition(row=14, column=0)),
+            WSGridRecord(widget=self.shared_store_directory, position=WSGridPosition(row=14, column=1)),
+            WSGridRecord(widget=QLabel("Preview Workers"), position=WSGridPosition(row=15, column=0)),
+            WSGridRecord(widget=self.preview_workers, position=WSGridPosition(row=15, column=1)),
+            WSGridRecord(widget=QLabel("Adaptive Concurrency"), position=WSGridPosition(row=16, column=0)),
+            WSGridRecord(widget=self.adaptive_downloads, position=WSGridPosition(row=16, column=1)),
+            WSGridRecord(widget=QLabel("Download Bandwidth Limit"), position=WSGridPosition(row=17, column=0)),
+            WSGridRecord(widget=self.bandwidth_limit_kb, position=WSGridPosition(row=17, column=1)),
+            WSGridRecord(widget=self.button_box, position=WSGridPosition(row=18, column=0), col_span=2),
             ]
 
         grid_layout_handler.add_widget_records(main_grid_widgets)
@@ -59,6 +127,16 @@ class SettingsDialog(QDialog):
     def set_fields(self):
         try:
             eo_data_dir = self.ini_handler.read_value('CRExecOrder', 'exec_ord_directory') or self.project_dir
+            download_workers = int(self.ini_handler.read_value('CRExecOrder', 'download_workers') or DEFAULT_WORKERS)
+            fetch_concurrency = int(self.ini_handler.read_value('CRExecOrder', 'fetch_concurrency') or DEFAULT_CONCURRENCY)
+            fetch_rate = int(self.ini_handler.read_value('CRExecOrder', 'fetch_rate') or DEFAULT_RATE)
+            fsync_interval_mb = int(self.ini_handler.read_value('CRExecOrder', 'fsync_interval_mb') or DEFAULT_FSYNC_INTERVAL_MB)
+            http_cache_mb = int(self.ini_handler.read_value('CRExecOrder', 'http_cache_mb') or DEFAULT_MAX_MB)
+            http_cache_ttl_minutes = int(self.ini_handler.read_value('CRExecOrder', 'http_cache_ttl_minutes') or DEFAULT_TTL_MINUTES)
+            preview_workers = int(self.ini_handler.read_value('CRExecOrder', 'preview_workers') or DEFAULT_PREVIEW_WORKERS)
+            shared_store_directory = self.ini_handler.read_value('CRExecOrder', 'shared_store_directory') or ""
+            adaptive_downloads = bool(int(self.ini_handler.read_value('CRExecOrder', 'adaptive_downloads') or 1))
+            bandwidth_limit_kb = int(self.ini_handler.read_value('CRExecOrder', 'bandwidth_limit_kb') or DEFAULT_BANDWIDTH_LIMIT_KB)
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to read settings: {e}")
@@ -69,9 +147,29 @@ class SettingsDialog(QDialog):
 
         widget_mapping = {
             'exec_ord_directory': self.eo_data_dir,
+            'download_workers': self.download_workers,
+            'fetch_concurrency': self.fetch_concurrency,
+            'fetch_rate': self.fetch_rate,
+            'fsync_interval_mb': self.fsync_interval_mb,
+            'http_cache_mb': self.http_cache_mb,
+            'http_cache_ttl_minutes': self.http_cache_ttl_minutes,
+            'shared_store_directory': self.shared_store_directory,
+            'preview_workers': self.preview_workers,
+            'adaptive_downloads': self.adaptive_downloads,
+            'bandwidth_limit_kb': self.bandwidth_limit_kb,
         }
         dialog_values = {
             'exec_ord_directory': eo_data_dir,
+            'download_workers': download_workers,
+            'fetch_concurrency': fetch_concurrency,
+            'fetch_rate': fetch_rate,
+            'fsync_interval_mb': fsync_interval_mb,
+            'http_cache_mb': http_cache_mb,
+            'http_cache_ttl_minutes': http_cache_ttl_minutes,
+            'shared_store_directory': shared_store_directory,
+            'preview_workers': preview_workers,
+            'adaptive_downloads': adaptive_downloads,
+            'bandwidth_limit_kb': bandwidth_limit_kb,
         }
         self.settings_io = WSGuiIO(widget_mapping, dialog_values)
         self.settings_io.set_gui()
@@ -81,6 +179,16 @@ class SettingsDialog(QDialog):
             updated_settings = self.settings_io.get_gui()
             # Retrieve the model name from the combo box's item data.
             self.ini_handler.create_or_update_option('CRExecOrder', 'exec_ord_directory', updated_settings['exec_ord_directory'])
+            self.ini_handler.create_or_update_option('CRExecOrder', 'download_workers', str(updated_settings['download_workers']))
+            self.ini_handler.create_or_update_option('CRExecOrder', 'fetch_concurrency', str(updated_settings['fetch_concurrency']))
+            self.ini_handler.create_or_update_option('CRExecOrder', 'fetch_rate', str(updated_settings['fetch_rate']))
+            self.ini_handler.create_or_update_option('CRExecOrder', 'fsync_interval_mb', str(updated_settings['fsync_interval_mb']))
+            self.ini_handler.create_or_update_option('CRExecOrder', 'http_cache_mb', str(updated_settings['http_cache_mb']))
+            self.ini_handler.create_or_update_option('CRExecOrder', 'http_cache_ttl_minutes', str(updated_settings['http_cache_ttl_minutes']))
+            self.ini_handler.create_or_update_option('CRExecOrder', 'shared_store_directory', updated_settings['shared_store_directory'])
+            self.ini_handler.create_or_update_option('CRExecOrder', 'preview_workers', str(updated_settings['preview_workers']))
+            self.ini_handler.create_or_update_option('CRExecOrder', 'adaptive_downloads', str(int(updated_settings['adaptive_downloads'])))
+            self.ini_handler.create_or_update_option('CRExecOrder', 'bandwidth_limit_kb', str(updated_settings['bandwidth_limit_kb']))
 
             self.ini_handler.save_changes()
             return True
@@ -96,6 +204,9 @@ class SettingsDialog(QDialog):
 
 
 if __name__ == "__main__":
+    import WrapSideSix.icons.icons_mat_des
+    WrapSideSix.icons.icons_mat_des.qInitResources()
+
     app = QApplication([])
     dialog = SettingsDialog()
     if dialog.exec():
@@ -0,0 +1,187 @@
+#  directory_reconciler.py
+
+"""
+Keeps the library's downloaded flags in step with the files in eo_data_dir.
+
+PDFs may be added, replaced or removed behind the program's back (rsync,
+another machine, a file manager). Instead of stat-ing the expected file of
+every order, a reconcile lists the directory once with os.scandir and
+compares the result with the directory index kept in the library store
+({file name: (size, mtime)} as of the last reconcile) and with the
+downloaded flags:
+
+- a PDF of an order not marked downloaded is taken as downloaded (found),
+- an order marked downloaded whose PDF is gone is no longer (missing),
+- a PDF whose size or mtime changed and whose content no longer matches the
+  recorded hash loses it (changed), so it is verified again before it is
+  trusted. Only these files are hashed; a file rewritten with the same
+  content (e.g. downloaded again by this program or the CLI) is left alone.
+
+Only those orders are updated in the manager and saved; the caller moves the
+same orders between its lists. A file another process using the library has
+already recorded (e.g. downloaded by crlibrary-cli, with its hash) is left as
+that process saved it and not reported: the change feed brings its row. The GUI runs a reconcile when the library
+opens and whenever its QFileSystemWatcher reports the directory changed.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import library_records
+from file_integrity import looks_like_complete_pdf, sha256_file
+
+PDF_SUFFIX = ".pdf"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directory_index (
+    file_name   TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL
+);
+"""
+
+
+@dataclass
+class ReconcileResult:
+    found: list = field(default_factory=list)       # doc_ids now downloaded
+    missing: list = field(default_factory=list)     # doc_ids no longer downloaded
+    changed: list = field(default_factory=list)     # doc_ids whose file was replaced
+    files: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def doc_ids(self):
+        return self.found + self.missing + self.changed
+
+
+def scan_directory(directory):
+    """{file_name: (size, mtime_ns)} of the PDFs directly in directory, from one scandir pass."""
+    index = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            if not name.endswith(PDF_SUFFIX):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                # Removed while scanning
+                continue
+            index[name] = (stat.st_size, stat.st_mtime_ns)
+    return index
+
+
+class DirectoryReconciler:
+    def __init__(self, manager, store, directory, lock=None):
+        """lock: held while the manager is updated; share it with other threads changing the records."""
+        self.manager = manager
+        self.store = store
+        self.directory = Path(directory)
+        self.lock = lock or threading.RLock()
+        self.index = None
+        self.file_map = {}
+        self.file_map_size = -1
+        with store.lock:
+            store.connection.executescript(SCHEMA)
+
+    def load_index(self):
+        with self.store.lock:
+            rows = self.store.connection.execute("SELECT file_name, size, mtime_ns FROM directory_index").fetchall()
+        return {name: (size, mtime_ns) for name, size, mtime_ns in rows}
+
+    def file_names(self):
+        """{file_name: doc_id}, rebuilt when the number of documents changed (e.g. after a fetch)."""
+        documents = self.manager.executive_orders
+        if len(documents) != self.file_map_size:
+            get_file_name = self.manager.get_file_name
+            self.file_map = {get_file_name(doc_id): doc_id for doc_id in documents}
+            self.file_map.pop("Unknown", None)
+            self.file_map_size = len(documents)
+        return self.file_map
+
+    def reconcile(self):
+        """Scan the directory and apply the differences to the manager and the store; returns a ReconcileResult."""
+        started = time.perf_counter()
+        if self.index is None:
+            self.index = self.load_index()
+        current = scan_directory(self.directory)
+        result = ReconcileResult(files=len(current))
+        with self.lock:
+            documents = self.manager.executive_orders
+            # doc_id: (the ReconcileResult list it goes to, size), decided before anything is changed
+            differences = {}
+            for name, doc_id in self.file_names().items():
+                details = documents.get(doc_id)
+                if details is None:
+                    continue
+                stat = current.get(name)
+                downloaded = details.get(library_records.DOWNLOADED_FIELD)
+                if stat is None:
+                    if downloaded:
+                        differences[doc_id] = (result.missing, None)
+                elif not downloaded:
+                    if looks_like_complete_pdf(self.directory / name):
+                        differences[doc_id] = (result.found, stat[0])
+                elif name in self.index and self.index[name] != stat and not self.unchanged(details, name, stat):
+                    differences[doc_id] = (result.changed, stat[0])
+
+            # Rows another process has recorded the same way already reach the manager through the change feed
+            for doc_id, row in self.store.changed_rows(differences).items():
+                if self.recorded(row, current.get(self.manager.get_file_name(doc_id))):
+                    del differences[doc_id]
+
+            updated = {}
+            for doc_id, (doc_ids, size) in differences.items():
+                if doc_ids is result.missing:
+                    updated[doc_id] = library_records.record_file_missing(self.manager, doc_id)
+                else:
+                    updated[doc_id] = library_records.record_file_found(self.manager, doc_id, size,
+                                                                        changed=doc_ids is result.changed)
+                doc_ids.append(doc_id)
+            if updated:
+                self.store.save(documents=updated, fields=library_records.FILE_STATE_FIELDS)
+        self.save_index(current)
+        result.elapsed = time.perf_counter() - started
+        if updated:
+            logger.info(f"Reconciled {self.directory}: {len(result.found)} found, {len(result.missing)} missing, "
+                        f"{len(result.changed)} changed ({result.elapsed * 1000:.0f} ms)")
+        return result
+
+    @staticmethod
+    def recorded(row, stat):
+        """True if a row saved by another process already describes the file as found (or its absence)."""
+        if stat is None:
+            return not row.get(library_records.DOWNLOADED_FIELD)
+        return bool(row.get(library_records.DOWNLOADED_FIELD)) and row.get(library_records.FILE_SIZE_FIELD) == stat[0]
+
+    def unchanged(self, details, name, stat):
+        """True if the file still has the recorded size and SHA-256."""
+        sha256 = details.get(library_records.SHA256_FIELD)
+        if not sha256 or details.get(library_records.FILE_SIZE_FIELD) != stat[0]:
+            return False
+        try:
+            return sha256_file(self.directory / name).hexdigest() == sha256
+        except OSError:
+            return False
+
+    def save_index(self, current):
+        """Write only the entries that differ from the stored index."""
+        previous = self.index
+        changed = [(name, size, mtime_ns) for name, (size, mtime_ns) in current.items()
+                   if previous.get(name) != (size, mtime_ns)]
+        removed = [(name,) for name in previous.keys() - current.keys()]
+        if changed or removed:
+            with self.store.lock, self.store.transaction() as connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO directory_index (file_name, size, mtime_ns) VALUES (?, ?, ?)", changed)
+                connection.executemany("DELETE FROM directory_index WHERE file_name=?", removed)
+        self.index = current
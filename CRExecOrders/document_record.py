@@ -0,0 +1,157 @@
+#  document_record.py
+
+"""
+Compact per-document record.
+
+DocumentRecord stores the fields every executive order has in __slots__
+instead of a per-document dict, shares repeated values (publication and
+signing dates, the president) between records and derives the default PDF
+file name instead of storing it. It is a MutableMapping, so the manager and
+everything else that reads details with details['title'] or details.get()
+keeps working; fields outside the known set go to a small per-record dict.
+"""
+
+import sys
+from collections.abc import MutableMapping
+
+FIELDS = (
+    "document_number",
+    "executive_order_number",
+    "title",
+    "signing_date",
+    "publication_date",
+    "pdf_url",
+    "html_url",
+    "citation",
+    "president",
+    "downloaded",
+    "file_name",
+    "file_size",
+    "sha256",
+    "etag",
+    "last_modified",
+)
+FIELD_SET = frozenset(FIELDS)
+INTERNED_FIELDS = frozenset({"signing_date", "publication_date", "last_modified"})
+
+_UNSET = object()
+_shared_values = {}
+
+
+def shared_value(value):
+    """One shared object for equal small dicts (e.g. the president); the records never mutate it."""
+    try:
+        key = tuple(sorted(value.items()))
+        return _shared_values.setdefault(key, value)
+    except TypeError:
+        return value
+
+
+class DocumentRecord(MutableMapping):
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, details=None, **fields):
+        self.extra = None
+        if fields:
+            details = {**(details or {}), **fields}
+        if not details:
+            return
+        # Inlined __setitem__: this runs for every field of every record on load
+        intern = sys.intern
+        for key, value in details.items():
+            if key in INTERNED_FIELDS and type(value) is str:
+                setattr(self, key, intern(value))
+            elif key == "president" and type(value) is dict:
+                setattr(self, key, shared_value(value))
+            elif key in FIELD_SET and key != "file_name":
+                setattr(self, key, value)
+            elif key != "file_name":
+                self[key] = value
+        if "file_name" in details:
+            # Last, so the default name derived from document_number is recognized
+            self["file_name"] = details["file_name"]
+
+    @classmethod
+    def from_mapping(cls, details):
+        return details if isinstance(details, cls) else cls(details)
+
+    def default_file_name(self):
+        document_number = getattr(self, "document_number", None)
+        return f"{document_number}.pdf" if document_number else _UNSET
+
+    # Mapping interface
+    def __getitem__(self, key):
+        if key in FIELD_SET:
+            value = getattr(self, key, _UNSET)
+            if value is _UNSET and key == "file_name":
+                value = self.default_file_name()
+            if value is _UNSET:
+                raise KeyError(key)
+            return value
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key not in FIELD_SET:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+            return
+        if key in INTERNED_FIELDS and type(value) is str:
+            value = sys.intern(value)
+        elif key == "president" and isinstance(value, dict):
+            value = shared_value(value)
+        elif key == "file_name" and value == self.default_file_name():
+            # Derived on read
+            if hasattr(self, "file_name"):
+                delattr(self, "file_name")
+            return
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key in FIELD_SET:
+            if key == "file_name" and not hasattr(self, key) and self.default_file_name() is not _UNSET:
+                # Keep reads consistent: an explicit None now overrides the derived name
+                self.file_name = None
+                return
+            if not hasattr(self, key):
+                raise KeyError(key)
+            delattr(self, key)
+        elif self.extra is not None and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for key in FIELDS:
+            if key in self:
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def get(self, key, default=None):
+        # Faster than the Mapping mixin, which goes through __getitem__ and KeyError
+        if key in FIELD_SET:
+            value = getattr(self, key, _UNSET)
+            if value is _UNSET and key == "file_name":
+                value = self.default_file_name()
+            return default if value is _UNSET else value
+        return default if self.extra is None else self.extra.get(key, default)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        if key in FIELD_SET:
+            return hasattr(self, key) or (key == "file_name" and self.default_file_name() is not _UNSET)
+        return self.extra is not None and key in self.extra
+
+    def __repr__(self):
+        return f"DocumentRecord({dict(self)!r})"
+
+    def copy(self):
+        return DocumentRecord(self)
+
+    def to_dict(self):
+        return dict(self)
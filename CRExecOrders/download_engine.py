@@ -0,0 +1,391 @@
+#  download_engine.py
+
+"""
+Concurrent PDF download engine.
+
+Pure Python (no Qt) so it can be driven from the GUI worker thread as well as
+from scripts. Each worker thread keeps its own requests.Session, so connections
+to the Federal Register host are reused across files instead of being reopened
+for every order.
+
+Files are written to <name>.part and only renamed to their final name once the
+transfer is complete and the result looks like a whole PDF. An interrupted
+transfer leaves the .part file behind and the next attempt resumes it with a
+Range request, guarded by If-Range so a changed file is fetched anew. A file
+already present under its final name is verified against the recorded size
+and SHA-256 (or, without a record, checked for a PDF trailer) and skipped
+instead of being downloaded again.
+
+Bodies are streamed in CHUNK_SIZE pieces, so memory stays flat however large
+the PDFs and however many workers run. fsync_interval controls how the data
+reaches the disk: every fsync_interval bytes and before the rename (0: only
+before the rename, None: left to the operating system).
+
+With adaptive=True the number of transfers is not fixed: it starts at workers
+and an AimdLimiter (see adaptive_concurrency.py) raises or lowers it between
+1 and MAX_WORKERS from the observed throughput, response times and errors.
+bandwidth_limit (bytes/s) caps the combined transfer rate of all workers with
+a shared token bucket, so a backfill can run on a shared link without
+saturating it.
+
+With a content_store (see content_store.py), an order some library already
+has is linked from the shared store instead of downloaded, and every verified
+file is added to the store for the other libraries.
+"""
+
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import metrics
+from adaptive_concurrency import AimdLimiter
+from rate_limit import TokenBucket
+from file_integrity import (FileInfo, part_path, sha256_file, looks_like_complete_pdf,
+                            read_part_meta, write_part_meta, discard_part, fsync_directory)
+
+DEFAULT_WORKERS = 4
+MAX_WORKERS = 16
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+DEFAULT_TIMEOUT = 60
+CHUNK_SIZE = 64 * 1024
+DEFAULT_FSYNC_INTERVAL_MB = 0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+USER_AGENT = "CRExecOrders"
+DEFAULT_BANDWIDTH_LIMIT_KB = 0      # KB/s, 0: unlimited
+BANDWIDTH_BURST = 0.25              # seconds of transfer the bandwidth cap lets through at once
+
+
+class DownloadError(Exception):
+    pass
+
+
+class RetryableDownloadError(DownloadError):
+    def __init__(self, message, retry_after=None, overload=True):
+        """overload: the failure suggests the server or the link is overloaded (lowers adaptive concurrency)."""
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.overload = overload
+
+
+class DownloadCancelled(DownloadError):
+    pass
+
+
+@dataclass
+class DownloadJob:
+    doc_id: str
+    url: str
+    path: Path
+    size: int = None        # recorded size and hash of a previous verified download
+    sha256: str = None
+
+
+@dataclass
+class DownloadSummary:
+    succeeded: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    cancelled: bool = False
+
+
+def fsync_interval_from_mb(megabytes=DEFAULT_FSYNC_INTERVAL_MB):
+    """fsync_interval for the 'fsync_interval_mb' setting: negative turns fsync off."""
+    return None if megabytes < 0 else int(megabytes) * 1024 * 1024
+
+
+def bandwidth_limit_from_kb(kilobytes=DEFAULT_BANDWIDTH_LIMIT_KB):
+    """bandwidth_limit for the 'bandwidth_limit_kb' setting (KB/s): 0 or less is unlimited."""
+    return int(kilobytes) * 1024 if kilobytes > 0 else None
+
+
+class DownloadEngine:
+    def __init__(self, workers=DEFAULT_WORKERS, max_retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, timeout=DEFAULT_TIMEOUT, fsync_interval=0, content_store=None,
+                 adaptive=False, bandwidth_limit=None, on_concurrency_change=None):
+        """on_concurrency_change(limit, reason) is called from a worker thread when adaptive changes the limit."""
+        self.workers = max(1, min(int(workers), MAX_WORKERS))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.fsync_interval = fsync_interval
+        self.content_store = content_store
+        self.limiter = AimdLimiter(self.workers, maximum=MAX_WORKERS,
+                                   on_change=on_concurrency_change) if adaptive else None
+        self.bandwidth_limit = bandwidth_limit
+        self.bandwidth = TokenBucket(bandwidth_limit, max(bandwidth_limit * BANDWIDTH_BURST, CHUNK_SIZE)) \
+            if bandwidth_limit else None
+        self.cancel_event = threading.Event()
+        self._local = threading.local()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def concurrency(self):
+        """Transfers allowed at once right now."""
+        return self.limiter.limit if self.limiter is not None else self.workers
+
+    def run(self, jobs, on_progress=None, on_finished=None):
+        """
+        Download all jobs with the worker pool and return a DownloadSummary.
+
+        jobs may be any iterable, e.g. a generator reading a queue: it is
+        consumed lazily, one job per free worker, so it can decide on the next
+        job as late as possible. on_progress(doc_id, bytes_received,
+        bytes_total) and on_finished(doc_id, ok, error_message, file_info) are
+        called from worker threads; file_info is the FileInfo of the verified
+        file, or None. Jobs repeating a doc_id or target path are dropped.
+        """
+        summary = DownloadSummary()
+        pending = self.unique_jobs(jobs)
+        if hasattr(jobs, "__len__"):
+            logger.info(f"Downloading {len(jobs)} files with {self.workers} workers"
+                        f"{' to start with' if self.limiter else ''}")
+        # Adaptive: threads for the most transfers the limiter may allow; it decides how many are used
+        pool_size = self.limiter.maximum if self.limiter is not None else self.workers
+        with ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="eo-download") as pool:
+            futures = {}
+
+            def submit_next():
+                if self.cancel_event.is_set():
+                    return False
+                job = next(pending, None)
+                if job is None:
+                    return False
+                futures[pool.submit(self._download_with_retry, job, on_progress)] = job
+                return True
+
+            while len(futures) < self.concurrency() and submit_next():
+                pass
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = futures.pop(future)
+                    self._finish(job, future, summary, on_finished)
+                # Fewer than finished if the limit went down, more if it went up
+                while len(futures) < self.concurrency() and submit_next():
+                    pass
+
+        summary.cancelled = summary.cancelled or self.cancel_event.is_set()
+        return summary
+
+    def _finish(self, job, future, summary, on_finished):
+        try:
+            info = future.result()
+        except DownloadCancelled:
+            summary.cancelled = True
+            return
+        except Exception as e:
+            logger.error(f"Failed to download {job.doc_id}: {e}")
+            metrics.increment("downloads_failed_total")
+            summary.failed[job.doc_id] = str(e)
+            if on_finished:
+                on_finished(job.doc_id, False, str(e), None)
+            return
+        (summary.skipped if info.skipped else summary.succeeded).append(job.doc_id)
+        metrics.increment("downloads_skipped_total" if info.skipped else "downloads_succeeded_total")
+        if info.resumed:
+            metrics.increment("downloads_resumed_total")
+        if info.linked:
+            metrics.increment("downloads_linked_total")
+        if on_finished:
+            on_finished(job.doc_id, True, "", info)
+
+    @staticmethod
+    def unique_jobs(jobs):
+        seen = set()
+        for job in jobs:
+            path = os.path.normcase(os.path.abspath(job.path))
+            if job.doc_id in seen or path in seen:
+                logger.info(f"Skipping duplicate download job for {job.doc_id}")
+                continue
+            seen.update((job.doc_id, path))
+            yield job
+
+    # Worker helpers
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._local.session = session
+        return session
+
+    def _download_with_retry(self, job, on_progress):
+        # Per-file latency, retries and backoff included
+        with metrics.span("download_file"):
+            return self._download_with_attempts(job, on_progress)
+
+    def _download_with_attempts(self, job, on_progress):
+        attempt = 0
+        while True:
+            if self.cancel_event.is_set():
+                raise DownloadCancelled(job.doc_id)
+            try:
+                return self._download(job, on_progress)
+            except (RetryableDownloadError, requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise DownloadError(f"giving up after {self.max_retries} retries: {e}") from e
+                metrics.increment("download_retries_total")
+                if self.limiter is not None and getattr(e, "overload", True):
+                    self.limiter.record_error()
+                delay = getattr(e, "retry_after", None) or self.backoff * (2 ** (attempt - 1))
+                delay += random.uniform(0, self.backoff / 2)
+                logger.warning(f"Retrying {job.doc_id} in {delay:.1f}s (attempt {attempt}): {e}")
+                if self.cancel_event.wait(delay):
+                    raise DownloadCancelled(job.doc_id)
+
+    def _download(self, job, on_progress):
+        info = self.verify_existing(job)
+        if info is None and self.content_store is not None:
+            info = self.content_store.materialize(job)
+        if info is not None:
+            return self.share(job, info)
+
+        part = part_path(job.path)
+        offset = part.stat().st_size if part.exists() else 0
+        validators = read_part_meta(job.path) if offset else {}
+        validator = validators.get("etag") or validators.get("last_modified")
+        headers = {}
+        if offset and validator and validators.get("url") == job.url:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+        elif offset:
+            # Nothing to prove the partial file belongs to the current version
+            discard_part(job.path)
+            offset = 0
+
+        metrics.increment("download_requests_total")
+        requested = time.monotonic()
+        response = self._session().get(job.url, headers=headers, stream=True, timeout=self.timeout)
+        if self.limiter is not None:
+            self.limiter.record_latency(time.monotonic() - requested)
+        with response:
+            if response.status_code in RETRY_STATUS_CODES:
+                raise RetryableDownloadError(f"HTTP {response.status_code}",
+                                             retry_after=parse_retry_after(response.headers.get("Retry-After")))
+            if response.status_code == 416:
+                discard_part(job.path)
+                raise RetryableDownloadError(f"HTTP 416, restarting {job.doc_id} from scratch", retry_after=0,
+                                             overload=False)
+            if response.status_code == 206 and offset and content_range_start(response) == offset:
+                hasher = sha256_file(part)
+                mode = "ab"
+            elif response.status_code == 200:
+                hasher = hashlib.sha256()
+                offset = 0
+                mode = "wb"
+            else:
+                raise DownloadError(f"HTTP {response.status_code} for {job.url}")
+
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            length = int(response.headers.get("Content-Length") or 0)
+            total = offset + length if length else 0
+            received = offset
+            job.path.parent.mkdir(parents=True, exist_ok=True)
+            if mode == "wb":
+                write_part_meta(job.path, {"url": job.url, "etag": etag, "last_modified": last_modified})
+            unsynced = 0
+            with open(part, mode) as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if self.cancel_event.is_set():
+                        raise DownloadCancelled(job.doc_id)
+                    if self.bandwidth is not None and not self.bandwidth.acquire(len(chunk), self.cancel_event):
+                        raise DownloadCancelled(job.doc_id)
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    received += len(chunk)
+                    unsynced += len(chunk)
+                    metrics.increment("download_bytes_total", len(chunk))
+                    if self.limiter is not None:
+                        self.limiter.record_bytes(len(chunk))
+                    if self.fsync_interval and unsynced >= self.fsync_interval:
+                        self.fsync(f)
+                        unsynced = 0
+                    if on_progress:
+                        on_progress(job.doc_id, received, total)
+                if self.fsync_interval is not None and unsynced:
+                    # Also before a retry, so the resumed part is on disk
+                    self.fsync(f)
+
+        if total and received != total:
+            # Keep the .part file: the next attempt resumes from where this one stopped
+            raise RetryableDownloadError(f"incomplete transfer ({received} of {total} bytes)")
+        if not looks_like_complete_pdf(part):
+            discard_part(job.path)
+            raise DownloadError(f"{job.url} did not return a complete PDF")
+
+        os.replace(part, job.path)
+        if self.fsync_interval is not None:
+            fsync_directory(job.path.parent)
+        discard_part(job.path)
+        return self.share(job, FileInfo(size=received, sha256=hasher.hexdigest(), etag=etag,
+                                        last_modified=last_modified, resumed=mode == "ab"))
+
+    def share(self, job, info):
+        """Add a verified file to the shared store, if there is one; returns info."""
+        if self.content_store is not None and not info.linked:
+            self.content_store.add(job.doc_id, job.path, info)
+        return info
+
+    @staticmethod
+    def fsync(f):
+        f.flush()
+        os.fsync(f.fileno())
+        metrics.increment("download_fsyncs_total")
+
+    def verify_existing(self, job):
+        """FileInfo for a valid file already at job.path, or None (after removing a corrupt one)."""
+        try:
+            size = job.path.stat().st_size
+        except OSError:
+            return None
+
+        if job.sha256:
+            if size == job.size and sha256_file(job.path).hexdigest() == job.sha256:
+                logger.debug(f"{job.doc_id} already downloaded and verified")
+                return FileInfo(size=size, sha256=job.sha256, skipped=True)
+            logger.warning(f"{job.path} does not match its recorded hash, downloading again")
+        elif looks_like_complete_pdf(job.path):
+            logger.debug(f"{job.doc_id} already on disk, recording its hash")
+            return FileInfo(size=size, sha256=sha256_file(job.path).hexdigest(), skipped=True)
+        else:
+            logger.warning(f"{job.path} is truncated or not a PDF, downloading again")
+        job.path.unlink(missing_ok=True)
+        return None
+
+
+def content_range_start(response):
+    """First byte position of a 'Content-Range: bytes start-end/total' header, or None."""
+    value = response.headers.get("Content-Range", "")
+    try:
+        unit, _, byte_range = value.partition(" ")
+        return int(byte_range.split("-", 1)[0]) if unit == "bytes" else None
+    except ValueError:
+        return None
+
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds form only), or None."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,221 @@
+#  download_queue.py
+
+"""
+Durable download queue, kept in the library store next to the documents.
+
+Queued downloads survive restarts: each row holds everything needed to
+download and verify the file (url, target path and any recorded size and
+SHA-256), its priority and the order it was queued in, so a long backfill
+continues in a later session without building the job list again. jobs() hands out the highest priority entry first and
+reads the table as it goes, so entries queued during a run (e.g. an explicit
+selection while "All" is downloading) are picked up next. Entries queued
+after jobs() ran dry are left for the next run: available() tells whether
+there are any. An entry leaves the queue when its file is downloaded, or after
+MAX_QUEUE_ATTEMPTS failures.
+
+The GUI and crlibrary-cli may work through the same queue at once: handing
+out a job claims its entry for this queue object, other processes skip
+claimed entries, and the claims are released when the consumer stops (or
+taken over after CLAIM_TIMEOUT, if the process holding them died). So no file
+is downloaded twice into the same .part file.
+
+The GUI thread never writes the queue: submit() hands jobs to the thread
+working through it, which adds them before its next claim, and count() and
+available() read without waiting for a save in progress.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+from download_engine import DownloadJob
+
+PRIORITY_ALL = 0
+PRIORITY_SELECTION = 100
+MAX_QUEUE_ATTEMPTS = 3
+PAUSED_KEY = "download_queue_paused"
+PEEK_SIZE = 64
+CLAIM_TIMEOUT = 900.0           # seconds before a claim of a vanished process is taken over
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS download_queue (
+    doc_id      TEXT PRIMARY KEY,
+    url         TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    size        INTEGER,
+    sha256      TEXT,
+    priority    INTEGER NOT NULL,
+    seq         INTEGER NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    last_error  TEXT,
+    claimed_by  TEXT,
+    claimed_at  REAL
+);
+CREATE INDEX IF NOT EXISTS download_queue_order ON download_queue (priority DESC, seq);
+"""
+# Added to queues created before claims
+CLAIM_COLUMNS = {"claimed_by": "TEXT", "claimed_at": "REAL"}
+
+
+class DownloadQueue:
+    def __init__(self, store):
+        self.store = store
+        self.pause_event = threading.Event()
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        # (jobs, priority) submitted and not added yet
+        self.submitted = []
+        self.submitted_lock = threading.Lock()
+        with store.lock:
+            store.connection.executescript(SCHEMA)
+            columns = {row[1] for row in store.connection.execute("PRAGMA table_info(download_queue)")}
+            for name, column_type in CLAIM_COLUMNS.items():
+                if name not in columns:
+                    store.connection.execute(f"ALTER TABLE download_queue ADD COLUMN {name} {column_type}")
+        if store.get_meta(PAUSED_KEY, False):
+            self.pause_event.set()
+
+    # Queueing
+    def add(self, jobs, priority=PRIORITY_ALL):
+        """
+        Queue DownloadJobs in the given order behind everything of the same
+        priority. A job already queued keeps its place unless the new priority
+        is higher. Returns the number of entries new to the queue.
+        """
+        jobs = list(jobs)
+        with self.store.lock, self.store.transaction() as connection:
+            before = connection.execute("SELECT COUNT(*) FROM download_queue").fetchone()[0]
+            start = connection.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM download_queue").fetchone()[0]
+            connection.executemany(
+                "INSERT INTO download_queue (doc_id, url, path, size, sha256, priority, seq) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(doc_id) DO UPDATE SET url=excluded.url, path=excluded.path, "
+                "size=excluded.size, sha256=excluded.sha256, "
+                "seq=CASE WHEN excluded.priority > priority THEN excluded.seq ELSE seq END, "
+                "priority=MAX(priority, excluded.priority)",
+                ((job.doc_id, job.url, str(job.path), job.size, job.sha256, priority, start + index)
+                 for index, job in enumerate(jobs)))
+            after = connection.execute("SELECT COUNT(*) FROM download_queue").fetchone()[0]
+        return after - before
+
+    def submit(self, jobs, priority=PRIORITY_ALL):
+        """Queue jobs without touching the store: jobs() (or flush()) adds them on the consumer's thread."""
+        with self.submitted_lock:
+            self.submitted.append((list(jobs), priority))
+
+    def flush(self):
+        """Add the submitted jobs; returns the number of entries new to the queue."""
+        with self.submitted_lock:
+            submitted, self.submitted = self.submitted, []
+        return sum(self.add(jobs, priority) for jobs, priority in submitted)
+
+    def remove(self, doc_id):
+        with self.store.lock:
+            self.store.connection.execute("DELETE FROM download_queue WHERE doc_id=?", (doc_id,))
+
+    def record_failure(self, doc_id, error):
+        """
+        Count a failed attempt; returns False once the entry has been dropped
+        for failing too often. The entry stays claimed until release(), so it
+        is retried by the next run rather than straight away.
+        """
+        with self.store.lock, self.store.transaction() as connection:
+            connection.execute("UPDATE download_queue SET attempts=attempts + 1, last_error=? WHERE doc_id=?",
+                               (error, doc_id))
+            dropped = connection.execute("DELETE FROM download_queue WHERE doc_id=? AND attempts >= ?",
+                                         (doc_id, MAX_QUEUE_ATTEMPTS)).rowcount
+        if dropped:
+            logger.warning(f"Removed {doc_id} from the download queue after {MAX_QUEUE_ATTEMPTS} failed attempts")
+        return not dropped
+
+    def clear(self):
+        with self.store.lock:
+            self.store.connection.execute("DELETE FROM download_queue")
+
+    def count(self):
+        return self.store.read("SELECT COUNT(*) FROM download_queue")[0][0]
+
+    def available(self):
+        """Number of entries nobody has claimed (or whose claim expired): what the next run would take."""
+        return self.store.read(
+            "SELECT COUNT(*) FROM download_queue WHERE claimed_by IS NULL OR "
+            "(claimed_by<>? AND claimed_at < ?)", (self.owner, time.time() - CLAIM_TIMEOUT))[0][0]
+
+    def submitted_count(self):
+        """Number of jobs submitted and not added yet."""
+        with self.submitted_lock:
+            return sum(len(jobs) for jobs, priority in self.submitted)
+
+    # Pause / resume
+    def is_paused(self):
+        return self.pause_event.is_set()
+
+    def set_paused(self, paused, persist=True):
+        """
+        Persisted, so a paused queue is not resumed automatically at the next
+        start. persist=False pauses or resumes only this queue object.
+        """
+        if paused:
+            self.pause_event.set()
+        else:
+            self.pause_event.clear()
+        if persist:
+            self.store.set_meta(PAUSED_KEY, bool(paused))
+
+    # Consuming
+    def next_job(self, exclude=(), doc_ids=None):
+        """
+        Claim the highest priority queued job not in exclude (doc_ids) nor
+        claimed by another process, or None. doc_ids limits the choice to those entries.
+        """
+        only, parameters = "", ()
+        if doc_ids is not None:
+            only, parameters = "AND doc_id IN (SELECT value FROM json_each(?)) ", (json.dumps(list(doc_ids)),)
+        offset = 0
+        while True:
+            now = time.time()
+            with self.store.lock, self.store.transaction() as connection:
+                rows = connection.execute(
+                    "SELECT doc_id, url, path, size, sha256 FROM download_queue "
+                    f"WHERE (claimed_by IS NULL OR claimed_by=? OR claimed_at < ?) {only}"
+                    "ORDER BY priority DESC, seq LIMIT ? OFFSET ?",
+                    (self.owner, now - CLAIM_TIMEOUT, *parameters, PEEK_SIZE, offset)).fetchall()
+                for doc_id, url, path, size, sha256 in rows:
+                    if doc_id not in exclude:
+                        connection.execute("UPDATE download_queue SET claimed_by=?, claimed_at=? WHERE doc_id=?",
+                                           (self.owner, now, doc_id))
+                        return DownloadJob(doc_id=doc_id, url=url, path=Path(path), size=size, sha256=sha256)
+            if len(rows) < PEEK_SIZE:
+                return None
+            offset += PEEK_SIZE
+
+    def release(self):
+        """Give back the entries claimed by this queue and not finished, e.g. after a pause or cancel."""
+        with self.store.lock:
+            self.store.connection.execute("UPDATE download_queue SET claimed_by=NULL, claimed_at=NULL "
+                                          "WHERE claimed_by=?", (self.owner,))
+
+    def jobs(self, doc_ids=None, on_added=None):
+        """
+        Yield queued jobs one at a time, best first, until the queue is empty
+        or paused; with doc_ids, only those entries. Submitted jobs are added
+        before each claim, and on_added(count) told how many were new. Call
+        release() once the jobs handed out have finished.
+        """
+        started = set()
+        doc_ids = set(doc_ids) if doc_ids is not None else None
+        while not self.is_paused():
+            added = self.flush()
+            if added and on_added is not None:
+                on_added(added)
+            job = self.next_job(started, doc_ids)
+            if job is None:
+                return
+            started.add(job.doc_id)
+            yield job
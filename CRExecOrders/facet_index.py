@@ -0,0 +1,199 @@
+#  facet_index.py
+
+"""
+Precomputed facets of one partition of the library: president, year and
+signing date.
+
+Each facet is kept ready for lookups so that filtering and counting never
+rescan the documents:
+
+- presidents: {name: set of doc_ids} postings,
+- years: {year: set of doc_ids} postings (year of the signing date, else of
+  the publication date),
+- signing dates: a sorted list of (signing_date, doc_id), so a date range is
+  two bisections and a slice.
+
+search() intersects the selected facets with the keyword matches (smallest
+set first) and returns, besides the accepted doc_ids, the count of every
+president and year under the other active filters, which is what a facet
+list shows next to each choice. Counting intersects each posting with the
+candidates, so it costs no more than one pass over the smaller of the two.
+Documents are added, moved and removed one at a time by LibraryIndex.
+"""
+
+import bisect
+from dataclasses import dataclass
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import library_records
+
+DATE_MAX = "\U0010ffff"         # sorts after every doc_id with the same date
+
+
+@dataclass(frozen=True)
+class FacetSelection:
+    """The active facet filters; None means not filtered on that facet. Dates are ISO strings, bounds included."""
+    president: str = None
+    first_year: int = None
+    last_year: int = None
+    signed_from: str = None
+    signed_to: str = None
+
+    def is_empty(self):
+        return self == NO_SELECTION
+
+
+NO_SELECTION = FacetSelection()
+
+
+@dataclass
+class FacetResult:
+    accepted: set = None            # doc_ids passing every filter; None: all of them
+    presidents: dict = None         # {name: count} under the other filters
+    years: dict = None              # {year: count} under the other filters
+    total: int = 0                  # number of accepted doc_ids
+
+
+def document_facets(details):
+    """(president, year, signing_date) of one document; each may be None."""
+    president = library_records.president_name(details.get("president")) or None
+    signing_date = details.get("signing_date") or None
+    date = signing_date or details.get("publication_date") or ""
+    year = int(date[:4]) if date[:4].isdigit() else None
+    return president, year, signing_date
+
+
+def intersect(sets):
+    """Intersection of the given sets (None stands for "everything"); None if all are None."""
+    sets = sorted((s for s in sets if s is not None), key=len)
+    if not sets:
+        return None
+    result = set(sets[0])
+    for other in sets[1:]:
+        result.intersection_update(other)
+        if not result:
+            break
+    return result
+
+
+def posting_counts(postings, candidates):
+    if candidates is None:
+        return {key: len(doc_ids) for key, doc_ids in postings.items()}
+    # set & set iterates over the smaller of the two
+    return {key: len(doc_ids & candidates) for key, doc_ids in postings.items()}
+
+
+class FacetIndex:
+    def __init__(self):
+        self.presidents = {}
+        self.years = {}
+        self.dates = []             # sorted [(signing_date, doc_id)]
+        self.facets = {}            # {doc_id: (president, year, signing_date)}
+        self.cache = {}             # facet lookups of the current contents
+
+    def __len__(self):
+        return len(self.facets)
+
+    def build(self, documents):
+        """documents is {doc_id: details} of the partition."""
+        self.presidents = {}
+        self.years = {}
+        self.facets = {}
+        for doc_id, details in documents.items():
+            self.add_postings(doc_id, document_facets(details))
+        self.dates = sorted((facets[2], doc_id) for doc_id, facets in self.facets.items() if facets[2])
+        self.cache = {}
+
+    # Incremental updates
+    def update(self, doc_id, details):
+        facets = document_facets(details)
+        if self.facets.get(doc_id) == facets:
+            return
+        self.remove(doc_id)
+        self.add_postings(doc_id, facets)
+        if facets[2]:
+            bisect.insort(self.dates, (facets[2], doc_id))
+
+    def remove(self, doc_id):
+        facets = self.facets.pop(doc_id, None)
+        if facets is None:
+            return
+        president, year, signing_date = facets
+        self.discard(self.presidents, president, doc_id)
+        self.discard(self.years, year, doc_id)
+        if signing_date:
+            position = bisect.bisect_left(self.dates, (signing_date, doc_id))
+            if position < len(self.dates) and self.dates[position] == (signing_date, doc_id):
+                del self.dates[position]
+        self.cache = {}
+
+    def add_postings(self, doc_id, facets):
+        president, year, _ = facets
+        self.facets[doc_id] = facets
+        if president is not None:
+            self.presidents.setdefault(president, set()).add(doc_id)
+        if year is not None:
+            self.years.setdefault(year, set()).add(doc_id)
+        self.cache = {}
+
+    @staticmethod
+    def discard(postings, key, doc_id):
+        if key is None:
+            return
+        doc_ids = postings.get(key)
+        if doc_ids is not None:
+            doc_ids.discard(doc_id)
+            if not doc_ids:
+                del postings[key]
+
+    # Lookups
+    def year_range(self):
+        """(first, last) year present, or None when no document has a date."""
+        if not self.years:
+            return None
+        return min(self.years), max(self.years)
+
+    def match_president(self, president):
+        if president is None:
+            return None
+        return self.presidents.get(president, set())
+
+    def match_years(self, first_year, last_year):
+        if first_year is None and last_year is None:
+            return None
+        key = ("years", first_year, last_year)
+        if key not in self.cache:
+            first = float("-inf") if first_year is None else first_year
+            last = float("inf") if last_year is None else last_year
+            self.cache[key] = set().union(*(doc_ids for year, doc_ids in self.years.items() if first <= year <= last))
+        return self.cache[key]
+
+    def match_dates(self, signed_from, signed_to):
+        if signed_from is None and signed_to is None:
+            return None
+        key = ("dates", signed_from, signed_to)
+        if key not in self.cache:
+            start = 0 if signed_from is None else bisect.bisect_left(self.dates, (signed_from,))
+            end = len(self.dates) if signed_to is None else bisect.bisect_right(self.dates, (signed_to, DATE_MAX))
+            self.cache[key] = {doc_id for _, doc_id in self.dates[start:end]}
+        return self.cache[key]
+
+    def search(self, selection=NO_SELECTION, matches=None):
+        """
+        Apply a FacetSelection on top of matches (doc_ids of this partition
+        from the keyword search, None for no keyword filter). Returns a FacetResult.
+        """
+        president = self.match_president(selection.president)
+        years = self.match_years(selection.first_year, selection.last_year)
+        dates = self.match_dates(selection.signed_from, selection.signed_to)
+
+        accepted = intersect((matches, president, years, dates))
+        return FacetResult(
+            accepted=accepted,
+            presidents=posting_counts(self.presidents, intersect((matches, years, dates))),
+            years=posting_counts(self.years, intersect((matches, president, dates))),
+            total=len(self.facets) if accepted is None else len(accepted),
+        )
@@ -0,0 +1,148 @@
+#  federal_register.py
+
+"""
+Minimal client for the Federal Register documents API (executive orders only).
+
+With an HttpCache, pages are answered from the cache while fresh and
+revalidated with a conditional request once stale. Pages of past years stay
+fresh for HISTORICAL_TTL, the current year's for the configured ttl.
+"""
+
+import datetime
+import json
+import threading
+from urllib.parse import urlencode
+
+import requests
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import metrics
+from download_engine import parse_retry_after
+from http_cache import DEFAULT_TTL_MINUTES, HISTORICAL_TTL
+
+API_BASE_URL = "https://www.federalregister.gov/api/v1"
+PER_PAGE = 1000
+REQUEST_TIMEOUT = 60
+USER_AGENT = "CRExecOrders"
+FIELDS = [
+    "document_number",
+    "executive_order_number",
+    "title",
+    "signing_date",
+    "publication_date",
+    "pdf_url",
+    "html_url",
+    "citation",
+    "president",
+]
+RATE_LIMIT_STATUS_CODES = {429, 503}
+
+
+class FederalRegisterError(Exception):
+    pass
+
+
+class RateLimited(FederalRegisterError):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FederalRegisterClient:
+    """Safe to share between threads: each thread gets its own keep-alive session."""
+
+    def __init__(self, base_url=API_BASE_URL, timeout=REQUEST_TIMEOUT, cache=None, ttl=DEFAULT_TTL_MINUTES * 60):
+        self.base_url = (base_url or API_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.cache = cache
+        self.ttl = ttl
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+            self._local.session = session
+        return session
+
+    def executive_order_params(self, year, since=None, page=1):
+        """Query parameters for one page of a year's executive orders, oldest first."""
+        params = [
+            ("conditions[type][]", "PRESDOCU"),
+            ("conditions[presidential_document_type]", "executive_order"),
+            ("conditions[publication_date][year]", str(year)),
+            ("order", "oldest"),
+            ("per_page", str(PER_PAGE)),
+            ("page", str(page)),
+        ]
+        if since:
+            params.append(("conditions[publication_date][gte]", since))
+        params.extend(("fields[]", name) for name in FIELDS)
+        return params
+
+    def page_url(self, year, since=None, page=1):
+        return f"{self.base_url}/documents.json?{urlencode(self.executive_order_params(year, since, page))}"
+
+    def fetch_page(self, year, since=None, page=1):
+        """
+        Fetch one page of executive orders published in year (optionally on or
+        after since, YYYY-MM-DD). Returns (results, total_pages).
+        """
+        try:
+            return self.parse_page(self.get(self.page_url(year, since, page), self.ttl_for(year)))
+        except (requests.RequestException, ValueError) as e:
+            raise FederalRegisterError(f"Failed to fetch {year} page {page}: {e}") from e
+
+    def cached_page(self, year, since=None, page=1):
+        """fetch_page's result if the cache holds a fresh copy, else None (no request is made)."""
+        if self.cache is None:
+            return None
+        cached = self.cache.get(self.page_url(year, since, page))
+        if cached is None or not cached.is_fresh():
+            return None
+        try:
+            page_result = self.parse_page(cached.body)
+        except ValueError:
+            return None
+        metrics.increment("api_cache_hits_total")
+        return page_result
+
+    @staticmethod
+    def parse_page(body):
+        payload = json.loads(body)
+        return payload.get("results") or [], int(payload.get("total_pages") or 0)
+
+    def get(self, url, ttl):
+        """Body of url, from the cache when fresh or confirmed unchanged by the server."""
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None and cached.is_fresh():
+            metrics.increment("api_cache_hits_total")
+            return cached.body
+
+        metrics.increment("api_requests_total")
+        with metrics.span("api_fetch_page"):
+            response = self.session.get(url, headers=cached.conditional_headers() if cached else None,
+                                        timeout=self.timeout)
+        if response.status_code in RATE_LIMIT_STATUS_CODES:
+            metrics.increment("api_rate_limited_total")
+            raise RateLimited(f"HTTP {response.status_code} for {url}",
+                              retry_after=parse_retry_after(response.headers.get("Retry-After")))
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 304 and cached is not None:
+            metrics.increment("api_not_modified_total")
+            self.cache.refresh(url, ttl, etag, last_modified)
+            return cached.body
+        response.raise_for_status()
+        metrics.increment("api_bytes_total", len(response.content))
+        if self.cache is not None:
+            self.cache.put(url, response.content, etag, last_modified, ttl)
+        return response.content
+
+    def ttl_for(self, year):
+        return HISTORICAL_TTL if year < datetime.date.today().year else self.ttl
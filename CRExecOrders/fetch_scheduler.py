@@ -0,0 +1,81 @@
+#  fetch_scheduler.py
+
+"""
+Concurrent scheduler for Federal Register API requests.
+
+Jobs run on a bounded thread pool. Every request first takes a token from a
+shared bucket, and a 429/503 answer pauses the whole bucket for the server's
+Retry-After before the request is retried, so adding workers never pushes us
+past the rate limit.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import metrics
+from federal_register import RateLimited
+from rate_limit import TokenBucket
+
+DEFAULT_CONCURRENCY = 4
+MAX_CONCURRENCY = 16
+DEFAULT_RATE = 5            # requests per second (INI fetch_rate)
+MAX_RATE = 100
+DEFAULT_RETRY_AFTER = 5.0   # seconds, when the server does not say
+MAX_RATE_LIMIT_RETRIES = 5
+
+
+class FetchCancelled(Exception):
+    pass
+
+
+class FetchScheduler:
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, burst=None,
+                 max_retries=MAX_RATE_LIMIT_RETRIES):
+        self.concurrency = max(1, min(int(concurrency), MAX_CONCURRENCY))
+        self.bucket = TokenBucket(rate, burst or self.concurrency)
+        self.max_retries = max_retries
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def reset(self):
+        self.cancel_event.clear()
+
+    def call(self, fn, *args, **kwargs):
+        """Call fn once a token is available, retrying while the server rate-limits us."""
+        attempt = 0
+        while True:
+            if not self.bucket.acquire(cancel_event=self.cancel_event):
+                raise FetchCancelled()
+            try:
+                return fn(*args, **kwargs)
+            except RateLimited as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                metrics.increment("api_retries_total")
+                delay = e.retry_after if e.retry_after is not None else DEFAULT_RETRY_AFTER
+                logger.warning(f"Rate limited, pausing requests for {delay:.1f}s (attempt {attempt})")
+                self.bucket.pause(delay)
+
+    def run(self, jobs):
+        """
+        Run {key: (fn, args)} concurrently and yield (key, result) as each
+        finishes. The first failure cancels the jobs that have not started and
+        is re-raised.
+        """
+        if not jobs:
+            return
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="eo-fetch") as pool:
+            futures = {pool.submit(self.call, fn, *args): key for key, (fn, args) in jobs.items()}
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
@@ -0,0 +1,137 @@
+#  file_integrity.py
+
+"""Checks used to decide whether a PDF on disk is complete, intact and current."""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+PART_SUFFIX = ".part"
+PART_META_SUFFIX = ".part.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+PDF_HEADER = b"%PDF-"
+PDF_TRAILER = b"%%EOF"
+PDF_TRAILER_WINDOW = 2048
+STALE_PART_AGE = 7 * 24 * 3600     # seconds before an abandoned partial download is removed
+ORPHAN_GRACE = 3600                # a .part without its .part.json (or the reverse) may still be starting
+
+
+@dataclass
+class FileInfo:
+    size: int
+    sha256: str
+    etag: str = None
+    last_modified: str = None
+    skipped: bool = False      # already on disk and verified, nothing transferred
+    resumed: bool = False      # continued from a partial file with a Range request
+    linked: bool = False       # taken from the shared PDF store instead of downloaded
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def part_path(path):
+    return Path(f"{path}{PART_SUFFIX}")
+
+
+def part_meta_path(path):
+    return Path(f"{path}{PART_META_SUFFIX}")
+
+
+def sha256_file(path, hasher=None):
+    hasher = hasher or hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher
+
+
+def looks_like_complete_pdf(path):
+    """Cheap structural check: PDF header at the start and an %%EOF marker near the end."""
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            if f.read(len(PDF_HEADER)) != PDF_HEADER:
+                return False
+            f.seek(max(0, size - PDF_TRAILER_WINDOW))
+            return PDF_TRAILER in f.read()
+    except OSError:
+        return False
+
+
+def read_part_meta(path):
+    """Validators (url, etag, last_modified) saved when the partial download of path started."""
+    try:
+        with open(part_meta_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_part_meta(path, meta):
+    with open(part_meta_path(path), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def discard_part(path):
+    part_path(path).unlink(missing_ok=True)
+    part_meta_path(path).unlink(missing_ok=True)
+
+
+def fsync_directory(directory):
+    """Persist a rename in directory (no-op where directories cannot be opened, e.g. Windows)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def cleanup_stale_parts(directory, max_age=STALE_PART_AGE, now=None):
+    """
+    Remove partial downloads in directory that will not be resumed: .part files
+    untouched for max_age seconds, and a .part or .part.json whose partner is
+    missing. Returns the number of files removed.
+    """
+    now = time.time() if now is None else now
+    try:
+        entries = {entry.name: entry for entry in os.scandir(directory) if entry.is_file()}
+    except OSError as e:
+        logger.warning(f"Could not scan {directory} for partial downloads: {e}")
+        return 0
+
+    removed = 0
+    for name, entry in entries.items():
+        if name.endswith(PART_META_SUFFIX):
+            partner = name[:-len(PART_META_SUFFIX)] + PART_SUFFIX
+        elif name.endswith(PART_SUFFIX):
+            partner = name[:-len(PART_SUFFIX)] + PART_META_SUFFIX
+        else:
+            continue
+        try:
+            # A pair is as old as its most recently written file
+            age = now - max(entry.stat().st_mtime,
+                            entries[partner].stat().st_mtime if partner in entries else 0)
+        except OSError:
+            continue
+        if age > max_age or (partner not in entries and age > ORPHAN_GRACE):
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Could not remove stale partial download {entry.path}: {e}")
+    if removed:
+        logger.info(f"Removed {removed} stale partial download files from {directory}")
+    return removed
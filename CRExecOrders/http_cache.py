@@ -0,0 +1,145 @@
+#  http_cache.py
+
+"""
+Persistent cache for Federal Register API responses (SQLite).
+
+Bodies are stored compressed under their full request URL together with the
+server's ETag / Last-Modified validators. A fresh entry is answered without a
+request; a stale one is revalidated with If-None-Match / If-Modified-Since so
+an unchanged page costs a 304 instead of the whole JSON. The cache is bounded
+in size: the least recently used entries are evicted first.
+"""
+
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_FILE_NAME = "Executive_Order_http_cache.sqlite3"
+DEFAULT_MAX_MB = 64
+DEFAULT_TTL_MINUTES = 5
+HISTORICAL_TTL = 365 * 24 * 3600    # seconds; a past year's orders no longer change
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key             TEXT PRIMARY KEY,
+    body            BLOB NOT NULL,
+    etag            TEXT,
+    last_modified   TEXT,
+    expires_at      REAL NOT NULL,
+    accessed_at     REAL NOT NULL,
+    size            INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str = None
+    last_modified: str = None
+    expires_at: float = 0.0
+
+    def is_fresh(self, now=None):
+        return (time.time() if now is None else now) < self.expires_at
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """Safe to share between threads."""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def get(self, key):
+        """The CachedResponse for key (fresh or stale), or None."""
+        with self.lock:
+            row = self.connection.execute("SELECT body, etag, last_modified, expires_at FROM responses WHERE key=?",
+                                          (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE responses SET accessed_at=? WHERE key=?", (time.time(), key))
+        body, etag, last_modified, expires_at = row
+        return CachedResponse(zlib.decompress(body), etag, last_modified, expires_at)
+
+    def put(self, key, body, etag=None, last_modified=None, ttl=0):
+        now = time.time()
+        compressed = zlib.compress(body)
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO responses (key, body, etag, last_modified, expires_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET body=excluded.body, "
+                "etag=excluded.etag, last_modified=excluded.last_modified, expires_at=excluded.expires_at, "
+                "accessed_at=excluded.accessed_at, size=excluded.size",
+                (key, compressed, etag, last_modified, now + ttl, now, len(compressed)))
+            self.evict()
+
+    def refresh(self, key, ttl, etag=None, last_modified=None):
+        """Extend an entry the server confirmed unchanged (HTTP 304), taking any new validators."""
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "UPDATE responses SET expires_at=?, accessed_at=?, etag=COALESCE(?, etag), "
+                "last_modified=COALESCE(?, last_modified) WHERE key=?",
+                (now + ttl, now, etag, last_modified, key))
+
+    def evict(self):
+        # Called with the lock held
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        removed = 0
+        rows = self.connection.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        self.connection.execute("BEGIN")
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.connection.execute("DELETE FROM responses WHERE key=?", (key,))
+            total -= size
+            removed += 1
+        self.connection.execute("COMMIT")
+        logger.debug(f"Evicted {removed} cached responses, {total} bytes left")
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self.lock:
+            count, total = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": total}
+
+
+def open_http_cache(data_dir, max_mb=DEFAULT_MAX_MB):
+    """The cache in data_dir, or None when max_mb is 0 (disabled) or it cannot be opened."""
+    if max_mb <= 0:
+        return None
+    try:
+        return HttpCache(Path(data_dir) / HTTP_CACHE_FILE_NAME, max_bytes=max_mb * 1024 * 1024)
+    except sqlite3.Error as e:
+        logger.warning(f"API response cache disabled: {e}")
+        return None
@@ -0,0 +1,338 @@
+#  library_export.py
+
+"""
+Bulk export of the library for analysis outside this program.
+
+Records go to JSON Lines (optionally gzipped) or, with the optional 'pyarrow'
+package (pip install CRExecOrders[export]), to Parquet; the PDFs can be
+packed into a tar or zip archive next to them. Everything is streamed: rows
+are read from the library store in batches on a read-only connection and
+written as they come, and each PDF is copied into the archive in chunks
+straight from the library directory, so memory use does not grow with the
+library and nothing is staged.
+
+An export reads one snapshot of the store (WAL readers do not block the
+program's writes) and records the library revision it saw. An incremental
+export takes only the orders whose revision is newer than the last export's:
+new orders, refreshed metadata and files downloaded or removed since then.
+Output is written to a temporary file and renamed once complete, so a
+cancelled or failed export leaves no partial file and does not advance the
+incremental cursor.
+"""
+
+import datetime
+import gzip
+import json
+import os
+import sqlite3
+import tarfile
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+import library_records
+import metrics
+from pdf_preview import PreviewCache, PREVIEW_CACHE_FILE_NAME
+from search_index import SearchIndex, SEARCH_INDEX_FILE_NAME
+
+FORMAT_JSONL = "jsonl"
+FORMAT_PARQUET = "parquet"
+EXPORT_FORMATS = (FORMAT_JSONL, FORMAT_PARQUET)
+ARCHIVE_TAR = "tar"
+ARCHIVE_ZIP = "zip"
+ARCHIVE_FORMATS = (ARCHIVE_TAR, ARCHIVE_ZIP)
+LAST_EXPORT_META = "last_export"
+BATCH_SIZE = 1000
+ARCHIVE_PDF_DIRECTORY = "pdfs"
+
+# Parquet columns; JSON Lines records carry every stored field
+COLUMNS = (
+    ("doc_id", "string"),
+    ("executive_order_number", "int64"),
+    ("title", "string"),
+    ("signing_date", "string"),
+    ("publication_date", "string"),
+    ("president", "string"),
+    ("citation", "string"),
+    ("pdf_url", "string"),
+    ("html_url", "string"),
+    ("downloaded", "bool_"),
+    ("file_name", "string"),
+    ("file_size", "int64"),
+    ("sha256", "string"),
+    ("revision", "int64"),
+)
+TEXT_COLUMN = ("text", "string")
+
+
+class ExportError(Exception):
+    pass
+
+
+@dataclass
+class ExportResult:
+    records: int = 0
+    files: int = 0              # PDFs written to the archive
+    missing: int = 0            # downloaded orders whose PDF was not found
+    bytes: int = 0              # PDF bytes archived
+    revision: int = 0           # library revision the export is current to
+    since_revision: int = None  # None: full export
+    cancelled: bool = False
+    elapsed: float = 0.0
+
+
+def parquet_available():
+    return pyarrow is not None
+
+
+def format_for_path(path):
+    """The record format implied by the file name: .parquet, else JSON Lines."""
+    return FORMAT_PARQUET if Path(path).suffix.lower() == ".parquet" else FORMAT_JSONL
+
+
+def archive_format_for_path(path):
+    """The archive format implied by the file name: .zip, else tar (.tar, .tar.gz, .tgz)."""
+    return ARCHIVE_ZIP if Path(path).suffix.lower() == ".zip" else ARCHIVE_TAR
+
+
+def last_export(store):
+    """{"revision", "exported_at", "records", "path"} of the last completed export, or None."""
+    return store.get_meta(LAST_EXPORT_META)
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def temp_path(path):
+    """orders.jsonl.gz -> orders.jsonl.part.gz: the writers pick compression from the suffix."""
+    return path.with_name(f"{path.stem}.part{path.suffix}")
+
+
+# Record writers
+class JsonlWriter:
+    def __init__(self, path, include_text):
+        self.file = (gzip.open(path, "wt", encoding="utf-8") if path.name.endswith(".gz")
+                     else open(path, "w", encoding="utf-8"))
+
+    def write(self, rows):
+        self.file.writelines(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path, include_text):
+        if pyarrow is None:
+            raise ExportError("Parquet export needs pyarrow (pip install CRExecOrders[export])")
+        columns = COLUMNS + (TEXT_COLUMN,) if include_text else COLUMNS
+        self.schema = pyarrow.schema([(name, getattr(pyarrow, type_name)()) for name, type_name in columns])
+        self.names = [name for name, _ in columns]
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, rows):
+        # One row group per batch keeps memory bounded by BATCH_SIZE
+        arrays = {name: [row.get(name) for row in rows] for name in self.names}
+        arrays["executive_order_number"] = [to_int(value) for value in arrays["executive_order_number"]]
+        arrays["file_size"] = [to_int(value) for value in arrays["file_size"]]
+        arrays["president"] = [library_records.president_name(value) for value in arrays["president"]]
+        self.writer.write_batch(pyarrow.record_batch(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+RECORD_WRITERS = {FORMAT_JSONL: JsonlWriter, FORMAT_PARQUET: ParquetWriter}
+
+
+# Archive writers
+class TarArchive:
+    def __init__(self, path):
+        # Stream mode: written strictly front to back, gzipped for .tar.gz / .tgz
+        mode = "w|gz" if path.name.endswith((".gz", ".tgz")) else "w|"
+        self.tar = tarfile.open(os.fspath(path), mode)
+
+    def add(self, path, arcname):
+        self.tar.add(path, arcname=arcname, recursive=False)
+
+    def close(self):
+        self.tar.close()
+
+
+class ZipArchive:
+    def __init__(self, path):
+        # PDFs are compressed already; storing them is as small and far faster
+        self.zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+
+    def add(self, path, arcname):
+        self.zip.write(path, arcname=arcname)
+
+    def close(self):
+        self.zip.close()
+
+
+ARCHIVE_WRITERS = {ARCHIVE_TAR: TarArchive, ARCHIVE_ZIP: ZipArchive}
+
+
+class TextSource:
+    """PDF text from the search index, else from the preview cache; opened only if they exist."""
+
+    def __init__(self, data_dir):
+        self.search_index = None
+        self.preview_cache = None
+        if (data_dir / SEARCH_INDEX_FILE_NAME).exists():
+            self.search_index = SearchIndex(data_dir / SEARCH_INDEX_FILE_NAME)
+        if (data_dir / PREVIEW_CACHE_FILE_NAME).exists():
+            self.preview_cache = PreviewCache(data_dir / PREVIEW_CACHE_FILE_NAME)
+
+    def text(self, doc_id, path, sha256):
+        if self.search_index is not None:
+            text = self.search_index.text(doc_id)
+            if text is not None:
+                return text
+        if self.preview_cache is not None and path is not None:
+            preview = self.preview_cache.get(doc_id, path, sha256)
+            if preview is not None and not preview.error:
+                return preview.text
+        return None
+
+    def close(self):
+        if self.search_index is not None:
+            self.search_index.close()
+        if self.preview_cache is not None:
+            self.preview_cache.close()
+
+
+class LibraryExporter:
+    def __init__(self, store, data_dir):
+        """store: the library's LibraryStore; data_dir: the directory holding its PDFs."""
+        self.store = store
+        self.data_dir = Path(data_dir)
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def export(self, records_path, archive_path=None, since_last=False, include_text=False, on_progress=None):
+        """
+        Write the records to records_path (format from its name) and, if
+        archive_path is given, the downloaded PDFs to that tar or zip file.
+        since_last exports only what changed since the last completed export.
+        on_progress(done, total) is called after each batch. Returns an ExportResult.
+        """
+        started = time.perf_counter()
+        records_path = Path(records_path)
+        archive_path = Path(archive_path) if archive_path else None
+        record_format = format_for_path(records_path)
+        previous = last_export(self.store) if since_last else None
+        result = ExportResult(since_revision=previous["revision"] if previous else None)
+
+        outputs = [records_path] + ([archive_path] if archive_path else [])
+        connection = sqlite3.connect(f"file:{self.store.path}?mode=ro", uri=True, check_same_thread=False)
+        text_source = TextSource(self.data_dir) if include_text else None
+        records = archive = None
+        try:
+            records = RECORD_WRITERS[record_format](temp_path(records_path), include_text)
+            if archive_path:
+                archive = ARCHIVE_WRITERS[archive_format_for_path(archive_path)](temp_path(archive_path))
+            with metrics.span("library_export"):
+                # One read transaction: the revision, count and rows all come from the same snapshot
+                connection.execute("BEGIN")
+                result.revision = connection.execute("SELECT COALESCE(MAX(revision), 0) FROM documents").fetchone()[0]
+                where, parameters = ("WHERE revision > ?", (result.since_revision,)) \
+                    if result.since_revision is not None else ("", ())
+                total = connection.execute(f"SELECT COUNT(*) FROM documents {where}", parameters).fetchone()[0]
+                cursor = connection.execute(
+                    f"SELECT doc_id, downloaded, revision, data FROM documents {where} ORDER BY doc_id", parameters)
+                while not self.cancel_event.is_set():
+                    rows = cursor.fetchmany(BATCH_SIZE)
+                    if not rows:
+                        break
+                    batch = [self.record(row, text_source) for row in rows]
+                    records.write(batch)
+                    if archive is not None:
+                        self.archive_files(archive, batch, result)
+                    result.records += len(batch)
+                    if on_progress:
+                        on_progress(result.records, total)
+                connection.execute("COMMIT")
+            records.close()
+            records = None
+            if archive is not None:
+                archive.close()
+                archive = None
+            result.cancelled = self.cancel_event.is_set()
+            if not result.cancelled:
+                for path in outputs:
+                    os.replace(temp_path(path), path)
+        finally:
+            connection.close()
+            if text_source is not None:
+                text_source.close()
+            for writer in (records, archive):
+                if writer is not None:
+                    writer.close()
+            for path in outputs:
+                temp_path(path).unlink(missing_ok=True)
+
+        result.elapsed = time.perf_counter() - started
+        if result.cancelled:
+            logger.info(f"Export to {records_path} cancelled after {result.records} records")
+            return result
+        self.store.set_meta(LAST_EXPORT_META, {
+            "revision": result.revision,
+            "exported_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "records": result.records,
+            "path": str(records_path),
+        })
+        metrics.increment("export_records_total", result.records)
+        metrics.increment("export_files_total", result.files)
+        logger.info(f"Exported {result.records} records and {result.files} PDFs to {records_path} "
+                    f"({result.elapsed:.1f} s)")
+        return result
+
+    def record(self, row, text_source):
+        doc_id, downloaded, revision, data = row
+        record = {"doc_id": doc_id, **json.loads(data), "downloaded": bool(downloaded), "revision": revision}
+        if not record.get(library_records.FILE_NAME_FIELD) and record.get("document_number"):
+            record[library_records.FILE_NAME_FIELD] = library_records.default_file_name(record)
+        if text_source is not None:
+            record["text"] = text_source.text(doc_id, self.pdf_path(record),
+                                              record.get(library_records.SHA256_FIELD)) if downloaded else None
+        return record
+
+    def pdf_path(self, record):
+        file_name = record.get(library_records.FILE_NAME_FIELD)
+        return self.data_dir / file_name if file_name else None
+
+    def archive_files(self, archive, batch, result):
+        for record in batch:
+            if not record["downloaded"]:
+                continue
+            path = self.pdf_path(record)
+            try:
+                size = path.stat().st_size if path is not None else None
+            except OSError:
+                size = None
+            if size is None:
+                result.missing += 1
+                continue
+            archive.add(path, f"{ARCHIVE_PDF_DIRECTORY}/{path.name}")
+            result.files += 1
+            result.bytes += size
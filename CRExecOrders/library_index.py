@@ -0,0 +1,128 @@
+#  library_index.py
+
+"""
+Memoized view of the manager's library for the listings.
+
+Keeps every document's display title and lower-case search key plus the
+downloaded / not downloaded partitions, each with its FacetIndex (president,
+year, signing date), so filling a list or filtering does not rescan the
+library and reformat every title. The index is built once per
+load and then updated one document at a time when a document is added,
+refreshed by a fetch or changes state. invalidate() drops everything; the next
+access rebuilds it from the manager.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import library_records
+from facet_index import FacetIndex
+
+
+class LibraryIndex:
+    def __init__(self, manager):
+        self.manager = manager
+        self.titles = {}
+        self.keys = {}
+        # {doc_id: display_title} per partition, in library order
+        self.downloaded = {}
+        self.not_downloaded = {}
+        self.downloaded_facets = FacetIndex()
+        self.not_downloaded_facets = FacetIndex()
+        self.built = False
+
+    def build(self):
+        documents = library_records.all_documents(self.manager)
+        self.titles = self.manager.get_display_titles(documents)
+        self.keys = {doc_id: title.lower() for doc_id, title in self.titles.items()}
+        self.downloaded = {}
+        self.not_downloaded = {}
+        for doc_id, details in documents.items():
+            partition = self.downloaded if details.get(library_records.DOWNLOADED_FIELD) else self.not_downloaded
+            partition[doc_id] = self.titles[doc_id]
+        self.downloaded_facets.build({doc_id: documents[doc_id] for doc_id in self.downloaded})
+        self.not_downloaded_facets.build({doc_id: documents[doc_id] for doc_id in self.not_downloaded})
+        self.built = True
+        logger.debug(f"Indexed {len(self.titles)} documents ({len(self.downloaded)} downloaded)")
+
+    def invalidate(self):
+        """Drop everything; views handed out before keep the old mappings until they are repopulated."""
+        self.titles = {}
+        self.keys = {}
+        self.downloaded = {}
+        self.not_downloaded = {}
+        self.downloaded_facets = FacetIndex()
+        self.not_downloaded_facets = FacetIndex()
+        self.built = False
+
+    def ensure_built(self):
+        if not self.built:
+            self.build()
+
+    # Incremental updates
+    def update(self, doc_id):
+        """
+        Re-read one document from the manager (new, changed or moved between
+        partitions). Returns its (previous, current) downloaded state; None
+        stands for "not in the library".
+        """
+        self.ensure_built()
+        previous = self.state_of(doc_id)
+        details = library_records.get_document(self.manager, doc_id)
+        if details is None:
+            self.remove(doc_id)
+            return previous, None
+
+        title = self.manager.get_display_titles({doc_id: details})[doc_id]
+        self.titles[doc_id] = title
+        self.keys[doc_id] = title.lower()
+        current = bool(details.get(library_records.DOWNLOADED_FIELD))
+        (self.downloaded if current else self.not_downloaded)[doc_id] = title
+        (self.not_downloaded if current else self.downloaded).pop(doc_id, None)
+        self.facets(current).update(doc_id, details)
+        self.facets(not current).remove(doc_id)
+        return previous, current
+
+    def remove(self, doc_id):
+        self.titles.pop(doc_id, None)
+        self.keys.pop(doc_id, None)
+        self.downloaded.pop(doc_id, None)
+        self.not_downloaded.pop(doc_id, None)
+        self.downloaded_facets.remove(doc_id)
+        self.not_downloaded_facets.remove(doc_id)
+
+    # Lookups
+    def state_of(self, doc_id):
+        if doc_id in self.downloaded:
+            return True
+        if doc_id in self.not_downloaded:
+            return False
+        return None
+
+    def title(self, doc_id):
+        self.ensure_built()
+        return self.titles.get(doc_id)
+
+    def partition(self, downloaded):
+        """
+        The live {doc_id: display_title} mapping of one partition; do not modify.
+        The list models show it as a view over titles, without copying.
+        """
+        self.ensure_built()
+        return self.downloaded if downloaded else self.not_downloaded
+
+    def facets(self, downloaded):
+        """The FacetIndex of one partition, kept up to date by update() and remove()."""
+        self.ensure_built()
+        return self.downloaded_facets if downloaded else self.not_downloaded_facets
+
+    def partition_titles(self, downloaded):
+        """New {doc_id: display_title} dict of one partition (the caller may modify it)."""
+        return dict(self.partition(downloaded))
+
+    def partition_keys(self, downloaded):
+        """New {doc_id: lower-case title} dict of one partition."""
+        self.ensure_built()
+        keys = self.keys
+        return {doc_id: keys[doc_id] for doc_id in (self.downloaded if downloaded else self.not_downloaded)}
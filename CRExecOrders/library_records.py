@@ -0,0 +1,184 @@
+#  library_records.py
+
+"""
+Record-level access to the documents held by ExecutiveOrderManager.
+
+The manager keeps one details dict per document number, using the Federal
+Register field names (title, executive_order_number, signing_date, pdf_url...)
+plus the 'downloaded' flag, the PDF 'file_name' and, once the PDF has been
+downloaded and verified, its 'file_size' and 'sha256'. Everything in this
+program that needs to read or change a single record goes through these
+helpers instead of reaching into the manager directly.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+from document_record import DocumentRecord
+
+DOWNLOADED_FIELD = "downloaded"
+PDF_URL_FIELD = "pdf_url"
+FILE_NAME_FIELD = "file_name"
+FILE_SIZE_FIELD = "file_size"
+SHA256_FIELD = "sha256"
+ETAG_FIELD = "etag"
+LAST_MODIFIED_FIELD = "last_modified"
+# Set by downloads and directory checks; a metadata refresh from the Federal Register keeps them
+FILE_STATE_FIELDS = (DOWNLOADED_FIELD, FILE_NAME_FIELD, FILE_SIZE_FIELD, SHA256_FIELD, ETAG_FIELD,
+                     LAST_MODIFIED_FIELD)
+
+
+def all_documents(manager):
+    """Return the manager's live {doc_id: details} mapping. Do not mutate."""
+    return manager.executive_orders
+
+
+def set_documents(manager, documents):
+    """Replace the manager's whole library with {doc_id: details}, stored as compact DocumentRecords."""
+    manager.executive_orders = {doc_id: DocumentRecord.from_mapping(details)
+                                for doc_id, details in documents.items()}
+
+
+def apply_changes(manager, documents):
+    """
+    Put {doc_id: details} saved by another process (LibraryStore.changes)
+    into the manager. Returns the doc_ids that are new or differ. Call it
+    where the manager is iterated (the library lane), not next to it.
+    """
+    current = manager.executive_orders
+    changed = []
+    for doc_id, details in documents.items():
+        if current.get(doc_id) != details:
+            current[doc_id] = details
+            changed.append(doc_id)
+    return changed
+
+
+def get_document(manager, doc_id):
+    return manager.executive_orders.get(doc_id)
+
+
+def is_downloaded(manager, doc_id):
+    details = get_document(manager, doc_id)
+    return bool(details is not None and details.get(DOWNLOADED_FIELD))
+
+
+def get_pdf_url(manager, doc_id):
+    details = get_document(manager, doc_id) or {}
+    return details.get(PDF_URL_FIELD)
+
+
+def mark_downloaded(manager, doc_id, downloaded=True):
+    """Flag a single document as (not) downloaded. Returns True if it changed."""
+    details = get_document(manager, doc_id)
+    if details is None:
+        logger.warning(f"Cannot update unknown document {doc_id}")
+        return False
+    if bool(details.get(DOWNLOADED_FIELD)) == downloaded:
+        return False
+    details[DOWNLOADED_FIELD] = downloaded
+    return True
+
+
+def get_file_info(manager, doc_id):
+    """(size, sha256) recorded for the document's PDF, or (None, None)."""
+    details = get_document(manager, doc_id) or {}
+    return details.get(FILE_SIZE_FIELD), details.get(SHA256_FIELD)
+
+
+def record_file_info(manager, doc_id, info):
+    """
+    Store the size, content hash and HTTP validators of a verified download
+    (a file_integrity.FileInfo) and flag the document as downloaded.
+    Returns the updated details, or None for an unknown document.
+    """
+    details = get_document(manager, doc_id)
+    if details is None:
+        logger.warning(f"Cannot update unknown document {doc_id}")
+        return None
+    details[DOWNLOADED_FIELD] = True
+    details[FILE_SIZE_FIELD] = info.size
+    details[SHA256_FIELD] = info.sha256
+    if info.etag:
+        details[ETAG_FIELD] = info.etag
+    if info.last_modified:
+        details[LAST_MODIFIED_FIELD] = info.last_modified
+    return details
+
+
+def record_file_found(manager, doc_id, size, changed=False):
+    """
+    Flag the document as downloaded for a PDF that appeared in its directory.
+    The recorded hash is dropped when the size differs or the file changed,
+    so the file is verified before it is trusted.
+    """
+    details = get_document(manager, doc_id)
+    if details is None:
+        return None
+    details[DOWNLOADED_FIELD] = True
+    if changed or details.get(FILE_SIZE_FIELD) != size:
+        details[FILE_SIZE_FIELD] = size
+        details.pop(SHA256_FIELD, None)
+    return details
+
+
+def record_file_missing(manager, doc_id):
+    """Flag the document as not downloaded after its PDF disappeared."""
+    details = get_document(manager, doc_id)
+    if details is None:
+        return None
+    details[DOWNLOADED_FIELD] = False
+    details.pop(FILE_SIZE_FIELD, None)
+    details.pop(SHA256_FIELD, None)
+    return details
+
+
+def newest_first(manager, doc_ids):
+    """doc_ids ordered by publication (or signing) date, newest first."""
+    documents = manager.executive_orders
+
+    def date(doc_id):
+        details = documents.get(doc_id) or {}
+        return details.get("publication_date") or details.get("signing_date") or ""
+
+    return sorted(doc_ids, key=date, reverse=True)
+
+
+def president_name(value):
+    """The 'president' field is {"name": ..., "identifier": ...} in API results, a plain name in older libraries."""
+    if isinstance(value, dict):
+        return value.get("name")
+    return value
+
+
+def default_file_name(details):
+    return f"{details['document_number']}.pdf"
+
+
+def merge_documents(manager, results):
+    """
+    Merge Federal Register API results into the manager's library.
+
+    New documents are added as not downloaded; existing ones have their
+    metadata refreshed but keep their download state and file name.
+    Returns the (added, updated) doc_id lists.
+    """
+    documents = manager.executive_orders
+    added = []
+    updated = []
+    for result in results:
+        doc_id = result.get("document_number")
+        if not doc_id:
+            continue
+        details = documents.get(doc_id)
+        if details is None:
+            details = DocumentRecord(result)
+            details[DOWNLOADED_FIELD] = False
+            details.setdefault(FILE_NAME_FIELD, default_file_name(details))
+            documents[doc_id] = details
+            added.append(doc_id)
+        elif any(details.get(key) != value for key, value in result.items()):
+            details.update(result)
+            updated.append(doc_id)
+    return added, updated
@@ -0,0 +1,85 @@
+#  library_registry.py
+
+"""
+Named libraries kept in the INI file.
+
+Each library is a name and the directory holding its PDFs and library file;
+the mapping is saved as JSON under 'libraries' with the selected one under
+'active_library'. 'exec_ord_directory' always holds the active library's
+directory, so an INI file from before named libraries (or a tool reading only
+that option) keeps working: it becomes the single library DEFAULT_LIBRARY_NAME.
+"""
+
+import json
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+INI_SECTION = 'CRExecOrder'
+DEFAULT_LIBRARY_NAME = "Default"
+
+
+class LibraryRegistryError(Exception):
+    pass
+
+
+class LibraryRegistry:
+    def __init__(self, ini_handler, section=INI_SECTION):
+        self.ini_handler = ini_handler
+        self.section = section
+        self.libraries = {}
+        self.active = None
+        self.load()
+
+    def load(self):
+        try:
+            self.libraries = json.loads(self.ini_handler.read_value(self.section, 'libraries') or "{}")
+        except ValueError:
+            logger.warning("Invalid libraries setting, using the executive order directory only")
+            self.libraries = {}
+        directory = self.ini_handler.read_value(self.section, 'exec_ord_directory')
+        if not self.libraries and directory:
+            self.libraries = {DEFAULT_LIBRARY_NAME: directory}
+        active = self.ini_handler.read_value(self.section, 'active_library')
+        self.active = active if active in self.libraries else next(iter(self.libraries), None)
+        if self.active is not None and directory:
+            # Set from the settings dialog (or by hand) since the registry was saved
+            self.libraries[self.active] = directory
+
+    def save(self):
+        self.ini_handler.create_or_update_option(self.section, 'libraries', json.dumps(self.libraries))
+        self.ini_handler.create_or_update_option(self.section, 'active_library', self.active or "")
+        if self.active is not None:
+            self.ini_handler.create_or_update_option(self.section, 'exec_ord_directory', self.libraries[self.active])
+        self.ini_handler.save_changes()
+
+    def names(self):
+        return list(self.libraries)
+
+    def directory(self, name=None):
+        return self.libraries.get(self.active if name is None else name)
+
+    def add(self, name, directory):
+        name = name.strip()
+        if not name:
+            raise LibraryRegistryError("A library needs a name")
+        if name in self.libraries:
+            raise LibraryRegistryError(f"A library named {name} already exists")
+        self.libraries[name] = str(directory)
+        if self.active is None:
+            self.active = name
+
+    def remove(self, name):
+        """Forget a library (its files stay on disk); the first remaining one becomes active if needed."""
+        self.libraries.pop(name, None)
+        if self.active == name:
+            self.active = next(iter(self.libraries), None)
+
+    def set_directory(self, name, directory):
+        self.libraries[name] = str(directory)
+
+    def set_active(self, name):
+        if name not in self.libraries:
+            raise LibraryRegistryError(f"No library named {name}")
+        self.active = name
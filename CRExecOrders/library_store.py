@@ -0,0 +1,320 @@
+#  library_store.py
+
+"""
+SQLite-backed library storage.
+
+One row per executive order plus a small key/value meta table, in WAL mode so a
+status change is a single-row UPDATE instead of rewriting the whole library.
+Every write stamps the rows it touches with the next library revision, so
+exports (and anything else that needs "what changed since") can select the
+changed rows through an index instead of comparing whole records.
+
+Several processes may use one library at the same time (the GUI and a
+scheduled crlibrary-cli sync). Readers never block writers (WAL), writes are
+short BEGIN IMMEDIATE transactions, and nothing rewrites the whole library:
+
+- each store remembers the revision its in-memory records are current to;
+  changes() is the change feed, returning only the rows written since then
+  (the caller applies them and calls synced()), and costs one PRAGMA
+  data_version when no other connection committed;
+- a save that touches a row another process changed in the meantime merges
+  at record level: the write names the fields it sets (fields=, e.g. the file
+  state after a download) or the ones it leaves alone (preserve=, e.g. the
+  file state when a fetch refreshes the metadata), and the rest of the row
+  is kept as stored. The merged row comes back through the change feed;
+- meta_items= updates single entries of dict-valued meta (the per-year sync
+  state) inside the transaction instead of replacing the whole value.
+
+Reads the GUI thread makes (meta, queue counts, has_changes()) go through
+read() on a second connection with a lock of its own, so they never wait for
+a save holding the writer connection.
+
+The legacy Executive_Order_library file written by ExecutiveOrderManager is
+migrated into the database the first time a library directory is opened, and
+left in place untouched afterwards.
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import library_records
+import metrics
+from document_record import DocumentRecord
+
+LIBRARY_FILE_NAME = "Executive_Order_library"
+STORE_SUFFIX = ".sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id      TEXT PRIMARY KEY,
+    year        INTEGER,
+    downloaded  INTEGER NOT NULL DEFAULT 0,
+    data        TEXT NOT NULL,
+    revision    INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS documents_downloaded ON documents (downloaded);
+CREATE INDEX IF NOT EXISTS documents_year ON documents (year);
+CREATE TABLE IF NOT EXISTS meta (
+    key         TEXT PRIMARY KEY,
+    value       TEXT NOT NULL
+);
+"""
+# Created after stores from before revisions were added have the column
+REVISION_INDEX = "CREATE INDEX IF NOT EXISTS documents_revision ON documents (revision)"
+BUSY_TIMEOUT = 30.0     # seconds to wait for another process's write transaction
+MERGE_BATCH = 500       # doc_ids per lookup of rows to merge
+
+
+class LibraryStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                          timeout=BUSY_TIMEOUT)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(documents)")}
+        if "revision" not in columns:
+            self.connection.execute("ALTER TABLE documents ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+        self.connection.execute(REVISION_INDEX)
+        # Read-only: a WAL reader sees the last commit without waiting for a transaction in progress
+        self.read_lock = threading.Lock()
+        self.reader = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                      timeout=BUSY_TIMEOUT)
+        self.read_data_version = self.read("PRAGMA data_version")[0][0]
+        # Revision the caller's records are current to, and the data_version it was read at
+        self.synced_revision = 0
+        self.data_version = self.current_data_version()
+        # Merged rows written here that the caller has not read back yet
+        self.merged_unread = False
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+        with self.read_lock:
+            self.reader.close()
+
+    def read(self, query, parameters=()):
+        """Rows of a read-only query, from the last commit; never waits for the writer connection."""
+        with self.read_lock:
+            return self.reader.execute(query, parameters).fetchall()
+
+    # Documents
+    def load_documents(self):
+        """{doc_id: DocumentRecord} of every document; the change feed starts from here."""
+        documents, revision = self.read_documents("SELECT doc_id, downloaded, data FROM documents")
+        self.synced(revision)
+        return documents
+
+    def changes(self):
+        """
+        The change feed: ({doc_id: DocumentRecord}, revision) of the rows
+        written after the synced revision, by other processes or merged by
+        this store. Pass the revision to synced() once the records are applied;
+        until then saves merge with them. ({}, None) at once when no other
+        connection has committed since the last call.
+        """
+        with self.lock:
+            data_version = self.current_data_version()
+            if data_version == self.data_version and not self.merged_unread:
+                return {}, None
+            self.data_version = data_version
+            self.merged_unread = False
+            documents, revision = self.read_documents(
+                "SELECT doc_id, downloaded, data FROM documents WHERE revision > ?", (self.synced_revision,))
+        if documents:
+            metrics.increment("store_feed_records_total", len(documents))
+            logger.debug(f"{len(documents)} documents changed in {self.path.name} (revision {revision})")
+        return documents, revision
+
+    def has_changes(self):
+        """
+        Cheap check whether changes() may have anything to read, safe to call
+        while a save is running. Also true once after this store's own
+        commits, which changes() then answers at once.
+        """
+        data_version = self.read("PRAGMA data_version")[0][0]
+        if data_version != self.read_data_version:
+            self.read_data_version = data_version
+            return True
+        return self.merged_unread
+
+    def synced(self, revision):
+        """The caller's records now include everything up to revision (None, as from an empty changes(): no-op)."""
+        if revision is None:
+            return
+        with self.lock:
+            self.synced_revision = max(self.synced_revision, revision)
+
+    def read_documents(self, query, parameters=()):
+        # The rows and the revision from one snapshot, so no write falls between them
+        with self.lock:
+            self.connection.execute("BEGIN")
+            try:
+                rows = self.connection.execute(query, parameters).fetchall()
+                revision = self.revision()
+            finally:
+                self.connection.execute("COMMIT")
+        documents = {}
+        for doc_id, downloaded, data in rows:
+            details = DocumentRecord(json.loads(data))
+            details[library_records.DOWNLOADED_FIELD] = bool(downloaded)
+            documents[doc_id] = details
+        return documents, revision
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def save(self, documents=None, meta=None, fields=None, preserve=None, meta_items=None):
+        """
+        Upsert {doc_id: details}, {key: value} meta entries and
+        {key: {item: value}} meta items in one transaction. For rows another
+        process changed since the last sync, only the given fields are written,
+        or all but the preserved ones; without either the record is written whole.
+        """
+        with metrics.span("store_save"), self.lock, self.transaction():
+            if documents:
+                current = self.revision()
+                if current != self.synced_revision and (fields or preserve):
+                    documents = self.merge_stored(documents, fields, preserve)
+                self.connection.executemany(
+                    "INSERT INTO documents (doc_id, year, downloaded, data, revision) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(doc_id) DO UPDATE SET year=excluded.year, "
+                    "downloaded=excluded.downloaded, data=excluded.data, revision=excluded.revision",
+                    (self.document_row(doc_id, details) + (current + 1,) for doc_id, details in documents.items()))
+                if current == self.synced_revision:
+                    # Nobody else wrote in between: the caller's records are current to this write
+                    self.synced_revision = current + 1
+            for key, value in (meta or {}).items():
+                self.write_meta(key, value)
+            for key, items in (meta_items or {}).items():
+                row = self.connection.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+                value = json.loads(row[0]) if row else {}
+                value.update(items)
+                self.write_meta(key, value)
+
+    def changed_rows(self, doc_ids):
+        """{doc_id: details} of those doc_ids whose row was written after the synced revision."""
+        doc_ids = list(doc_ids)
+        stored = {}
+        with self.lock:
+            if self.revision() == self.synced_revision:
+                return stored
+            for start in range(0, len(doc_ids), MERGE_BATCH):
+                batch = doc_ids[start:start + MERGE_BATCH]
+                rows = self.connection.execute(
+                    f"SELECT doc_id, downloaded, data FROM documents WHERE revision > ? "
+                    f"AND doc_id IN ({','.join('?' * len(batch))})", (self.synced_revision, *batch)).fetchall()
+                for doc_id, downloaded, data in rows:
+                    stored[doc_id] = {**json.loads(data), library_records.DOWNLOADED_FIELD: bool(downloaded)}
+        return stored
+
+    def merge_stored(self, documents, fields, preserve):
+        """documents with the rows changed since the last sync merged in, per the fields this write owns."""
+        stored = self.changed_rows(documents)
+        if not stored:
+            return documents
+
+        merged = dict(documents)
+        for doc_id, row in stored.items():
+            ours = documents[doc_id]
+            if fields:
+                record, source, keys = row, ours, fields
+            else:
+                record, source, keys = dict(ours), row, preserve
+            for key in keys:
+                if key in source:
+                    record[key] = source[key]
+                else:
+                    record.pop(key, None)
+            merged[doc_id] = record
+        metrics.increment("store_merged_records_total", len(stored))
+        self.merged_unread = True
+        logger.info(f"Merged {len(stored)} documents changed by another process")
+        return merged
+
+    def write_meta(self, key, value):
+        self.connection.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            (key, json.dumps(value)))
+
+    def revision(self):
+        """The library's current revision: the highest revision of any document (0 when empty)."""
+        with self.lock:
+            return self.connection.execute("SELECT COALESCE(MAX(revision), 0) FROM documents").fetchone()[0]
+
+    # Meta
+    def get_meta(self, key, default=None):
+        rows = self.read("SELECT value FROM meta WHERE key=?", (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def set_meta(self, key, value):
+        self.save(meta={key: value})
+
+    # Helpers
+    def current_data_version(self):
+        """Changes whenever another connection (in this or another process) commits to the database."""
+        with self.lock:
+            return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def transaction(self):
+        return _Transaction(self.connection)
+
+    @staticmethod
+    def document_row(doc_id, details):
+        data = {key: value for key, value in details.items() if key != library_records.DOWNLOADED_FIELD}
+        date = details.get("publication_date") or details.get("signing_date") or ""
+        year = int(date[:4]) if date[:4].isdigit() else None
+        return doc_id, year, int(bool(details.get(library_records.DOWNLOADED_FIELD))), json.dumps(data)
+
+
+class _Transaction:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def store_path(library_path):
+    return Path(f"{library_path}{STORE_SUFFIX}")
+
+
+def open_library(manager, library_path):
+    """
+    Open the store for library_path and load its documents into manager.
+
+    On first use the legacy library file is migrated into the store.
+    """
+    library_path = Path(library_path)
+    store = LibraryStore(store_path(library_path))
+    if store.get_meta("migrated") is None:
+        migrate_legacy_library(manager, store, library_path)
+    else:
+        library_records.set_documents(manager, store.load_documents())
+    return store
+
+
+def migrate_legacy_library(manager, store, library_path):
+    documents = {}
+    if library_path.exists():
+        logger.info(f"Migrating {library_path} into {store.path}")
+        manager.load_from_file(library_path)
+        documents = library_records.all_documents(manager)
+    store.save(documents=documents, meta={"migrated": True})
+    library_records.set_documents(manager, store.load_documents())
+    logger.info(f"Migrated {len(documents)} documents")
@@ -0,0 +1,166 @@
+#  library_sync.py
+
+"""
+Incremental, resumable sync of the executive order list.
+
+For every year a high-water mark (latest publication date and document number
+seen) is kept in the library store's meta table. A sync
+asks the Federal Register only for documents published on or after that date.
+Progress is checkpointed after each page, so an interrupted fetch resumes at
+the next page instead of starting over. Past years that were fetched in full
+after they ended are closed and not queried again.
+"""
+
+import datetime
+import threading
+from dataclasses import dataclass, field
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import library_records
+from fetch_scheduler import FetchScheduler
+
+SYNC_STATE_KEY = "sync_state"
+BEG_YEAR = 1994     # first year with executive orders on the Federal Register API
+
+
+@dataclass
+class SyncResult:
+    added: int = 0
+    updated: int = 0
+    years_skipped: int = 0
+    changed: list = field(default_factory=list)     # doc_ids added or updated
+
+
+class SyncState:
+    """Per-year high-water marks, persisted in the library store."""
+
+    def __init__(self, store):
+        self.store = store
+        self.years = {}
+        self.reload()
+
+    def reload(self):
+        """Read the marks again; another process may have synced since."""
+        self.years = self.store.get_meta(SYNC_STATE_KEY, {})
+
+    def year(self, year):
+        return self.years.setdefault(str(year), {})
+
+    def reset(self, year):
+        self.years.pop(str(year), None)
+
+
+class LibrarySync:
+    def __init__(self, manager, client, store, scheduler=None, lock=None):
+        """lock: held while pages are merged into the manager; share it with other threads changing the records."""
+        self.manager = manager
+        self.client = client
+        self.store = store
+        self.lock = lock or threading.RLock()
+        self.state = SyncState(store)
+        self.scheduler = scheduler or FetchScheduler(concurrency=1)
+
+    def sync_year(self, year, full=False, on_progress=None):
+        return self.sync_years(year, year, full=full, on_progress=on_progress)
+
+    def sync_years(self, start_year, end_year, full=False, on_progress=None):
+        """
+        Sync every year in [start_year, end_year]. on_progress(year, page, total_pages) is optional.
+
+        Pages are fetched concurrently through the scheduler: first the next page
+        of every open year (which tells us each year's page count), then all
+        remaining pages. Whatever finishes first, pages are merged into the
+        manager strictly in (year, page) order, and each year's checkpoint only
+        ever covers a contiguous run of pages.
+        """
+        result = SyncResult()
+        queries = {}
+        first_pages = {}
+        self.state.reload()
+        for year in range(start_year, end_year + 1):
+            if full:
+                self.state.reset(year)
+            mark = self.state.year(year)
+            if mark.get("closed"):
+                logger.debug(f"{year} is closed, skipping")
+                result.years_skipped += 1
+                continue
+            # Resume an interrupted run with the same query, otherwise start from the high-water mark
+            in_progress = mark.get("in_progress") or {"since": mark.get("last_publication_date"), "next_page": 1}
+            if in_progress["next_page"] > 1:
+                logger.info(f"Resuming {year} sync at page {in_progress['next_page']}")
+            queries[year] = in_progress["since"]
+            first_pages[year] = in_progress["next_page"]
+
+        fetched = dict(self.fetch_pages(queries, first_pages.items()))
+        total_pages = {year: fetched[(year, page)][1] for year, page in first_pages.items()}
+        remaining = [(year, page) for year, first_page in first_pages.items()
+                     for page in range(first_page + 1, total_pages[year] + 1)
+                     if fetched[(year, first_page)][0]]
+
+        order = sorted(list(fetched) + remaining)
+        next_index = self.merge_ready(order, 0, fetched, queries, total_pages, result, on_progress)
+        for key, page_result in self.fetch_pages(queries, remaining):
+            fetched[key] = page_result
+            next_index = self.merge_ready(order, next_index, fetched, queries, total_pages, result, on_progress)
+
+        logger.info(f"Synced {start_year}-{end_year}: {result.added} new, {result.updated} updated")
+        return result
+
+    def fetch_pages(self, queries, pages):
+        """Yield ((year, page), (results, total_pages)): cached pages first, the rest through the scheduler."""
+        jobs = {}
+        for year, page in pages:
+            # A cached page costs no request, so it does not wait for the rate limiter
+            page_result = self.client.cached_page(year, queries[year], page)
+            if page_result is None:
+                jobs[(year, page)] = (self.client.fetch_page, (year, queries[year], page))
+            else:
+                yield (year, page), page_result
+        yield from self.scheduler.run(jobs)
+
+    def merge_ready(self, order, index, fetched, queries, total_pages, result, on_progress):
+        """Merge the contiguous run of fetched pages starting at order[index]; returns the new index."""
+        while index < len(order) and order[index] in fetched:
+            year, page = order[index]
+            results, _ = fetched.pop(order[index])
+            with self.lock:
+                added, updated = library_records.merge_documents(self.manager, results)
+            result.added += len(added)
+            result.updated += len(updated)
+            result.changed.extend(added + updated)
+
+            mark = self.state.year(year)
+            self.advance_high_water_mark(mark, results)
+            if page >= total_pages[year] or not results:
+                mark.pop("in_progress", None)
+                if datetime.date.today().year > year:
+                    mark["closed"] = True
+            else:
+                mark["in_progress"] = {"since": queries[year], "next_page": page + 1}
+            with self.lock:
+                self.checkpoint(added + updated, year)
+
+            if on_progress:
+                on_progress(year, page, total_pages[year])
+            index += 1
+        return index
+
+    def checkpoint(self, doc_ids, year):
+        # One transaction, so the state never claims progress the library does not have. Only the metadata and
+        # this year's mark are written: downloads and other years' syncs in another process are kept
+        documents = library_records.all_documents(self.manager)
+        self.store.save(documents={doc_id: documents[doc_id] for doc_id in doc_ids},
+                        preserve=library_records.FILE_STATE_FIELDS,
+                        meta_items={SYNC_STATE_KEY: {str(year): self.state.year(year)}})
+
+    @staticmethod
+    def advance_high_water_mark(mark, results):
+        for details in results:
+            key = (details.get("publication_date") or "", details.get("document_number") or "")
+            current = (mark.get("last_publication_date") or "", mark.get("last_document_number") or "")
+            if key > current:
+                mark["last_publication_date"], mark["last_document_number"] = key
@@ -0,0 +1,301 @@
+#  listing_model.py
+
+"""
+Model/view listing of executive orders.
+
+DocumentListModel keeps the doc_ids in display order (title descending) and
+reads titles from the {doc_id: display_title} mapping it was given, without
+copying it, so no per-row tuples or item widgets are built and both lists can
+share one title mapping. Single documents are inserted and removed with
+row-level signals. DocumentFilterProxy exposes the subset
+matching the current filter, so filtering only changes which rows are visible
+instead of rebuilding the list.
+"""
+
+from PySide6.QtCore import (Qt, QAbstractListModel, QAbstractProxyModel, QModelIndex, Signal)
+from PySide6.QtWidgets import QListView, QAbstractItemView, QMenu
+
+DOC_ID_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+class DocumentListModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.doc_ids = []
+        self.titles = {}
+
+    def set_titles(self, titles, doc_ids=None):
+        """
+        Show doc_ids (default: every document in titles). titles is a
+        {doc_id: display_title} mapping that is read, never modified; it must
+        hold the title of every document listed or inserted later, and a
+        listed document's title must not change until the model is reset.
+        """
+        self.beginResetModel()
+        self.titles = titles
+        self.doc_ids = sorted(titles if doc_ids is None else doc_ids, key=titles.__getitem__, reverse=True)
+        self.endResetModel()
+
+    def insert_document(self, doc_id):
+        title = self.titles[doc_id]
+        if self.row_of(doc_id) is not None:
+            return
+        row = self.insert_position(title)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.doc_ids.insert(row, doc_id)
+        self.endInsertRows()
+
+    def remove_document(self, doc_id):
+        """Remove doc_id and return its title, or None if it is not listed."""
+        row = self.row_of(doc_id)
+        if row is None:
+            return None
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.doc_ids[row]
+        self.endRemoveRows()
+        return self.titles[doc_id]
+
+    def insert_position(self, title):
+        """First row whose title sorts below title (rows are in descending order)."""
+        low, high = 0, len(self.doc_ids)
+        while low < high:
+            middle = (low + high) // 2
+            if self.titles[self.doc_ids[middle]] >= title:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def row_of(self, doc_id):
+        """Row of doc_id, or None if it is not listed."""
+        title = self.titles.get(doc_id)
+        if title is None:
+            return None
+        # Binary search to the block of equal titles, then scan it for doc_id
+        row = self.insert_position(title) - 1
+        while row >= 0 and self.titles[self.doc_ids[row]] == title:
+            if self.doc_ids[row] == doc_id:
+                return row
+            row -= 1
+        return None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.doc_ids)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        doc_id = self.doc_ids[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.titles[doc_id]
+        if role == DOC_ID_ROLE:
+            return doc_id
+        return None
+
+
+class DocumentFilterProxy(QAbstractProxyModel):
+    """
+    Shows only the accepted doc_ids (all rows when accepted is None), in source
+    (display) order, or by ascending score when a ranking {doc_id: score} is
+    given. The visible rows are kept as a plain list of source rows: narrowing
+    the filter only rescans the rows that are currently visible, and the view
+    asks for data of the rows on screen only. Rows inserted into or removed
+    from the source are forwarded one by one.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.accepted = None
+        self.ranking = None
+        self.proxy_rows = []
+        self.proxy_row_of = None
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.modelReset.connect(self.refresh)
+        model.rowsInserted.connect(self.on_source_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self.on_source_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self.on_source_rows_removed)
+        self.refresh()
+
+    def set_accepted(self, accepted, ranking=None):
+        if accepted is None and self.accepted is None and not ranking and not self.ranking:
+            # Every row is shown already; a reset would only lose the selection
+            return
+        narrowing = (accepted is not None and self.accepted is not None
+                     and ranking == self.ranking and accepted <= self.accepted)
+        self.accepted = accepted
+        self.ranking = ranking
+        self.refresh(self.proxy_rows if narrowing else None)
+
+    def refresh(self, candidates=None):
+        doc_ids = self.sourceModel().doc_ids
+        if candidates is None:
+            candidates = range(len(doc_ids))
+        if self.accepted is None:
+            proxy_rows = list(candidates)
+        else:
+            accepted = self.accepted
+            proxy_rows = [row for row in candidates if doc_ids[row] in accepted]
+        if self.ranking:
+            ranking = self.ranking
+            proxy_rows.sort(key=lambda row: ranking.get(doc_ids[row], 0.0))
+
+        self.beginResetModel()
+        self.proxy_rows = proxy_rows
+        self.proxy_row_of = None
+        self.endResetModel()
+
+    def accepts(self, doc_id):
+        return self.accepted is None or doc_id in self.accepted
+
+    # Source row changes
+    def on_source_rows_inserted(self, parent, first, last):
+        count = last - first + 1
+        self.proxy_rows = [row + count if row >= first else row for row in self.proxy_rows]
+        self.proxy_row_of = None
+        doc_ids = self.sourceModel().doc_ids
+        for source_row in range(first, last + 1):
+            if not self.accepts(doc_ids[source_row]):
+                continue
+            position = self.proxy_insert_position(source_row)
+            self.beginInsertRows(QModelIndex(), position, position)
+            self.proxy_rows.insert(position, source_row)
+            self.proxy_row_of = None
+            self.endInsertRows()
+
+    def on_source_rows_about_to_be_removed(self, parent, first, last):
+        for source_row in range(last, first - 1, -1):
+            if self.ranking:
+                proxy_index = self.mapFromSource(self.sourceModel().index(source_row, 0))
+                row = proxy_index.row() if proxy_index.isValid() else None
+            else:
+                row = self.proxy_insert_position(source_row)
+                if row == len(self.proxy_rows) or self.proxy_rows[row] != source_row:
+                    row = None
+            if row is None:
+                continue
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.proxy_rows[row]
+            self.proxy_row_of = None
+            self.endRemoveRows()
+
+    def on_source_rows_removed(self, parent, first, last):
+        count = last - first + 1
+        self.proxy_rows = [row - count if row > last else row for row in self.proxy_rows]
+        self.proxy_row_of = None
+
+    def proxy_insert_position(self, source_row):
+        if self.ranking:
+            doc_ids = self.sourceModel().doc_ids
+            score = self.ranking.get(doc_ids[source_row], 0.0)
+            for position, row in enumerate(self.proxy_rows):
+                if self.ranking.get(doc_ids[row], 0.0) > score:
+                    return position
+            return len(self.proxy_rows)
+        low, high = 0, len(self.proxy_rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self.proxy_rows[middle] < source_row:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    # QAbstractProxyModel interface
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.proxy_rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not 0 <= row < len(self.proxy_rows) or column != 0:
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self.proxy_rows[proxy_index.row()], 0)
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        if self.proxy_row_of is None:
+            self.proxy_row_of = {source_row: row for row, source_row in enumerate(self.proxy_rows)}
+        row = self.proxy_row_of.get(source_index.row())
+        return QModelIndex() if row is None else self.createIndex(row, 0)
+
+
+class DocumentListView(QListView):
+    """
+    List of executive orders, sorted by title descending. actions maps context
+    menu entries to callables taking (doc_id, display_title) of the clicked row.
+    """
+    documentDoubleClicked = Signal(str, str)    # doc_id, display title
+    currentDocumentChanged = Signal(str)        # doc_id of the current row, "" for none
+
+    def __init__(self, multi_select=False, actions=None, parent=None):
+        super().__init__(parent)
+        self.menu_actions = actions or {}
+        self.source_model = DocumentListModel(self)
+        self.proxy_model = DocumentFilterProxy(self)
+        self.proxy_model.setSourceModel(self.source_model)
+        self.setModel(self.proxy_model)
+
+        self.setUniformItemSizes(True)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection if multi_select
+                              else QAbstractItemView.SelectionMode.SingleSelection)
+        self.doubleClicked.connect(self._on_double_clicked)
+        self.selectionModel().currentChanged.connect(self._on_current_changed)
+        if self.menu_actions:
+            self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+            self.customContextMenuRequested.connect(self._on_context_menu)
+
+    def populate_list(self, titles, doc_ids=None):
+        """Show doc_ids (default: all) with their titles from the {doc_id: display_title} mapping, read in place."""
+        self.source_model.set_titles(titles, doc_ids)
+
+    def insert_document(self, doc_id):
+        """Insert doc_id in title order; its title must already be in the mapping."""
+        self.source_model.insert_document(doc_id)
+
+    def remove_document(self, doc_id):
+        return self.source_model.remove_document(doc_id)
+
+    def set_filter(self, accepted, ranking=None):
+        self.proxy_model.set_accepted(accepted, ranking)
+
+    def visible_count(self):
+        return self.proxy_model.rowCount()
+
+    def selected_documents(self):
+        """[(doc_id, display_title)] of the selected rows, in display order."""
+        indexes = sorted(self.selectionModel().selectedRows(), key=lambda index: index.row())
+        return [(index.data(DOC_ID_ROLE), index.data(Qt.ItemDataRole.DisplayRole)) for index in indexes]
+
+    def current_document(self):
+        index = self.currentIndex()
+        return index.data(DOC_ID_ROLE) if index.isValid() else None
+
+    def _on_current_changed(self, current, previous):
+        self.currentDocumentChanged.emit(current.data(DOC_ID_ROLE) if current.isValid() else "")
+
+    def _on_double_clicked(self, index):
+        self.documentDoubleClicked.emit(index.data(DOC_ID_ROLE), index.data(Qt.ItemDataRole.DisplayRole))
+
+    def _on_context_menu(self, position):
+        index = self.indexAt(position)
+        if not index.isValid():
+            return
+        doc_id = index.data(DOC_ID_ROLE)
+        title = index.data(Qt.ItemDataRole.DisplayRole)
+        menu = QMenu(self)
+        for name, callback in self.menu_actions.items():
+            menu.addAction(name, lambda callback=callback: callback(doc_id, title))
+        menu.exec(self.viewport().mapToGlobal(position))
@@ -0,0 +1,189 @@
+#  metrics.py
+
+"""
+In-process counters and timing spans for the hot paths.
+
+Pure Python and thread-safe, so the download engine, the API client and the
+store record into the same registry from any thread. A span keeps its count,
+total, min and max plus a window of recent samples for percentiles. The
+registry can be exported as a Prometheus text file (.prom) or appended to a
+JSON lines log (.jsonl).
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "crexec"
+SPAN_SAMPLES = 1024
+RATE_WINDOW = 5.0
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class SpanStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples = deque(maxlen=SPAN_SAMPLES)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def quantile(self, fraction):
+        samples = sorted(self.samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 6),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else None,
+            "min_ms": round(self.min * 1000, 3) if self.min is not None else None,
+            "max_ms": round(self.max * 1000, 3) if self.max is not None else None,
+            **{f"p{round(q * 100)}_ms": round(self.quantile(q) * 1000, 3) for q in QUANTILES if self.samples},
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.spans = {}
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        with self.lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.observe(seconds)
+
+    @contextmanager
+    def span(self, name):
+        """Time the with-block as one sample of name (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def counter(self, name):
+        with self.lock:
+            return self.counters.get(name, 0)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "spans": {name: stats.as_dict() for name, stats in self.spans.items()},
+            }
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.spans.clear()
+
+    # Export
+    def export(self, path):
+        """Write a Prometheus text file (.prom/.txt) or append a JSON line (anything else)."""
+        path = Path(path)
+        try:
+            if path.suffix in (".prom", ".txt"):
+                self.write_prometheus(path)
+            else:
+                self.append_jsonl(path)
+        except OSError as e:
+            logger.warning(f"Could not export metrics to {path}: {e}")
+
+    def write_prometheus(self, path):
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        with self.lock:
+            spans = {name: (stats.count, stats.total, [(q, stats.quantile(q)) for q in QUANTILES])
+                     for name, stats in self.spans.items()}
+        for name, (count, total, quantiles) in sorted(spans.items()):
+            metric = f"{METRIC_PREFIX}_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            lines += [f'{metric}{{quantile="{q}"}} {value:.6f}' for q, value in quantiles if value is not None]
+            lines += [f"{metric}_sum {total:.6f}", f"{metric}_count {count}"]
+        # Written next to the target and renamed, so a scraper never reads half a file
+        temp_path = path.with_name(f".{path.name}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, path)
+
+    def append_jsonl(self, path):
+        record = {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), **self.snapshot()}
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+class RateMeter:
+    """Rate of a growing total (bytes, files) over the last window seconds."""
+
+    def __init__(self, window=RATE_WINDOW):
+        self.window = window
+        self.samples = deque()
+
+    def update(self, total, now=None):
+        now = time.monotonic() if now is None else now
+        self.samples.append((now, total))
+        while len(self.samples) > 2 and now - self.samples[1][0] >= self.window:
+            self.samples.popleft()
+
+    def rate(self):
+        if len(self.samples) < 2:
+            return 0.0
+        (start, first), (end, last) = self.samples[0], self.samples[-1]
+        return (last - first) / (end - start) if end > start else 0.0
+
+
+# The program-wide registry
+METRICS = Metrics()
+
+
+def increment(name, amount=1):
+    METRICS.increment(name, amount)
+
+
+def observe(name, seconds):
+    METRICS.observe(name, seconds)
+
+
+def span(name):
+    return METRICS.span(name)
+
+
+def timed(name):
+    """Decorator: record every call of the function as a sample of span name."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with METRICS.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
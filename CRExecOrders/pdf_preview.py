@@ -0,0 +1,290 @@
+#  pdf_preview.py
+
+"""
+Preview pipeline: text, page count, metadata and a first-page thumbnail of
+each downloaded PDF, extracted in a process pool and cached.
+
+Extraction is CPU bound (PDF parsing and rendering), so it runs in separate
+processes rather than threads. Results are cached in SQLite keyed by the
+file's SHA-256, so a file is only extracted again when its content changes,
+and identical files (e.g. linked from the shared PDF store) share one entry.
+A second table remembers each document's file size, mtime and hash, so a
+lookup only has to stat the file instead of hashing it.
+
+PreviewPipeline hands requests to the pool from its own dispatcher thread,
+most urgent first (the order on screen before the backlog of earlier
+downloads), with no more files in flight than there are worker processes.
+Given a search index, it also puts each file's text into the full-text
+index (search_index), so a PDF is read once, in a worker process, for both.
+"""
+
+import heapq
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import metrics
+from file_integrity import sha256_file
+from pdf_text import read_pdf, pdf_reading_available
+from search_index import SearchIndex
+
+PREVIEW_CACHE_FILE_NAME = "Executive_Order_previews.sqlite3"
+DEFAULT_PREVIEW_WORKERS = 2
+MAX_PREVIEW_WORKERS = 8
+PRIORITY_URGENT = 0
+PRIORITY_BACKGROUND = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS previews (
+    sha256      TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    page_count  INTEGER,
+    text        BLOB,
+    metadata    TEXT,
+    thumbnail   BLOB,
+    error       TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    doc_id      TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    sha256      TEXT NOT NULL
+);
+"""
+
+
+@dataclass
+class Preview:
+    sha256: str
+    size: int
+    page_count: int = None
+    text: str = ""
+    metadata: dict = field(default_factory=dict)
+    thumbnail: bytes = None     # PNG
+    error: str = None           # why the file could not be read
+
+
+def extract_preview(path):
+    """Runs in a worker process: hash and read the PDF at path."""
+    size = os.path.getsize(path)
+    sha256 = sha256_file(path).hexdigest()
+    try:
+        text, page_count, metadata, thumbnail = read_pdf(path)
+    except Exception as e:
+        return Preview(sha256=sha256, size=size, error=str(e))
+    return Preview(sha256=sha256, size=size, page_count=page_count, text=text,
+                   metadata=metadata, thumbnail=thumbnail)
+
+
+class PreviewCache:
+    """Safe to share between threads."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def get(self, doc_id, path, sha256=None):
+        """
+        The cached Preview of the file at path, or None when it has not been
+        extracted (or changed since). sha256 is the hash recorded for a
+        verified download, used when the file's stat is not known yet.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self.lock:
+            row = self.connection.execute("SELECT size, mtime_ns, sha256 FROM files WHERE doc_id=?",
+                                          (doc_id,)).fetchone()
+            if row is not None and row[:2] == (stat.st_size, stat.st_mtime_ns):
+                sha256 = row[2]
+            elif sha256 is None:
+                return None
+            preview = self._preview(sha256, stat.st_size)
+            if preview is not None and (row is None or row[2] != sha256):
+                self._remember(doc_id, stat, sha256)
+        return preview
+
+    def put(self, doc_id, stat, preview):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO previews (sha256, size, page_count, text, metadata, thumbnail, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (preview.sha256, preview.size, preview.page_count, zlib.compress(preview.text.encode("utf-8")),
+                 json.dumps(preview.metadata), preview.thumbnail, preview.error))
+            self._remember(doc_id, stat, preview.sha256)
+
+    def _preview(self, sha256, size):
+        # Called with the lock held
+        row = self.connection.execute(
+            "SELECT page_count, text, metadata, thumbnail, error FROM previews WHERE sha256=? AND size=?",
+            (sha256, size)).fetchone()
+        if row is None:
+            return None
+        page_count, text, metadata, thumbnail, error = row
+        return Preview(sha256=sha256, size=size, page_count=page_count,
+                       text=zlib.decompress(text).decode("utf-8") if text else "",
+                       metadata=json.loads(metadata or "{}"), thumbnail=thumbnail, error=error)
+
+    def _remember(self, doc_id, stat, sha256):
+        self.connection.execute("INSERT OR REPLACE INTO files (doc_id, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                                (doc_id, stat.st_size, stat.st_mtime_ns, sha256))
+
+
+class PreviewPipeline:
+    def __init__(self, cache_path, on_ready=None, workers=DEFAULT_PREVIEW_WORKERS, search_index_path=None):
+        """
+        on_ready(doc_id, preview) is called from a pool thread for every file
+        extracted. search_index_path: the full-text index to keep up to date.
+        """
+        self.cache_path = Path(cache_path)
+        self.on_ready = on_ready
+        self.workers = max(1, min(int(workers), MAX_PREVIEW_WORKERS))
+        self.search_index_path = Path(search_index_path) if search_index_path else None
+        self.cache = None
+        self.search_index = None
+        self.pool = None
+        self.thread = None
+        self.condition = threading.Condition()
+        self.requests = []          # heap of (priority, seq, doc_id, path, sha256, title)
+        self.seq = 0
+        self.in_flight = set()
+        self.stopped = False
+
+    def start(self):
+        if not pdf_reading_available():
+            logger.info("Neither pymupdf nor pypdf is installed; PDF previews are disabled")
+            return
+        self.cache = PreviewCache(self.cache_path)
+        if self.search_index_path is not None:
+            self.search_index = SearchIndex(self.search_index_path)
+        # Not forked: the GUI process has threads (and Qt) that must not be copied into the workers
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, name="eo-preview", daemon=True)
+        self.thread.start()
+
+    def is_running(self):
+        return self.thread is not None
+
+    def cached(self, doc_id, path, sha256=None):
+        """The cached Preview of doc_id's file, or None (not extracted yet, changed, or pipeline off)."""
+        if self.cache is None:
+            return None
+        return self.cache.get(doc_id, path, sha256)
+
+    def submit(self, doc_id, path, sha256=None, urgent=False, title=""):
+        """
+        Queue doc_id's file for extraction unless its cached preview is
+        current; the search index gets its text (and title) either way, or
+        drops it when the file is gone.
+        """
+        if self.thread is None:
+            return
+        with self.condition:
+            heapq.heappush(self.requests, (PRIORITY_URGENT if urgent else PRIORITY_BACKGROUND, self.seq,
+                                           doc_id, Path(path), sha256, title))
+            self.seq += 1
+            self.condition.notify()
+
+    def stop(self):
+        """Stop after the files being extracted now; the rest is requested again next start."""
+        if self.thread is None:
+            return
+        with self.condition:
+            self.stopped = True
+            self.requests.clear()
+            self.condition.notify_all()
+        self.thread.join()
+        self.thread = None
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.pool = None
+        self.cache.close()
+        self.cache = None
+        if self.search_index is not None:
+            self.search_index.close()
+            self.search_index = None
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and (not self.requests or len(self.in_flight) >= self.workers):
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                _, _, doc_id, path, sha256, title = heapq.heappop(self.requests)
+                if doc_id in self.in_flight:
+                    continue
+                self.in_flight.add(doc_id)
+            try:
+                stat = path.stat()
+            except OSError:
+                stat = None
+            cached = self.cache.get(doc_id, path, sha256) if stat is not None else None
+            if stat is None or cached is not None:
+                with self.condition:
+                    if not self.stopped:
+                        self._index(doc_id, title, stat, cached)
+                self._release(doc_id)
+                continue
+            try:
+                future = self.pool.submit(extract_preview, str(path))
+            except RuntimeError as e:
+                logger.warning(f"Could not extract a preview of {path}: {e}")
+                self._release(doc_id)
+                continue
+            future.add_done_callback(lambda future, doc_id=doc_id, stat=stat, title=title:
+                                     self._finished(doc_id, stat, title, future))
+
+    def _finished(self, doc_id, stat, title, future):
+        try:
+            if future.cancelled():
+                return
+            try:
+                preview = future.result()
+            except Exception as e:
+                logger.warning(f"Preview extraction failed for {doc_id}: {e}")
+                metrics.increment("previews_failed_total")
+                return
+            metrics.increment("previews_extracted_total")
+            with self.condition:
+                if self.stopped:
+                    return
+                self.cache.put(doc_id, stat, preview)
+                self._index(doc_id, title, stat, preview)
+            if self.on_ready:
+                self.on_ready(doc_id, preview)
+        finally:
+            self._release(doc_id)
+
+    def _index(self, doc_id, title, stat, preview):
+        # Called with the condition held. stat None: the file is gone
+        if self.search_index is None:
+            return
+        if stat is None:
+            self.search_index.remove(doc_id)
+        elif not preview.error and not self.search_index.is_current(doc_id, stat.st_size, stat.st_mtime_ns):
+            self.search_index.add(doc_id, title, preview.text, stat.st_size, stat.st_mtime_ns)
+            logger.debug(f"Indexed {doc_id} ({len(preview.text)} characters)")
+
+    def _release(self, doc_id):
+        with self.condition:
+            self.in_flight.discard(doc_id)
+            self.condition.notify()
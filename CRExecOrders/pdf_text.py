@@ -0,0 +1,76 @@
+#  pdf_text.py
+
+"""
+PDF text extraction. Needs the optional 'pypdf' package (pip install CRExecOrders[search]).
+
+read_pdf also returns the page count, document metadata and a first-page
+thumbnail; thumbnails need the optional 'pymupdf' package
+(pip install CRExecOrders[preview]), which is used for everything when present.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+THUMBNAIL_WIDTH = 160
+
+
+def text_extraction_available():
+    return PdfReader is not None
+
+
+def pdf_reading_available():
+    return pymupdf is not None or PdfReader is not None
+
+
+def thumbnails_available():
+    return pymupdf is not None
+
+
+def extract_text(path):
+    """Return the text of every page of the PDF at path, or None if it cannot be read."""
+    if PdfReader is None:
+        return None
+    try:
+        reader = PdfReader(str(path))
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    except Exception as e:
+        logger.warning(f"Could not extract text from {path}: {e}")
+        return None
+
+
+def read_pdf(path, thumbnail_width=THUMBNAIL_WIDTH):
+    """
+    (text, page_count, metadata, thumbnail) of the PDF at path; thumbnail is a
+    PNG of the first page thumbnail_width pixels wide, or None without pymupdf.
+    Raises if the file cannot be read.
+    """
+    if pymupdf is not None:
+        with pymupdf.open(str(path)) as document:
+            text = "\n".join(page.get_text() for page in document)
+            thumbnail = None
+            if document.page_count:
+                page = document[0]
+                zoom = thumbnail_width / page.rect.width
+                thumbnail = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom)).tobytes("png")
+            return text, document.page_count, clean_metadata(document.metadata or {}), thumbnail
+    if PdfReader is None:
+        raise RuntimeError("neither pymupdf nor pypdf is installed")
+    reader = PdfReader(str(path))
+    text = "\n".join(page.extract_text() or "" for page in reader.pages)
+    return text, len(reader.pages), clean_metadata(reader.metadata or {}), None
+
+
+def clean_metadata(metadata):
+    """Non-empty metadata as strings, with pypdf's '/Title' style keys as 'title'."""
+    return {str(key).lstrip("/").lower(): str(value) for key, value in metadata.items() if value}
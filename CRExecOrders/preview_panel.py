@@ -0,0 +1,79 @@
+#  preview_panel.py
+
+import html
+
+from PySide6.QtWidgets import QWidget, QLabel, QPlainTextEdit, QVBoxLayout
+from PySide6.QtGui import QPixmap
+from PySide6.QtCore import Qt, Signal
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+from pdf_text import THUMBNAIL_WIDTH, thumbnails_available
+
+TEXT_PREVIEW_CHARS = 20000
+
+
+class PreviewPanel(QWidget):
+    """Thumbnail, details and text of the order selected in the Downloaded list."""
+    # Emitted from the preview pipeline's threads; delivered on the GUI thread
+    previewReady = Signal(str, object)      # doc_id, pdf_preview.Preview
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.thumbnail = QLabel()
+        self.thumbnail.setFixedWidth(THUMBNAIL_WIDTH)
+        self.thumbnail.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignHCenter)
+        self.details = QLabel()
+        self.details.setWordWrap(True)
+        self.details.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setPlaceholderText("Select a downloaded order to preview it")
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.thumbnail)
+        layout.addWidget(self.details)
+        layout.addWidget(self.text, 1)
+        self.setMinimumWidth(THUMBNAIL_WIDTH + 120)
+
+    def clear(self):
+        self.thumbnail.clear()
+        self.details.clear()
+        self.text.clear()
+
+    def show_document(self, details, preview=None, pending=False):
+        """details: the order's library record. preview: its pdf_preview.Preview, if extracted."""
+        lines = [f"<b>{html.escape(details.get('title') or '')}</b>"]
+        for label, key in (("EO", "executive_order_number"), ("Signed", "signing_date"),
+                           ("Published", "publication_date")):
+            if details.get(key):
+                lines.append(f"{label}: {html.escape(str(details[key]))}")
+        president = details.get("president")
+        if isinstance(president, dict):
+            president = president.get("name")
+        if president:
+            lines.append(f"President: {html.escape(str(president))}")
+        size = preview.size if preview is not None else details.get("file_size")
+        if size:
+            lines.append(f"File: {size / 1024:.0f} KB")
+
+        self.thumbnail.clear()
+        self.text.clear()
+        if preview is None:
+            lines.append("Reading the PDF..." if pending else "No preview available")
+        elif preview.error:
+            lines.append(f"Could not read the PDF: {html.escape(preview.error)}")
+        else:
+            if preview.page_count is not None:
+                lines.append(f"Pages: {preview.page_count}")
+            if preview.thumbnail:
+                pixmap = QPixmap()
+                pixmap.loadFromData(preview.thumbnail, "PNG")
+                self.thumbnail.setPixmap(pixmap)
+            elif not thumbnails_available():
+                self.thumbnail.setText("Thumbnails need pymupdf")
+            self.text.setPlainText(preview.text[:TEXT_PREVIEW_CHARS])
+        self.details.setText("<br>".join(lines))
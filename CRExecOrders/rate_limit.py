@@ -0,0 +1,53 @@
+#  rate_limit.py
+
+"""Thread-safe token bucket shared by the workers talking to one host."""
+
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        """rate tokens are added per second, up to capacity (defaults to one second's worth)."""
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1, cancel_event=None):
+        """
+        Block until amount tokens are available and take them. Requests larger
+        than the capacity are let through once the bucket is full and leave it
+        in debt. Returns False if cancel_event was set while waiting.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= min(amount, self.capacity):
+                    self.tokens -= amount
+                    return True
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                else:
+                    wait = (min(amount, self.capacity) - self.tokens) / self.rate
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next seconds (e.g. after a 429 with Retry-After)."""
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0.0
+            self.updated = max(now, self.blocked_until)
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
@@ -0,0 +1,123 @@
+#  search_index.py
+
+"""
+Persistent full-text index over the downloaded PDFs (SQLite FTS5).
+
+The index lives next to the library in the EO data directory and is updated
+one document at a time, skipping files whose size and mtime are unchanged:
+the GUI's preview pipeline (pdf_preview) adds the text it extracts in its
+worker processes, and the command line indexes with index_file.
+"""
+
+import re
+import sqlite3
+from pathlib import Path
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+from pdf_text import extract_text
+
+SEARCH_INDEX_FILE_NAME = "Executive_Order_search.sqlite3"
+DEFAULT_LIMIT = 1000
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    rowid       INTEGER PRIMARY KEY,
+    doc_id      TEXT NOT NULL UNIQUE,
+    size        INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pdf_text USING fts5(title, body, tokenize='porter unicode61');
+"""
+
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def to_fts_query(text):
+    """
+    Turn user input into an FTS5 query: "quoted text" is a phrase, every other
+    word is a separate term, and all of them must match.
+    """
+    parts = []
+    for phrase, word in _QUERY_TOKEN.findall(text):
+        term = (phrase or word).strip()
+        if term:
+            parts.append('"' + term.replace('"', '""') + '"')
+    return " ".join(parts)
+
+
+class SearchIndex:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def is_current(self, doc_id, size, mtime_ns):
+        row = self.connection.execute("SELECT size, mtime_ns FROM files WHERE doc_id=?", (doc_id,)).fetchone()
+        return row is not None and tuple(row) == (size, mtime_ns)
+
+    def add(self, doc_id, title, text, size, mtime_ns):
+        with self.connection:
+            self._remove(doc_id)
+            cursor = self.connection.execute("INSERT INTO files (doc_id, size, mtime_ns) VALUES (?, ?, ?)",
+                                             (doc_id, size, mtime_ns))
+            self.connection.execute("INSERT INTO pdf_text (rowid, title, body) VALUES (?, ?, ?)",
+                                    (cursor.lastrowid, title, text))
+
+    def remove(self, doc_id):
+        with self.connection:
+            self._remove(doc_id)
+
+    def search(self, text, limit=DEFAULT_LIMIT):
+        """Return [(doc_id, score)], best match first. Lower bm25 scores are better."""
+        fts_query = to_fts_query(text)
+        if not fts_query:
+            return []
+        try:
+            rows = self.connection.execute(
+                f"SELECT files.doc_id, bm25(pdf_text, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS score "
+                "FROM pdf_text JOIN files ON files.rowid = pdf_text.rowid "
+                "WHERE pdf_text MATCH ? ORDER BY score LIMIT ?",
+                (fts_query, limit)).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Full-text query {fts_query!r} failed: {e}")
+            return []
+        return [(doc_id, score) for doc_id, score in rows]
+
+    def text(self, doc_id):
+        """The indexed text of doc_id's PDF, or None when it is not indexed."""
+        row = self.connection.execute("SELECT pdf_text.body FROM files JOIN pdf_text ON pdf_text.rowid = files.rowid "
+                                      "WHERE files.doc_id=?", (doc_id,)).fetchone()
+        return row[0] if row else None
+
+    def _remove(self, doc_id):
+        row = self.connection.execute("SELECT rowid FROM files WHERE doc_id=?", (doc_id,)).fetchone()
+        if row:
+            self.connection.execute("DELETE FROM pdf_text WHERE rowid=?", row)
+            self.connection.execute("DELETE FROM files WHERE rowid=?", row)
+
+
+def index_file(index, doc_id, path, title=""):
+    """Index one PDF unless it is unchanged since it was last indexed. Returns True if indexed."""
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        index.remove(doc_id)
+        return False
+    if index.is_current(doc_id, stat.st_size, stat.st_mtime_ns):
+        return False
+    text = extract_text(path)
+    if text is None:
+        return False
+    index.add(doc_id, title, text, stat.st_size, stat.st_mtime_ns)
+    logger.debug(f"Indexed {doc_id} ({len(text)} characters)")
+    return True
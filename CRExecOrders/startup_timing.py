@@ -0,0 +1,57 @@
+#  startup_timing.py
+
+"""
+Startup timing report.
+
+Marks are milliseconds since the program started importing. When the window
+becomes interactive the marks are appended as one JSON line to a report file,
+so time-to-interactive can be compared across releases and machines.
+"""
+
+import json
+import platform
+import time
+from datetime import datetime, timezone
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+from version import __version__ as program_version
+
+STARTUP_REPORT_FILE_NAME = "startup_timing.jsonl"
+
+
+class StartupTimer:
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.marks = {}
+        self.reported = False
+
+    def mark(self, name):
+        """Record the first time name is reached."""
+        if name not in self.marks:
+            self.marks[name] = round((time.perf_counter() - self.start) * 1000, 1)
+
+    def report(self, **extra):
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "version": program_version,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "marks_ms": dict(self.marks),
+            **extra,
+        }
+
+    def append_report(self, path, **extra):
+        """Append the report to path (JSON lines) once per run and log a summary."""
+        if self.reported:
+            return
+        self.reported = True
+        report = self.report(**extra)
+        logger.info("Startup: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.marks.items()))
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(report) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write startup report {path}: {e}")
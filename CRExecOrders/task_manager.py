@@ -0,0 +1,153 @@
+#  task_manager.py
+
+"""
+Background tasks for the GUI.
+
+A Task wraps a function that runs on a QThreadPool thread and reports back to
+the GUI thread only through Qt signals. TaskManager queues tasks on two pools:
+a general one, and a single-threaded library lane for everything that reads or
+writes the library, so those operations run one at a time in submission order
+while downloads and other work continue next to them.
+"""
+
+import threading
+import time
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+ITEM_PROGRESS_INTERVAL = 0.2   # seconds between item_progress signals of one task
+SHUTDOWN_TIMEOUT_MS = 10000
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class TaskSignals(QObject):
+    started = Signal()
+    progress = Signal(int, int)             # done, total (total 0 = unknown)
+    status = Signal(str)
+    item_progress = Signal(str, int, int)   # item id, done, total
+    item_finished = Signal(str, bool, str, object)  # item id, ok, error message, result
+    finished = Signal(object)               # result of the task function
+    failed = Signal(str)
+    cancelled = Signal()
+
+
+class Task(QRunnable):
+    def __init__(self, name, fn, library=False):
+        """
+        fn(task) runs on a worker thread; its return value is emitted with
+        finished. Set library=True for work touching the library, so it runs
+        on the serialized library lane.
+        """
+        super().__init__()
+        self.setAutoDelete(False)
+        self.name = name
+        self.fn = fn
+        self.library = library
+        self.signals = TaskSignals()
+        self.cancel_event = threading.Event()
+        self.cancel_callbacks = []
+        self.last_item_progress = 0.0
+
+    # Called from the GUI thread
+    def cancel(self):
+        self.cancel_event.set()
+        for callback in self.cancel_callbacks:
+            callback()
+
+    # Called from the task function
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def on_cancel(self, callback):
+        """Register callback() to be run when the task is cancelled (e.g. engine.cancel)."""
+        self.cancel_callbacks.append(callback)
+        if self.cancel_event.is_set():
+            callback()
+
+    def report(self, done, total, message=None):
+        self.signals.progress.emit(done, total)
+        if message:
+            self.signals.status.emit(message)
+
+    def report_item_progress(self, item_id, done, total):
+        # Throttled: byte-level progress would otherwise flood the event loop
+        now = time.monotonic()
+        if done == total or now - self.last_item_progress >= ITEM_PROGRESS_INTERVAL:
+            self.last_item_progress = now
+            self.signals.item_progress.emit(item_id, done, total)
+
+    def report_item_finished(self, item_id, ok, error="", result=None):
+        self.signals.item_finished.emit(item_id, ok, error, result)
+
+    def run(self):
+        self.signals.started.emit()
+        try:
+            if self.cancel_event.is_set():
+                raise TaskCancelled()
+            result = self.fn(self)
+        except TaskCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            if self.cancel_event.is_set():
+                self.signals.cancelled.emit()
+            else:
+                logger.exception(f"Task '{self.name}' failed")
+                self.signals.failed.emit(str(e))
+        else:
+            if self.cancel_event.is_set():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(result)
+
+
+class TaskManager(QObject):
+    task_started = Signal(object)
+    task_done = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.library_pool = QThreadPool(self)
+        self.library_pool.setMaxThreadCount(1)
+        self.tasks = []
+
+    def submit(self, task):
+        self.tasks.append(task)
+        task.signals.started.connect(lambda: self.task_started.emit(task))
+        for signal in (task.signals.finished, task.signals.failed, task.signals.cancelled):
+            signal.connect(lambda *args: self._on_task_done(task))
+        (self.library_pool if task.library else self.pool).start(task)
+        return task
+
+    def cancel(self, task):
+        pool = self.library_pool if task.library else self.pool
+        if pool.tryTake(task):
+            # Still queued: it will never run, so report it here
+            task.cancel_event.set()
+            task.signals.cancelled.emit()
+        else:
+            task.cancel()
+
+    def cancel_all(self):
+        for task in list(self.tasks):
+            self.cancel(task)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.pool.waitForDone(SHUTDOWN_TIMEOUT_MS)
+        self.library_pool.waitForDone(SHUTDOWN_TIMEOUT_MS)
+
+    def is_busy(self, library=None):
+        return any(library is None or task.library == library for task in self.tasks)
+
+    def _on_task_done(self, task):
+        if task in self.tasks:
+            self.tasks.remove(task)
+            self.task_done.emit(task)
@@ -0,0 +1,54 @@
+#  title_filter.py
+
+"""
+Incremental title filter for search-as-you-type.
+
+Lower-case titles are computed once per listing. When the query grows (the new
+query contains the previous one), only the previous matches are rescanned, so
+narrowing gets cheaper with every keystroke.
+"""
+
+
+class IncrementalFilter:
+    def __init__(self):
+        self.keys = {}
+        self.last_query = ""
+        self.last_result = None
+
+    def set_titles(self, titles):
+        """titles is {doc_id: display_title}."""
+        self.set_keys({doc_id: title.lower() for doc_id, title in titles.items()})
+
+    def set_keys(self, keys):
+        """keys is {doc_id: lower-case title}, e.g. from LibraryIndex.partition_keys; kept by reference."""
+        self.keys = keys
+        self.reset()
+
+    def update(self, doc_id, title):
+        self.keys[doc_id] = title.lower()
+        self.reset()
+
+    def remove(self, doc_id):
+        self.keys.pop(doc_id, None)
+        self.reset()
+
+    def reset(self):
+        self.last_query = ""
+        self.last_result = None
+
+    def match(self, query):
+        """Return the set of doc_ids whose title contains query, or None when every title matches."""
+        query = query.lower()
+        if not query:
+            self.reset()
+            return None
+
+        if self.last_result is not None and self.last_query in query:
+            candidates = self.last_result
+        else:
+            candidates = self.keys
+        result = {doc_id for doc_id in candidates if query in self.keys[doc_id]}
+
+        self.last_query = query
+        self.last_result = result
+        return result
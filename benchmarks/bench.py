@@ -0,0 +1,662 @@
+#  bench.py
+
+"""
+Benchmark harness for the library hot paths.
+
+Every library size runs in its own child process so the peak RSS reported for
+a size is not inflated by the previous one. Each benchmark is repeated and
+reported with ops/sec (repetitions), items/sec, latency percentiles and the
+process peak RSS after it ran. Results are written as JSON; pass --compare
+with an earlier result file to print the change per benchmark.
+
+    python benchmarks/bench.py                          # 1k, 10k and 100k documents
+    python benchmarks/bench.py --sizes 1000 --only fetch_list,download_bulk
+    python benchmarks/bench.py --output new.json --compare old.json
+
+Benchmarks whose dependencies are missing (PySide6, WrapCapExecOrders) are
+reported as skipped.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCHMARKS_DIR.parent
+sys.path.insert(0, str(BENCHMARKS_DIR))
+sys.path.insert(0, str(REPO_DIR))
+
+import CRExecOrders  # noqa: F401  (puts the program modules on sys.path)
+
+from synthetic import synthetic_documents, FIRST_YEAR, LAST_YEAR
+from stub_server import StubServer
+from version import __version__ as program_version
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_REPEAT = 5
+DEFAULT_DOWNLOAD_FILES = 500
+DEFAULT_INDEX_DOCS = 5000
+TYPING_QUERIES = ["c", "cl", "cli", "clim", "clima", "climat", "climate", "climate e", "climate energy"]
+
+BENCHMARKS = {}
+
+
+def benchmark(name, repeat=None):
+    """Register fn(context) -> list of result dicts under name."""
+    def register(fn):
+        BENCHMARKS[name] = (fn, repeat)
+        return fn
+    return register
+
+
+class SkipBenchmark(Exception):
+    pass
+
+
+# Measurement helpers
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(name, size, latencies, items):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    mean = total / len(latencies)
+    return {
+        "name": name,
+        "size": size,
+        "repeat": len(latencies),
+        "items": items,
+        "ops_per_sec": round(1 / mean, 3) if mean else None,
+        "items_per_sec": round(items * len(latencies) / total, 1) if total else None,
+        "latency_ms": {
+            "mean": round(mean * 1000, 3),
+            "min": round(latencies[0] * 1000, 3),
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p90": round(percentile(latencies, 0.90) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3),
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+class Context:
+    def __init__(self, size, repeat, work_dir, args):
+        self.size = size
+        self.repeat = repeat
+        self.work_dir = Path(work_dir)
+        self.args = args
+        self.documents = synthetic_documents(size)
+        self._app = None
+
+    def measure(self, name, operation, items=1, setup=None, repeat=None):
+        """Time operation() repeat times; setup() runs untimed before each repetition."""
+        latencies = []
+        for _ in range(repeat or self.repeat):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            operation()
+            latencies.append(time.perf_counter() - started)
+        return summarize(name, self.size, latencies, items)
+
+    def manager(self, documents=None):
+        try:
+            from WrapCapExecOrders import ExecutiveOrderManager
+        except ImportError as e:
+            raise SkipBenchmark(f"WrapCapExecOrders not available: {e}")
+        import library_records
+        manager = ExecutiveOrderManager()
+        library_records.set_documents(manager, {doc_id: dict(details) for doc_id, details
+                                                in (documents or self.documents).items()})
+        return manager
+
+    def qt_app(self):
+        if self._app is None:
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            try:
+                from PySide6.QtWidgets import QApplication
+            except ImportError as e:
+                raise SkipBenchmark(f"PySide6 not available: {e}")
+            self._app = QApplication.instance() or QApplication([])
+        return self._app
+
+
+# Benchmarks
+@benchmark("manager_save_load")
+def bench_manager_save_load(context):
+    manager = context.manager()
+    path = context.work_dir / "legacy_library"
+    if not hasattr(manager, "save_to_file"):
+        raise SkipBenchmark("ExecutiveOrderManager.save_to_file not available")
+    save = context.measure("manager.save_to_file", lambda: manager.save_to_file(str(path)), items=context.size)
+    loaded = context.manager({})
+    load = context.measure("manager.load_from_file", lambda: loaded.load_from_file(str(path)), items=context.size)
+    return [save, load]
+
+
+@benchmark("store_save_load")
+def bench_store_save_load(context):
+    from library_store import LibraryStore, open_library
+    import library_records
+
+    path = context.work_dir / "store_library"
+    store_file = Path(f"{path}.sqlite3")
+
+    def remove_store():
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{store_file}{suffix}").unlink(missing_ok=True)
+
+    def save_all():
+        store = LibraryStore(store_file)
+        store.save(documents=context.documents, meta={"migrated": True})
+        store.close()
+
+    save = context.measure("store.save (all documents)", save_all, items=context.size, setup=remove_store)
+    save_all()
+
+    def load():
+        manager = context.manager({})
+        open_library(manager, path).close()
+
+    load_result = context.measure("open_library (load)", load, items=context.size)
+
+    store = LibraryStore(store_file)
+    doc_ids = list(context.documents)
+    counter = iter(range(10 ** 9))
+
+    def mark_one():
+        doc_id = doc_ids[next(counter) % len(doc_ids)]
+        details = dict(context.documents[doc_id], **{library_records.DOWNLOADED_FIELD: True})
+        store.save(documents={doc_id: details})
+
+    mark = context.measure("store.save (one record)", mark_one, repeat=max(context.repeat, 100))
+    store.close()
+    return [save, load_result, mark]
+
+
+@benchmark("shared_library")
+def bench_shared_library(context):
+    """Two stores on one library file, as the GUI and a crlibrary-cli sync: the change feed and merged saves."""
+    from library_store import LibraryStore
+    import library_records
+
+    store_file = context.work_dir / "shared_library.sqlite3"
+    LibraryStore(store_file).save(documents=context.documents)
+    gui = LibraryStore(store_file)
+    gui.load_documents()
+    cli = LibraryStore(store_file)
+    cli.load_documents()
+    doc_ids = list(context.documents)
+    changed = doc_ids[::100]
+    counter = iter(range(10 ** 9))
+
+    def refresh_metadata():
+        # 1% of the records, as a fetch that refreshed them
+        round_number = next(counter)
+        cli.save(documents={doc_id: dict(context.documents[doc_id], title=f"Refreshed {round_number}")
+                            for doc_id in changed}, preserve=library_records.FILE_STATE_FIELDS)
+
+    def read_feed():
+        documents, revision = gui.changes()
+        gui.synced(revision)
+
+    def record_download():
+        # A download recorded by the GUI on a record the other process changed since
+        doc_id = changed[next(counter) % len(changed)]
+        details = dict(context.documents[doc_id], downloaded=True, file_size=1, sha256="0" * 64)
+        gui.save(documents={doc_id: details}, fields=library_records.FILE_STATE_FIELDS)
+
+    results = [context.measure("has_changes() with nothing new", gui.has_changes, repeat=max(context.repeat, 100)),
+               context.measure("changes() after 1% changed elsewhere", read_feed, items=len(changed),
+                               setup=refresh_metadata, repeat=max(context.repeat, 20)),
+               context.measure("save one record merged with another process's write", record_download,
+                               setup=refresh_metadata, repeat=max(context.repeat, 20))]
+    gui.close()
+    cli.close()
+    return results
+
+
+@benchmark("record_memory", repeat=1)
+def bench_record_memory(context):
+    """Memory held by the loaded records: plain dicts against DocumentRecord."""
+    import tracemalloc
+    from document_record import DocumentRecord
+
+    # As stored: one JSON text per document
+    rows = [(doc_id, json.dumps(details)) for doc_id, details in context.documents.items()]
+    results = []
+    for name, make in (("records as dicts", json.loads),
+                       ("records as DocumentRecord", lambda data: DocumentRecord(json.loads(data)))):
+        tracemalloc.start()
+        started = time.perf_counter()
+        records = {doc_id: make(data) for doc_id, data in rows}
+        elapsed = time.perf_counter() - started
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result = summarize(name, context.size, [elapsed], context.size)
+        result["allocated_mb"] = round(allocated / 1e6, 1)
+        result["bytes_per_record"] = round(allocated / max(len(records), 1))
+        results.append(result)
+        del records
+    return results
+
+
+@benchmark("partition_titles")
+def bench_partition_titles(context):
+    manager = context.manager()
+
+    def partition():
+        manager.get_display_titles(manager.get_not_downloaded_documents())
+        manager.get_display_titles(manager.get_downloaded_documents())
+
+    from library_index import LibraryIndex
+    library_index = LibraryIndex(manager)
+    doc_ids = list(context.documents)
+    counter = iter(range(10 ** 9))
+
+    def update_one():
+        library_index.update(doc_ids[next(counter) % len(doc_ids)])
+
+    return [context.measure("get_*_documents + get_display_titles", partition, items=context.size),
+            context.measure("LibraryIndex.build", library_index.build, items=context.size),
+            context.measure("LibraryIndex.update (one document)", update_one, repeat=max(context.repeat, 100))]
+
+
+@benchmark("populate_listing")
+def bench_populate_listing(context):
+    context.qt_app()
+    from library_index import LibraryIndex
+    from listing_model import DocumentListView
+    from title_filter import IncrementalFilter
+
+    library_index = LibraryIndex(context.manager())
+    library_index.build()
+    not_downloaded_list = DocumentListView(multi_select=True)
+    downloaded_list = DocumentListView()
+    title_filter = IncrementalFilter()
+
+    def populate_not_downloaded():
+        not_downloaded_list.populate_list(library_index.titles, library_index.partition(downloaded=False))
+
+    def populate_downloaded():
+        title_filter.set_keys(library_index.partition_keys(downloaded=True))
+        downloaded_list.populate_list(library_index.titles, library_index.partition(downloaded=True))
+
+    return [context.measure("populate_not_downloaded_listing", populate_not_downloaded,
+                            items=len(library_index.not_downloaded)),
+            context.measure("populate_downloaded_listing", populate_downloaded, items=len(library_index.downloaded))]
+
+
+@benchmark("filter_action")
+def bench_filter_action(context):
+    from search_index import SearchIndex
+    from title_filter import IncrementalFilter
+
+    manager = context.manager()
+    downloaded = manager.get_display_titles(manager.get_downloaded_documents())
+    title_filter = IncrementalFilter()
+    title_filter.set_titles(downloaded)
+    view = None
+    try:
+        context.qt_app()
+        from listing_model import DocumentListView
+        view = DocumentListView()
+        view.populate_list(dict(downloaded))
+    except SkipBenchmark:
+        pass
+
+    def type_query():
+        title_filter.reset()
+        for query in TYPING_QUERIES:
+            accepted = title_filter.match(query)
+            if view is not None:
+                view.set_filter(accepted)
+
+    # Full-text part: index synthetic text directly, so pypdf is not needed
+    index = SearchIndex(context.work_dir / "search.sqlite3")
+    for count, (doc_id, title) in enumerate(downloaded.items()):
+        if count >= context.args.index_docs:
+            break
+        index.add(doc_id, title, f"{title} order text " * 20, 0, 0)
+
+    def filter_action():
+        query = "climate energy"
+        accepted = title_filter.match(query)
+        ranking = dict.fromkeys(accepted or (), float("-inf"))
+        for doc_id, score in index.search(query):
+            ranking.setdefault(doc_id, score)
+        if view is not None:
+            view.set_filter(set(ranking), ranking)
+
+    results = [context.measure("search-as-you-type (per query sequence)", type_query, items=len(TYPING_QUERIES)),
+               context.measure("filter_action (titles + full text)", filter_action, repeat=max(context.repeat, 20))]
+    index.close()
+    return results
+
+
+@benchmark("facet_filter")
+def bench_facet_filter(context):
+    """Facet search and counts over every document, with and without keyword matches."""
+    from facet_index import FacetIndex, FacetSelection
+    from synthetic import PRESIDENTS
+
+    facets = FacetIndex()
+    keyword_matches = {doc_id for doc_id, details in context.documents.items() if "Climate" in details["title"]}
+    selections = [
+        FacetSelection(president=PRESIDENTS[2]),
+        FacetSelection(president=PRESIDENTS[2], first_year=2010, last_year=2012),
+        FacetSelection(first_year=2000, last_year=2015, signed_from="2004-03-01", signed_to="2011-06-30"),
+        FacetSelection(),
+    ]
+
+    def change_filters(matches):
+        def operation():
+            for selection in selections:
+                facets.search(selection, matches)
+        return operation
+
+    doc_ids = list(context.documents)
+    counter = iter(range(10 ** 9))
+
+    def update_one():
+        doc_id = doc_ids[next(counter) % len(doc_ids)]
+        facets.remove(doc_id)
+        facets.update(doc_id, context.documents[doc_id])
+
+    return [context.measure("FacetIndex.build", lambda: facets.build(context.documents), items=context.size),
+            context.measure("facet filter change (search + counts)", change_filters(None),
+                            items=len(selections), repeat=max(context.repeat, 20)),
+            context.measure("facet filter change with keyword matches", change_filters(keyword_matches),
+                            items=len(selections), repeat=max(context.repeat, 20)),
+            context.measure("FacetIndex.update (one document)", update_one, repeat=max(context.repeat, 100))]
+
+
+@benchmark("fetch_list", repeat=3)
+def bench_fetch_list(context):
+    from federal_register import FederalRegisterClient
+    from fetch_scheduler import FetchScheduler
+    from http_cache import HttpCache
+    from library_store import LibraryStore
+    from library_sync import LibrarySync
+
+    state = {}
+    store_file = context.work_dir / "fetch.sqlite3"
+
+    def setup():
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{store_file}{suffix}").unlink(missing_ok=True)
+        state["manager"] = context.manager({})
+        state["store"] = LibraryStore(store_file)
+
+    def fetch(cache=None):
+        sync = LibrarySync(state["manager"], FederalRegisterClient(context.server.url, cache=cache), state["store"],
+                           scheduler=FetchScheduler(concurrency=context.args.concurrency, rate=1000))
+        sync.sync_years(FIRST_YEAR, LAST_YEAR, full=True)
+        state["store"].close()
+
+    def measure(name, operation, cache_setup=None):
+        def full_setup():
+            setup()
+            if cache_setup:
+                cache_setup()
+            state["sent"] = context.server.bytes_sent
+        result = context.measure(name, operation, items=context.size, setup=full_setup)
+        # Of the last repetition
+        result["bytes_transferred"] = context.server.bytes_sent - state["sent"]
+        return result
+
+    cache = HttpCache(context.work_dir / "http_cache.sqlite3", max_bytes=1024 ** 3)
+
+    def expire_cache():
+        with cache.lock:
+            cache.connection.execute("UPDATE responses SET expires_at=0")
+
+    results = [measure("LibrarySync.sync_years (full, stub server)", fetch)]
+    setup()
+    fetch(cache)
+    results += [measure("LibrarySync.sync_years (full, warm API cache)", lambda: fetch(cache)),
+               measure("LibrarySync.sync_years (full, API cache revalidated)", lambda: fetch(cache),
+                       cache_setup=expire_cache)]
+    cache.close()
+    return results
+
+
+@benchmark("download_bulk", repeat=3)
+def bench_download_bulk(context):
+    from download_engine import DownloadEngine, DownloadJob, fsync_interval_from_mb, bandwidth_limit_from_kb
+
+    target = context.work_dir / "pdfs"
+    doc_ids = list(context.documents)[:context.args.download_files]
+    jobs = []
+
+    def setup():
+        shutil.rmtree(target, ignore_errors=True)
+        jobs[:] = [DownloadJob(doc_id=doc_id, url=f"{context.server.url}/pdf/{doc_id}.pdf",
+                               path=target / f"{doc_id}.pdf") for doc_id in doc_ids]
+
+    def download():
+        summary = DownloadEngine(workers=context.args.workers,
+                                 fsync_interval=fsync_interval_from_mb(context.args.fsync_mb),
+                                 adaptive=context.args.adaptive,
+                                 bandwidth_limit=bandwidth_limit_from_kb(context.args.bandwidth_limit_kb)).run(jobs)
+        if summary.failed:
+            raise RuntimeError(f"{len(summary.failed)} downloads failed")
+
+    workers = f"{context.args.workers}{' adaptive' if context.args.adaptive else ''} workers"
+    if context.args.bandwidth_limit_kb:
+        workers += f", {context.args.bandwidth_limit_kb} KB/s"
+    result = context.measure(f"DownloadEngine.run ({workers}, stub server)", download,
+                             items=len(doc_ids), setup=setup)
+    result["mb_per_sec"] = round(result["items_per_sec"] * len(context.server.pdf) / 1e6, 2)
+    return [result]
+
+
+@benchmark("directory_reconcile")
+def bench_directory_reconcile(context):
+    from directory_reconciler import DirectoryReconciler, scan_directory
+    from library_store import LibraryStore
+    import library_records
+
+    manager = context.manager()
+    directory = context.work_dir / "reconcile"
+    directory.mkdir(exist_ok=True)
+    pdf = b"%PDF-1.4\n" + b"x" * 1000 + b"\n%%EOF\n"
+    names = {}
+    for doc_id in manager.executive_orders:
+        library_records.get_document(manager, doc_id)[library_records.DOWNLOADED_FIELD] = True
+        names[doc_id] = manager.get_file_name(doc_id)
+        (directory / names[doc_id]).write_bytes(pdf)
+    store = LibraryStore(context.work_dir / "reconcile.sqlite3")
+    reconciler = DirectoryReconciler(manager, store, directory)
+    reconciler.reconcile()
+
+    scan = context.measure("scan_directory", lambda: scan_directory(directory), items=context.size)
+    unchanged = context.measure("DirectoryReconciler.reconcile (no changes)", reconciler.reconcile,
+                                items=context.size)
+
+    # 1% of the files removed by another program, then put back
+    churn = list(names.values())[::100]
+    removed = []
+
+    def toggle():
+        if removed:
+            for name in removed:
+                (directory / name).write_bytes(pdf)
+            removed.clear()
+        else:
+            for name in churn:
+                (directory / name).unlink()
+            removed.extend(churn)
+
+    changed = context.measure("DirectoryReconciler.reconcile (1% added or removed)", reconciler.reconcile,
+                              items=context.size, setup=toggle)
+    changed["delta"] = len(churn)
+    store.close()
+    shutil.rmtree(directory, ignore_errors=True)
+    return [scan, unchanged, changed]
+
+
+@benchmark("library_export")
+def bench_library_export(context):
+    from library_export import LibraryExporter, parquet_available
+    from library_store import LibraryStore
+
+    store = LibraryStore(context.work_dir / "export.sqlite3")
+    store.save(documents=context.documents)
+    exporter = LibraryExporter(store, context.work_dir)
+    results = [context.measure("LibraryExporter.export (jsonl)",
+                               lambda: exporter.export(context.work_dir / "export.jsonl"), items=context.size)]
+    if parquet_available():
+        results.append(context.measure("LibraryExporter.export (parquet)",
+                                       lambda: exporter.export(context.work_dir / "export.parquet"),
+                                       items=context.size))
+
+    # 1% of the records changed since the last export
+    changed = list(context.documents)[::100]
+    incremental = context.measure(
+        "LibraryExporter.export (jsonl, since last)",
+        lambda: exporter.export(context.work_dir / "export_changes.jsonl", since_last=True), items=len(changed),
+        setup=lambda: store.save(documents={doc_id: context.documents[doc_id] for doc_id in changed}))
+    results.append(incremental)
+    store.close()
+    return results
+
+
+# Driver
+def run_size(size, args):
+    """Run the selected benchmarks for one library size in this process."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="eo-bench-") as work_dir:
+        context = Context(size, args.repeat, work_dir, args)
+        with StubServer(context.documents, pdf_size=args.pdf_size) as server:
+            context.server = server
+            for name in selected_benchmarks(args):
+                fn, repeat = BENCHMARKS[name]
+                context.repeat = min(args.repeat, repeat) if repeat else args.repeat
+                try:
+                    for result in fn(context):
+                        result["benchmark"] = name
+                        results.append(result)
+                except SkipBenchmark as e:
+                    results.append({"benchmark": name, "size": size, "skipped": str(e)})
+    return results
+
+
+def selected_benchmarks(args):
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(unknown)} (available: {', '.join(BENCHMARKS)})")
+    return names
+
+
+def child_command(size, args):
+    command = [sys.executable, str(Path(__file__).resolve()), "--child", str(size),
+               "--repeat", str(args.repeat), "--workers", str(args.workers), "--fsync-mb", str(args.fsync_mb),
+               "--concurrency", str(args.concurrency), "--download-files", str(args.download_files),
+               "--index-docs", str(args.index_docs), "--pdf-size", str(args.pdf_size),
+               "--bandwidth-limit-kb", str(args.bandwidth_limit_kb)]
+    if args.adaptive:
+        command.append("--adaptive")
+    if args.only:
+        command += ["--only", args.only]
+    return command
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["name"], r["size"]): r for r in json.load(f)["results"] if "name" in r}
+    print(f"\nCompared with {baseline_path} (items/sec ratio, p50 latency ratio):")
+    for result in results:
+        old = baseline.get((result.get("name"), result.get("size")))
+        if not old or not old.get("items_per_sec") or "name" not in result:
+            continue
+        speed = result["items_per_sec"] / old["items_per_sec"]
+        latency = result["latency_ms"]["p50"] / old["latency_ms"]["p50"] if old["latency_ms"]["p50"] else 0
+        print(f"  {result['name']:<50} {result['size']:>7}  x{speed:5.2f}  p50 x{latency:5.2f}")
+
+
+def print_summary(results):
+    for result in results:
+        if "skipped" in result:
+            print(f"  {result['benchmark']:<50} {result['size']:>7}  skipped: {result['skipped']}")
+            continue
+        print(f"  {result['name']:<50} {result['size']:>7}  {result['items_per_sec'] or 0:>12.1f} items/s"
+              f"  p50 {result['latency_ms']['p50']:>10.3f} ms  p99 {result['latency_ms']['p99']:>10.3f} ms"
+              f"  rss {result['peak_rss_mb']} MB"
+              + (f"  allocated {result['allocated_mb']} MB" if "allocated_mb" in result else "")
+              + (f"  sent {result['bytes_transferred']:,} B" if "bytes_transferred" in result else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated library sizes")
+    parser.add_argument("--only", help=f"comma separated benchmarks ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--workers", type=int, default=4, help="download workers")
+    parser.add_argument("--adaptive", action="store_true", help="adapt the number of download workers")
+    parser.add_argument("--bandwidth-limit-kb", type=int, default=0, help="download bandwidth cap in KB/s (0: none)")
+    parser.add_argument("--fsync-mb", type=int, default=0, help="download fsync interval in MB (0: per file, -1: off)")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent list fetches")
+    parser.add_argument("--download-files", type=int, default=DEFAULT_DOWNLOAD_FILES)
+    parser.add_argument("--index-docs", type=int, default=DEFAULT_INDEX_DOCS)
+    parser.add_argument("--pdf-size", type=int, default=64 * 1024)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        json.dump(run_size(args.child, args), sys.stdout)
+        return 0
+
+    selected_benchmarks(args)
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        print(f"Library size {size}...", flush=True)
+        child = subprocess.run(child_command(size, args), stdout=subprocess.PIPE, check=True)
+        size_results = json.loads(child.stdout)
+        print_summary(size_results)
+        results.extend(size_results)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "version": program_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
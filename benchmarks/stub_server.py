@@ -0,0 +1,146 @@
+#  stub_server.py
+
+"""
+Local stand-in for the Federal Register documents API and its PDF host.
+
+Serves documents.json pages (year, since and page conditions as the real API)
+from a synthetic library with an ETag and a Last-Modified date (answering
+If-None-Match or If-Modified-Since with 304), and a fixed synthetic PDF with
+an ETag and Range support for every /pdf/<doc_id>.pdf. throttle() makes the
+next page requests answer 429 with a Retry-After, as the API does when a
+client goes over its rate limit. The tests use it as well.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import urllib.parse
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from synthetic import synthetic_pdf
+
+DEFAULT_PDF_SIZE = 64 * 1024
+
+
+class StubServer:
+    def __init__(self, documents, pdf_size=DEFAULT_PDF_SIZE, etag=True):
+        """etag=False leaves only Last-Modified for revalidating pages."""
+        self.by_year = {}
+        for details in documents.values():
+            result = {key: value for key, value in details.items() if key not in ("downloaded", "file_name")}
+            self.by_year.setdefault(int(details["publication_date"][:4]), []).append(result)
+        for results in self.by_year.values():
+            results.sort(key=lambda result: (result["publication_date"], result["document_number"]))
+        self.pdf = synthetic_pdf(pdf_size)
+        self.etag = etag
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self.requests = 0
+        self.bytes_sent = 0
+        self.page_requests = []     # request headers of each documents.json request
+        self.throttled = 0          # page requests still to answer with 429
+        self.retry_after = None
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="stub-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def throttle(self, count, retry_after=None):
+        """Answer the next count page requests with 429 and Retry-After (seconds; None: no header)."""
+        with self.lock:
+            self.throttled = count
+            self.retry_after = retry_after
+
+    def take_throttle(self):
+        with self.lock:
+            if not self.throttled:
+                return None
+            self.throttled -= 1
+            return {} if self.retry_after is None else {"Retry-After": str(self.retry_after)}
+
+    def page(self, query):
+        year = int(query["conditions[publication_date][year]"][0])
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["20"])[0])
+        results = self.by_year.get(year, [])
+        since = query.get("conditions[publication_date][gte]", [None])[0]
+        if since:
+            results = [result for result in results if result["publication_date"] >= since]
+        total_pages = (len(results) + per_page - 1) // per_page
+        return {"count": len(results), "total_pages": total_pages,
+                "results": results[(page - 1) * per_page:page * per_page]}
+
+    def handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.requests += 1
+                url = urllib.parse.urlparse(self.path)
+                if url.path.endswith("/documents.json"):
+                    with stub.lock:
+                        stub.page_requests.append(dict(self.headers))
+                    throttled = stub.take_throttle()
+                    if throttled is not None:
+                        self.respond(429, b"rate limited", "text/plain", throttled)
+                        return
+                    body = json.dumps(stub.page(urllib.parse.parse_qs(url.query))).encode()
+                    headers = {"Last-Modified": stub.last_modified}
+                    if stub.etag:
+                        headers["ETag"] = f'"{hashlib.sha1(body).hexdigest()}"'
+                    if "If-None-Match" in self.headers:
+                        unchanged = self.headers["If-None-Match"] == headers.get("ETag")
+                    else:
+                        unchanged = self.headers.get("If-Modified-Since") == stub.last_modified
+                    if unchanged:
+                        self.respond(304, b"", "application/json", headers)
+                    else:
+                        self.respond(200, body, "application/json", headers)
+                elif url.path.startswith("/pdf/"):
+                    start = 0
+                    range_header = self.headers.get("Range", "")
+                    if range_header.startswith("bytes=") and self.headers.get("If-Range") == '"bench"':
+                        start = int(range_header[6:].split("-")[0])
+                    headers = {"ETag": '"bench"'}
+                    if start:
+                        headers["Content-Range"] = f"bytes {start}-{len(stub.pdf) - 1}/{len(stub.pdf)}"
+                    self.respond(206 if start else 200, stub.pdf[start:], "application/pdf", headers)
+                else:
+                    self.respond(404, b"not found", "text/plain")
+
+            def respond(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                stub.bytes_sent += len(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
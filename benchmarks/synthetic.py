@@ -0,0 +1,47 @@
+#  synthetic.py
+
+"""Deterministic synthetic executive order libraries for the benchmarks."""
+
+import random
+
+FIRST_YEAR = 1994
+LAST_YEAR = 2025
+PRESIDENTS = ["William J. Clinton", "George W. Bush", "Barack Obama", "Donald J. Trump", "Joseph R. Biden Jr."]
+TITLE_WORDS = [
+    "Protecting", "Promoting", "Strengthening", "Establishing", "Amending", "Revoking", "Advancing",
+    "Federal", "National", "American", "Public", "Climate", "Energy", "Health", "Security", "Workforce",
+    "Trade", "Infrastructure", "Education", "Cybersecurity", "Emergency", "Agency", "Regulatory", "Council",
+]
+PDF_PAGE = b"BT /F1 12 Tf 72 720 Td (Executive order benchmark text) Tj ET\n"
+
+
+def synthetic_documents(count, downloaded_ratio=0.5, seed=1994, base_url="http://127.0.0.1"):
+    """{doc_id: details} shaped like Federal Register API results plus library fields."""
+    rng = random.Random(seed)
+    years = LAST_YEAR - FIRST_YEAR + 1
+    documents = {}
+    for number in range(count):
+        year = FIRST_YEAR + number % years
+        doc_id = f"{year}-{number:06d}"
+        title = " ".join(rng.sample(TITLE_WORDS, rng.randint(3, 7)))
+        month, day = rng.randint(1, 12), rng.randint(1, 28)
+        documents[doc_id] = {
+            "document_number": doc_id,
+            "executive_order_number": 12000 + number,
+            "title": title,
+            "signing_date": f"{year}-{month:02d}-{day:02d}",
+            "publication_date": f"{year}-{month:02d}-{min(day + 3, 28):02d}",
+            "pdf_url": f"{base_url}/pdf/{doc_id}.pdf",
+            "html_url": f"{base_url}/html/{doc_id}",
+            "citation": f"{50 + year - FIRST_YEAR} FR {number}",
+            "president": {"name": PRESIDENTS[(year - FIRST_YEAR) // 8 % len(PRESIDENTS)], "identifier": "x"},
+            "downloaded": rng.random() < downloaded_ratio,
+            "file_name": f"{doc_id}.pdf",
+        }
+    return documents
+
+
+def synthetic_pdf(size):
+    """A PDF-shaped body of roughly size bytes (header, repeated content, %%EOF trailer)."""
+    body = PDF_PAGE * max(1, (size - 32) // len(PDF_PAGE))
+    return b"%PDF-1.4\n" + body + b"\n%%EOF\n"
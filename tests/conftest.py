@@ -0,0 +1,47 @@
+#  conftest.py
+
+import datetime
+import sys
+from pathlib import Path
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+REPO_DIR = TESTS_DIR.parent
+sys.path.insert(0, str(REPO_DIR / "benchmarks"))
+sys.path.insert(0, str(REPO_DIR))
+
+import CRExecOrders  # noqa: F401  (puts the program modules on sys.path)
+
+from stub_server import StubServer
+
+YEAR = datetime.date.today().year   # the current year's pages use the client's ttl, not the historical one
+
+
+def documents(count, year=YEAR):
+    """{doc_id: details} of count orders published in year, shaped like API results."""
+    return {
+        f"{year}-{number:05d}": {
+            "document_number": f"{year}-{number:05d}",
+            "executive_order_number": 14000 + number,
+            "title": f"Executive Order {number}",
+            "signing_date": f"{year}-01-{number % 28 + 1:02d}",
+            "publication_date": f"{year}-01-{number % 28 + 1:02d}",
+            "pdf_url": f"http://127.0.0.1/pdf/{year}-{number:05d}.pdf",
+            "president": {"name": "Test President", "identifier": "test"},
+        }
+        for number in range(count)
+    }
+
+
+@pytest.fixture
+def stub():
+    with StubServer(documents(30)) as server:
+        yield server
+
+
+@pytest.fixture
+def last_modified_stub():
+    """A server that sends only Last-Modified, no ETag."""
+    with StubServer(documents(30), etag=False) as server:
+        yield server
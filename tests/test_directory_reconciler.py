@@ -0,0 +1,111 @@
+#  test_directory_reconciler.py
+
+import hashlib
+import os
+
+import pytest
+
+pytest.importorskip("WrapCapExecOrders")
+from WrapCapExecOrders import ExecutiveOrderManager
+
+import library_records
+from conftest import documents
+from directory_reconciler import DirectoryReconciler
+from library_store import LibraryStore
+
+ORDERS = documents(3)
+DOC_ID, OTHER_DOC_ID = list(ORDERS)[:2]
+PDF = b"%PDF-1.4\n" + b"x" * 100 + b"\n%%EOF\n"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LibraryStore(tmp_path / "library.sqlite3")
+    store.save(documents=ORDERS)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def manager(store):
+    manager = ExecutiveOrderManager()
+    library_records.set_documents(manager, store.load_documents())
+    return manager
+
+
+@pytest.fixture
+def reconciler(manager, store, tmp_path):
+    return DirectoryReconciler(manager, store, tmp_path)
+
+
+def pdf_path(reconciler, doc_id):
+    return reconciler.directory / reconciler.manager.get_file_name(doc_id)
+
+
+def write(path, data):
+    path.write_bytes(data)
+    # A later write in the same clock tick must still show as a change
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def stored(store, doc_id):
+    return store.read_documents("SELECT doc_id, downloaded, data FROM documents WHERE doc_id=?",
+                                (doc_id,))[0][doc_id]
+
+
+def test_a_pdf_that_appeared_is_found(reconciler, store):
+    assert reconciler.reconcile().doc_ids == []
+    write(pdf_path(reconciler, DOC_ID), PDF)
+    # Not a whole PDF: still being written, or an error page
+    write(pdf_path(reconciler, OTHER_DOC_ID), b"<html>")
+    result = reconciler.reconcile()
+    assert result.found == [DOC_ID]
+    assert result.files == 2
+    details = reconciler.manager.executive_orders[DOC_ID]
+    assert details["downloaded"] is True
+    assert details["file_size"] == len(PDF)
+    assert stored(store, DOC_ID)["downloaded"] is True
+    assert reconciler.reconcile().doc_ids == []
+
+
+def test_a_pdf_that_disappeared_is_missing(reconciler, store):
+    path = pdf_path(reconciler, DOC_ID)
+    write(path, PDF)
+    reconciler.reconcile()
+    path.unlink()
+    result = reconciler.reconcile()
+    assert result.missing == [DOC_ID]
+    assert reconciler.manager.executive_orders[DOC_ID]["downloaded"] is False
+    assert stored(store, DOC_ID)["downloaded"] is False
+
+
+def test_a_replaced_pdf_loses_its_recorded_hash(reconciler, store):
+    path = pdf_path(reconciler, DOC_ID)
+    write(path, PDF)
+    reconciler.reconcile()
+    details = reconciler.manager.executive_orders[DOC_ID]
+    details["sha256"] = hashlib.sha256(PDF).hexdigest()
+    # Rewritten with the same content, e.g. downloaded again: left alone
+    write(path, PDF)
+    assert reconciler.reconcile().doc_ids == []
+    assert details["sha256"] == hashlib.sha256(PDF).hexdigest()
+
+    write(path, PDF.replace(b"x", b"y"))
+    result = reconciler.reconcile()
+    assert result.changed == [DOC_ID]
+    assert "sha256" not in details
+    assert "sha256" not in stored(store, DOC_ID)
+
+
+def test_a_file_another_process_recorded_is_left_to_the_change_feed(reconciler, store):
+    reconciler.reconcile()
+    write(pdf_path(reconciler, DOC_ID), PDF)
+    # crlibrary-cli downloaded it and saved the row with its hash
+    other = LibraryStore(store.path)
+    other.save(documents={DOC_ID: dict(ORDERS[DOC_ID], downloaded=True, file_size=len(PDF),
+                                       sha256=hashlib.sha256(PDF).hexdigest())},
+               fields=library_records.FILE_STATE_FIELDS)
+    other.close()
+    assert reconciler.reconcile().doc_ids == []
+    assert stored(store, DOC_ID)["sha256"] == hashlib.sha256(PDF).hexdigest()
@@ -0,0 +1,69 @@
+#  test_document_record.py
+
+import pytest
+
+from conftest import documents
+from document_record import DocumentRecord, shared_value
+
+DOC_ID, DETAILS = next(iter(documents(1).items()))
+
+
+def test_reads_like_the_dict_it_was_built_from():
+    record = DocumentRecord(DETAILS)
+    assert dict(record) == {**DETAILS, "file_name": f"{DOC_ID}.pdf"}
+    assert record["title"] == DETAILS["title"]
+    assert record.get("html_url") is None
+    assert record.get("html_url", "") == ""
+    with pytest.raises(KeyError):
+        record["html_url"]
+    assert "html_url" not in record
+
+
+def test_known_fields_use_slots_and_others_a_small_dict():
+    record = DocumentRecord(DETAILS)
+    assert not hasattr(record, "__dict__")
+    assert record.extra is None
+    record["type"] = "Presidential Document"
+    assert record.extra == {"type": "Presidential Document"}
+    assert record["type"] == "Presidential Document"
+    assert list(record)[-1] == "type"
+    del record["type"]
+    assert "type" not in record
+
+
+def test_file_name_is_derived_unless_it_differs():
+    record = DocumentRecord(DETAILS, file_name=f"{DOC_ID}.pdf")
+    assert not hasattr(record, "file_name")
+    assert record["file_name"] == f"{DOC_ID}.pdf"
+    record["file_name"] = "renamed.pdf"
+    assert record["file_name"] == "renamed.pdf"
+    record["file_name"] = f"{DOC_ID}.pdf"
+    assert not hasattr(record, "file_name")
+    # Deleting the derived name leaves an explicit None, not the derived name again
+    del record["file_name"]
+    assert record["file_name"] is None
+
+
+def test_dates_and_president_are_shared_between_records():
+    first = DocumentRecord(DETAILS)
+    # Equal values built separately, as each parsed API result is
+    signing_date = "".join(DETAILS["signing_date"])
+    assert signing_date is not DETAILS["signing_date"]
+    second = DocumentRecord({**DETAILS, "signing_date": signing_date, "president": dict(DETAILS["president"])})
+    assert second["signing_date"] is first["signing_date"]
+    assert second["president"] is first["president"]
+    second["president"] = {"name": "Test President", "identifier": "test"}
+    assert second["president"] is first["president"]
+
+
+def test_shared_value_leaves_unhashable_values_alone():
+    value = {"names": ["a", "b"]}
+    assert shared_value(value) is value
+
+
+def test_copy_is_independent():
+    record = DocumentRecord(DETAILS, downloaded=True)
+    copy = record.copy()
+    copy["downloaded"] = False
+    assert record["downloaded"] is True
+    assert copy == {**record, "downloaded": False}
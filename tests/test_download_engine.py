@@ -0,0 +1,104 @@
+#  test_download_engine.py
+
+import hashlib
+
+import pytest
+
+import download_engine
+from download_engine import DownloadEngine, DownloadJob
+from file_integrity import part_path, part_meta_path, write_part_meta
+
+DOC_ID = "2021-00001"
+
+
+@pytest.fixture
+def job(stub, tmp_path):
+    return DownloadJob(DOC_ID, f"{stub.url}/pdf/{DOC_ID}.pdf", tmp_path / f"{DOC_ID}.pdf")
+
+
+def download(job):
+    """Run job alone; returns (summary, FileInfo or None)."""
+    infos = {}
+
+    def on_finished(doc_id, ok, error_message, info):
+        infos[doc_id] = info
+
+    summary = DownloadEngine(workers=1, backoff=0).run([job], on_finished=on_finished)
+    return summary, infos.get(job.doc_id)
+
+
+def start_part(job, data, etag='"bench"'):
+    """A partial download of job as an interrupted attempt leaves it."""
+    part_path(job.path).write_bytes(data)
+    write_part_meta(job.path, {"url": job.url, "etag": etag, "last_modified": None})
+
+
+def test_downloads_to_the_final_name_with_its_hash(stub, job):
+    summary, info = download(job)
+    assert summary.succeeded == [DOC_ID]
+    assert job.path.read_bytes() == stub.pdf
+    assert info.size == len(stub.pdf)
+    assert info.sha256 == hashlib.sha256(stub.pdf).hexdigest()
+    assert info.etag == '"bench"'
+    assert not part_path(job.path).exists()
+    assert not part_meta_path(job.path).exists()
+
+
+def test_a_partial_file_is_resumed_with_a_range_request(stub, job):
+    half = len(stub.pdf) // 2
+    start_part(job, stub.pdf[:half])
+    summary, info = download(job)
+    assert summary.succeeded == [DOC_ID]
+    assert info.resumed
+    assert stub.bytes_sent == len(stub.pdf) - half
+    assert job.path.read_bytes() == stub.pdf
+    # The hash covers the whole file, not only the bytes of this transfer
+    assert info.sha256 == hashlib.sha256(stub.pdf).hexdigest()
+
+
+def test_a_changed_file_is_fetched_whole(stub, job):
+    # If-Range does not match: the server sends the whole new version
+    start_part(job, b"%PDF-1.4 old version", etag='"old"')
+    summary, info = download(job)
+    assert summary.succeeded == [DOC_ID]
+    assert not info.resumed
+    assert stub.bytes_sent == len(stub.pdf)
+    assert job.path.read_bytes() == stub.pdf
+
+
+def test_a_partial_file_without_validators_is_discarded(stub, job):
+    part_path(job.path).write_bytes(stub.pdf[:100])
+    summary, info = download(job)
+    assert not info.resumed
+    assert stub.bytes_sent == len(stub.pdf)
+    assert job.path.read_bytes() == stub.pdf
+
+
+def test_a_file_matching_its_recorded_hash_is_skipped(stub, job):
+    job.path.write_bytes(stub.pdf)
+    job.size, job.sha256 = len(stub.pdf), hashlib.sha256(stub.pdf).hexdigest()
+    summary, info = download(job)
+    assert summary.skipped == [DOC_ID]
+    assert info.skipped
+    assert stub.requests == 0
+
+
+def test_a_file_not_matching_its_recorded_hash_is_downloaded_again(stub, job):
+    job.size, job.sha256 = len(stub.pdf), hashlib.sha256(stub.pdf).hexdigest()
+    # Same size, still shaped like a PDF, different bytes
+    job.path.write_bytes(stub.pdf.replace(b"%PDF-1.4", b"%PDF-1.7", 1))
+    summary, info = download(job)
+    assert summary.succeeded == [DOC_ID]
+    assert stub.requests == 1
+    assert job.path.read_bytes() == stub.pdf
+    assert info.sha256 == job.sha256
+
+
+@pytest.mark.parametrize("fsync_interval, fsyncs", [(None, 0), (0, 1), (16 * 1024, 4)])
+def test_fsync_interval(stub, job, monkeypatch, fsync_interval, fsyncs):
+    calls = []
+    monkeypatch.setattr(DownloadEngine, "fsync", staticmethod(calls.append))
+    monkeypatch.setattr(download_engine, "CHUNK_SIZE", 16 * 1024)
+    summary = DownloadEngine(workers=1, fsync_interval=fsync_interval).run([job])
+    assert summary.succeeded == [DOC_ID]
+    assert len(calls) == fsyncs
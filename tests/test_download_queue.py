@@ -0,0 +1,117 @@
+#  test_download_queue.py
+
+import pytest
+
+import download_queue
+from download_engine import DownloadJob
+from download_queue import DownloadQueue, MAX_QUEUE_ATTEMPTS, PRIORITY_SELECTION
+from library_store import LibraryStore
+
+
+def jobs(*doc_ids):
+    return [DownloadJob(doc_id, f"http://127.0.0.1/pdf/{doc_id}.pdf", f"/library/{doc_id}.pdf")
+            for doc_id in doc_ids]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "library.sqlite3"
+
+
+@pytest.fixture
+def queue(path):
+    store = LibraryStore(path)
+    yield DownloadQueue(store)
+    store.close()
+
+
+@pytest.fixture
+def other_queue(path):
+    """The same queue as seen from another process, e.g. crlibrary-cli."""
+    store = LibraryStore(path)
+    yield DownloadQueue(store)
+    store.close()
+
+
+def doc_ids(queue, **kwargs):
+    return [job.doc_id for job in queue.jobs(**kwargs)]
+
+
+def test_jobs_come_out_by_priority_then_in_queued_order(queue):
+    assert queue.add(jobs("a", "b", "c")) == 3
+    assert queue.add(jobs("d", "b"), priority=PRIORITY_SELECTION) == 1
+    # Queued again at the same or a lower priority: keeps its place
+    assert queue.add(jobs("a", "d")) == 0
+    assert queue.count() == 4
+    assert doc_ids(queue) == ["d", "b", "a", "c"]
+
+
+def test_jobs_keep_their_recorded_size_and_hash(queue):
+    job = DownloadJob("a", "http://127.0.0.1/pdf/a.pdf", "/library/a.pdf", size=10, sha256="ab" * 32)
+    queue.add([job])
+    claimed = queue.next_job()
+    assert (claimed.url, str(claimed.path), claimed.size, claimed.sha256) == \
+        (job.url, job.path, job.size, job.sha256)
+
+
+def test_claimed_entries_are_skipped_by_other_queues(queue, other_queue):
+    queue.add(jobs("a", "b", "c"))
+    assert queue.next_job().doc_id == "a"
+    assert doc_ids(other_queue) == ["b", "c"]
+    assert queue.available() == 0
+    # Once released, the entries are anybody's again
+    other_queue.release()
+    queue.release()
+    assert other_queue.available() == 3
+    assert doc_ids(other_queue, doc_ids={"c"}) == ["c"]
+
+
+def test_an_expired_claim_is_taken_over(queue, other_queue, monkeypatch):
+    queue.add(jobs("a"))
+    queue.next_job()
+    assert other_queue.next_job() is None
+    monkeypatch.setattr(download_queue, "CLAIM_TIMEOUT", -1)
+    assert other_queue.available() == 1
+    assert other_queue.next_job().doc_id == "a"
+
+
+def test_pausing_stops_handing_out_jobs(queue, other_queue):
+    queue.add(jobs("a", "b", "c"))
+    handed_out = []
+    for job in queue.jobs():
+        handed_out.append(job.doc_id)
+        queue.set_paused(True)
+        # Downloaded while the pause comes in
+        queue.remove(job.doc_id)
+    assert handed_out == ["a"]
+    # Persisted: another process (or the next start) does not resume it either
+    assert DownloadQueue(other_queue.store).is_paused()
+    queue.set_paused(False, persist=False)
+    assert doc_ids(queue) == ["b", "c"]
+    assert DownloadQueue(other_queue.store).is_paused()
+
+
+def test_submitted_jobs_are_added_before_the_next_claim(queue):
+    queue.add(jobs("a", "b"))
+    queue.submit(jobs("c"))
+    assert queue.count() == 2
+    assert queue.submitted_count() == 1
+    added = []
+    handed_out = []
+    for job in queue.jobs(on_added=added.append):
+        handed_out.append(job.doc_id)
+        if job.doc_id == "a":
+            queue.submit(jobs("d", "a"), priority=PRIORITY_SELECTION)
+    assert handed_out == ["a", "d", "b", "c"]
+    assert added == [1, 1]
+    assert queue.submitted_count() == 0
+
+
+def test_failing_entries_are_dropped_after_max_attempts(queue):
+    queue.add(jobs("a"))
+    for attempt in range(1, MAX_QUEUE_ATTEMPTS):
+        assert queue.record_failure("a", f"HTTP 500 ({attempt})")
+    assert queue.store.read("SELECT attempts, last_error FROM download_queue")[0] == \
+        (MAX_QUEUE_ATTEMPTS - 1, f"HTTP 500 ({MAX_QUEUE_ATTEMPTS - 1})")
+    assert not queue.record_failure("a", "HTTP 500")
+    assert queue.count() == 0
@@ -0,0 +1,76 @@
+#  test_facet_index.py
+
+import pytest
+
+from facet_index import FacetIndex, FacetSelection
+
+BIDEN = {"name": "Joseph R. Biden Jr.", "identifier": "joe-biden"}
+TRUMP = {"name": "Donald Trump", "identifier": "donald-trump"}
+
+
+def order(president, signing_date, publication_date=None):
+    return {"president": president, "signing_date": signing_date,
+            "publication_date": publication_date or signing_date}
+
+
+DOCUMENTS = {
+    "a": order(TRUMP, "2020-12-30"),
+    "b": order(BIDEN, "2021-01-20"),
+    "c": order(BIDEN, "2021-06-01"),
+    "d": order(BIDEN, "2022-03-15"),
+    # No signing date: the year comes from the publication date
+    "e": order(TRUMP, None, "2019-05-01"),
+}
+
+
+@pytest.fixture
+def index():
+    index = FacetIndex()
+    index.build(DOCUMENTS)
+    return index
+
+
+def test_no_selection_counts_every_document(index):
+    result = index.search()
+    assert result.accepted is None
+    assert result.total == 5
+    assert result.presidents == {"Donald Trump": 2, "Joseph R. Biden Jr.": 3}
+    assert result.years == {2019: 1, 2020: 1, 2021: 2, 2022: 1}
+    assert index.year_range() == (2019, 2022)
+
+
+def test_each_facet_is_counted_under_the_other_filters(index):
+    result = index.search(FacetSelection(president="Joseph R. Biden Jr.", first_year=2021, last_year=2021))
+    assert result.accepted == {"b", "c"}
+    assert result.total == 2
+    # Presidents under the year filter only, years under the president filter only
+    assert result.presidents == {"Donald Trump": 0, "Joseph R. Biden Jr.": 2}
+    assert result.years == {2019: 0, 2020: 0, 2021: 2, 2022: 1}
+
+
+def test_signing_date_range_includes_both_bounds(index):
+    assert index.search(FacetSelection(signed_from="2021-01-20", signed_to="2021-06-01")).accepted == {"b", "c"}
+    assert index.search(FacetSelection(signed_from="2021-01-21")).accepted == {"c", "d"}
+    assert index.search(FacetSelection(signed_to="2020-12-30")).accepted == {"a"}
+
+
+def test_keyword_matches_narrow_every_count(index):
+    result = index.search(FacetSelection(first_year=2020), matches={"a", "b", "e"})
+    assert result.accepted == {"a", "b"}
+    assert result.presidents == {"Donald Trump": 1, "Joseph R. Biden Jr.": 1}
+    assert result.years == {2019: 1, 2020: 1, 2021: 1, 2022: 0}
+
+
+def test_updates_and_removals_reach_the_postings_and_cached_lookups(index):
+    selection = FacetSelection(first_year=2021, last_year=2021)
+    assert index.search(selection).accepted == {"b", "c"}
+    index.update("d", order(BIDEN, "2021-09-09"))
+    index.update("f", order(TRUMP, "2021-01-19"))
+    assert index.search(selection).accepted == {"b", "c", "d", "f"}
+    assert index.search(FacetSelection(signed_from="2021-09-01")).accepted == {"d"}
+    index.remove("a")
+    index.remove("e")
+    result = index.search()
+    assert result.presidents == {"Donald Trump": 1, "Joseph R. Biden Jr.": 3}
+    assert 2019 not in result.years and 2020 not in result.years
+    assert len(index) == 4
@@ -0,0 +1,27 @@
+#  test_federal_register.py
+
+import pytest
+
+from conftest import YEAR
+from federal_register import FederalRegisterClient, RateLimited
+
+
+def test_fetch_page(stub):
+    results, total_pages = FederalRegisterClient(stub.url).fetch_page(YEAR)
+    assert len(results) == 30
+    assert total_pages == 1
+    assert stub.page_requests[0].get("If-None-Match") is None
+
+
+def test_rate_limited_carries_retry_after(stub):
+    stub.throttle(1, retry_after=7)
+    with pytest.raises(RateLimited) as raised:
+        FederalRegisterClient(stub.url).fetch_page(YEAR)
+    assert raised.value.retry_after == 7.0
+
+
+def test_rate_limited_without_retry_after(stub):
+    stub.throttle(1)
+    with pytest.raises(RateLimited) as raised:
+        FederalRegisterClient(stub.url).fetch_page(YEAR)
+    assert raised.value.retry_after is None
@@ -0,0 +1,88 @@
+#  test_fetch_scheduler.py
+
+import threading
+import time
+
+import pytest
+
+from conftest import YEAR
+from federal_register import FederalRegisterClient, RateLimited
+from fetch_scheduler import FetchScheduler, FetchCancelled
+from rate_limit import TokenBucket
+
+
+def test_retries_after_the_servers_retry_after(stub):
+    stub.throttle(2, retry_after=0.3)
+    scheduler = FetchScheduler(concurrency=2, rate=100)
+    started = time.monotonic()
+    results, _ = scheduler.call(FederalRegisterClient(stub.url).fetch_page, YEAR)
+    assert time.monotonic() - started >= 0.6
+    assert len(results) == 30
+    assert len(stub.page_requests) == 3
+
+
+def test_gives_up_after_max_retries(stub):
+    stub.throttle(10, retry_after=0)
+    scheduler = FetchScheduler(rate=100, max_retries=2)
+    with pytest.raises(RateLimited):
+        scheduler.call(FederalRegisterClient(stub.url).fetch_page, YEAR)
+    assert len(stub.page_requests) == 3
+
+
+def test_rate_limit_pauses_every_worker(stub):
+    client = FederalRegisterClient(stub.url)
+    scheduler = FetchScheduler(concurrency=4, rate=100)
+    stub.throttle(1, retry_after=0.5)
+    started = time.monotonic()
+    done = dict(scheduler.run({page: (client.fetch_page, (YEAR, None, page)) for page in range(1, 5)}))
+    assert sorted(done) == [1, 2, 3, 4]
+    # Requests sent after the 429 waited for its Retry-After
+    assert time.monotonic() - started >= 0.5
+    assert len(stub.page_requests) == 5
+
+
+def test_requests_are_spaced_by_the_rate(stub):
+    client = FederalRegisterClient(stub.url)
+    scheduler = FetchScheduler(concurrency=4, rate=20, burst=1)
+    started = time.monotonic()
+    done = dict(scheduler.run({page: (client.fetch_page, (YEAR, None, page)) for page in range(1, 7)}))
+    assert len(done) == 6
+    # One token up front, then one every 50 ms
+    assert time.monotonic() - started >= 0.25
+
+
+def test_cancel_stops_waiting_for_a_token():
+    scheduler = FetchScheduler(rate=0.1, burst=1)
+    scheduler.call(lambda: None)
+    threading.Timer(0.1, scheduler.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(FetchCancelled):
+        scheduler.call(lambda: None)
+    assert time.monotonic() - started < 2
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=50, capacity=5)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.05
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started >= 0.09
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket(rate=1000, capacity=10)
+    bucket.pause(0.2)
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.19
+
+
+def test_token_bucket_cancel():
+    bucket = TokenBucket(rate=1000)
+    bucket.pause(10)
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    assert bucket.acquire(cancel_event=cancel) is False
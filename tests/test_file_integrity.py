@@ -0,0 +1,63 @@
+#  test_file_integrity.py
+
+import os
+import time
+
+from file_integrity import (ORPHAN_GRACE, STALE_PART_AGE, cleanup_stale_parts, looks_like_complete_pdf,
+                            part_meta_path, part_path)
+
+
+def partial(directory, name, age, meta=True):
+    """A .part file (and its .part.json) last written age seconds ago; returns the final path."""
+    path = directory / name
+    files = [part_path(path), part_meta_path(path)] if meta else [part_path(path)]
+    for file in files:
+        file.write_bytes(b"{}")
+        mtime = time.time() - age
+        os.utime(file, (mtime, mtime))
+    return path
+
+
+def test_recent_partial_downloads_are_kept(tmp_path):
+    path = partial(tmp_path, "recent.pdf", age=60)
+    assert cleanup_stale_parts(tmp_path) == 0
+    assert part_path(path).exists()
+    assert part_meta_path(path).exists()
+
+
+def test_abandoned_partial_downloads_are_removed(tmp_path):
+    path = partial(tmp_path, "abandoned.pdf", age=STALE_PART_AGE + 60)
+    (tmp_path / "kept.pdf").write_bytes(b"%PDF-1.4\n%%EOF\n")
+    assert cleanup_stale_parts(tmp_path) == 2
+    assert not part_path(path).exists()
+    assert not part_meta_path(path).exists()
+    assert (tmp_path / "kept.pdf").exists()
+
+
+def test_a_pair_is_as_old_as_its_newest_file(tmp_path):
+    path = partial(tmp_path, "resumed.pdf", age=STALE_PART_AGE + 60)
+    # Appended to by a recent attempt
+    os.utime(part_path(path))
+    assert cleanup_stale_parts(tmp_path) == 0
+
+
+def test_orphans_are_removed_after_the_grace_period(tmp_path):
+    starting = partial(tmp_path, "starting.pdf", age=60, meta=False)
+    orphan = partial(tmp_path, "orphan.pdf", age=ORPHAN_GRACE + 60, meta=False)
+    assert cleanup_stale_parts(tmp_path) == 1
+    assert part_path(starting).exists()
+    assert not part_path(orphan).exists()
+
+
+def test_a_missing_directory_is_not_an_error(tmp_path):
+    assert cleanup_stale_parts(tmp_path / "missing") == 0
+
+
+def test_complete_pdf_needs_header_and_trailer(tmp_path):
+    path = tmp_path / "order.pdf"
+    path.write_bytes(b"%PDF-1.4\n" + b"x" * 5000 + b"\n%%EOF\n")
+    assert looks_like_complete_pdf(path)
+    path.write_bytes(b"%PDF-1.4\n" + b"x" * 5000)
+    assert not looks_like_complete_pdf(path)
+    path.write_bytes(b"<html>error</html>\n%%EOF\n")
+    assert not looks_like_complete_pdf(path)
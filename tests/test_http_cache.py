@@ -0,0 +1,58 @@
+#  test_http_cache.py
+
+import pytest
+
+import metrics
+from conftest import YEAR
+from federal_register import FederalRegisterClient
+from http_cache import HttpCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(tmp_path / "cache.sqlite3")
+    yield cache
+    cache.close()
+
+
+def counter(name):
+    return metrics.METRICS.counter(name)
+
+
+def test_fresh_cache_answers_without_a_request(stub, cache):
+    client = FederalRegisterClient(stub.url, cache=cache, ttl=60)
+    first = client.fetch_page(YEAR)
+    assert client.fetch_page(YEAR) == first
+    assert client.cached_page(YEAR) == first
+    assert len(stub.page_requests) == 1
+
+
+def test_stale_page_is_revalidated_with_etag(stub, cache):
+    client = FederalRegisterClient(stub.url, cache=cache, ttl=0)
+    first = client.fetch_page(YEAR)
+    not_modified = counter("api_not_modified_total")
+    assert client.fetch_page(YEAR) == first
+    revalidation = stub.page_requests[1]
+    assert revalidation["If-None-Match"] == cache.get(client.page_url(YEAR)).etag
+    assert revalidation["If-Modified-Since"] == stub.last_modified
+    assert counter("api_not_modified_total") == not_modified + 1
+
+
+def test_stale_page_is_revalidated_with_last_modified(last_modified_stub, cache):
+    client = FederalRegisterClient(last_modified_stub.url, cache=cache, ttl=0)
+    first = client.fetch_page(YEAR)
+    not_modified = counter("api_not_modified_total")
+    assert client.fetch_page(YEAR) == first
+    revalidation = last_modified_stub.page_requests[1]
+    assert "If-None-Match" not in revalidation
+    assert revalidation["If-Modified-Since"] == last_modified_stub.last_modified
+    assert counter("api_not_modified_total") == not_modified + 1
+
+
+def test_revalidated_page_is_fresh_again(stub, cache):
+    client = FederalRegisterClient(stub.url, cache=cache, ttl=0)
+    client.fetch_page(YEAR)
+    client.ttl = 60
+    client.fetch_page(YEAR)     # 304, extended by the new ttl
+    client.fetch_page(YEAR)
+    assert len(stub.page_requests) == 2
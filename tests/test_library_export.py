@@ -0,0 +1,95 @@
+#  test_library_export.py
+
+import gzip
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+import library_records
+from conftest import documents
+from library_export import LibraryExporter, last_export
+from library_store import LibraryStore
+
+ORDERS = documents(5)
+DOC_ID, OTHER_DOC_ID = list(ORDERS)[:2]
+PDF = b"%PDF-1.4\n" + b"x" * 100 + b"\n%%EOF\n"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LibraryStore(tmp_path / "library.sqlite3")
+    store.save(documents=ORDERS)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def exporter(store, tmp_path):
+    return LibraryExporter(store, tmp_path)
+
+
+def read_jsonl(path):
+    opener = gzip.open if path.name.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_full_export_writes_every_record(exporter, store, tmp_path):
+    path = tmp_path / "orders.jsonl.gz"
+    result = exporter.export(path)
+    records = read_jsonl(path)
+    assert [record["doc_id"] for record in records] == sorted(ORDERS)
+    assert records[0]["title"] == ORDERS[records[0]["doc_id"]]["title"]
+    assert records[0]["file_name"] == f"{records[0]['doc_id']}.pdf"
+    assert (result.records, result.revision, result.since_revision) == (5, 1, None)
+    assert last_export(store)["revision"] == 1
+    assert not (tmp_path / "orders.jsonl.part.gz").exists()
+
+
+def test_since_last_exports_only_rows_changed_after_the_last_export(exporter, store, tmp_path):
+    exporter.export(tmp_path / "full.jsonl")
+    store.save(documents={DOC_ID: dict(ORDERS[DOC_ID], title="Refreshed")})
+    store.save(documents={OTHER_DOC_ID: dict(ORDERS[OTHER_DOC_ID], downloaded=True)},
+               fields=library_records.FILE_STATE_FIELDS)
+    path = tmp_path / "changes.jsonl"
+    result = exporter.export(path, since_last=True)
+    assert (result.since_revision, result.revision) == (1, 3)
+    records = {record["doc_id"]: record for record in read_jsonl(path)}
+    assert sorted(records) == sorted([DOC_ID, OTHER_DOC_ID])
+    assert records[DOC_ID]["title"] == "Refreshed"
+    assert records[OTHER_DOC_ID]["downloaded"] is True
+    # Nothing new since
+    assert exporter.export(tmp_path / "none.jsonl", since_last=True).records == 0
+
+
+def test_a_cancelled_export_leaves_no_file_and_keeps_the_cursor(exporter, store, tmp_path):
+    exporter.export(tmp_path / "full.jsonl")
+    store.save(documents={DOC_ID: dict(ORDERS[DOC_ID], title="Refreshed")})
+    exporter.cancel()
+    path = tmp_path / "changes.jsonl"
+    assert exporter.export(path, since_last=True).cancelled
+    assert not path.exists()
+    assert not (tmp_path / "changes.part.jsonl").exists()
+    assert last_export(store)["revision"] == 1
+
+
+def read_archive(path):
+    """{name: bytes} of a zip, tar or gzipped tar file."""
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            return {name: archive.read(name) for name in archive.namelist()}
+    with tarfile.open(path, "r:gz" if path.name.endswith(".gz") else "r:") as archive:
+        return {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+
+
+@pytest.mark.parametrize("archive_name", ["pdfs.zip", "pdfs.tar", "pdfs.tar.gz"])
+def test_archive_holds_the_downloaded_pdfs(exporter, store, tmp_path, archive_name):
+    store.save(documents={doc_id: dict(ORDERS[doc_id], downloaded=True) for doc_id in (DOC_ID, OTHER_DOC_ID)},
+               fields=library_records.FILE_STATE_FIELDS)
+    (tmp_path / f"{DOC_ID}.pdf").write_bytes(PDF)
+    # OTHER_DOC_ID is marked downloaded but its file is gone
+    result = exporter.export(tmp_path / "orders.jsonl", tmp_path / archive_name)
+    assert (result.files, result.missing, result.bytes) == (1, 1, len(PDF))
+    assert read_archive(tmp_path / archive_name) == {f"pdfs/{DOC_ID}.pdf": PDF}
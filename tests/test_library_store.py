@@ -0,0 +1,184 @@
+#  test_library_store.py
+
+import threading
+import time
+
+import pytest
+
+import library_records
+from conftest import documents
+from library_store import LibraryStore
+
+ORDERS = documents(10)
+DOC_ID, OTHER_DOC_ID = list(ORDERS)[:2]
+FILE_STATE = {"downloaded": True, "file_size": 1234, "sha256": "ab" * 32}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "library.sqlite3"
+
+
+@pytest.fixture
+def stores(path):
+    """Two stores on one library file, as the GUI and crlibrary-cli, both current to the same 10 orders."""
+    LibraryStore(path).save(documents=ORDERS)
+    gui, cli = LibraryStore(path), LibraryStore(path)
+    gui.load_documents()
+    cli.load_documents()
+    yield gui, cli
+    gui.close()
+    cli.close()
+
+
+def stored(store, doc_id):
+    return dict(store.read_documents("SELECT doc_id, downloaded, data FROM documents WHERE doc_id=?",
+                                     (doc_id,))[0][doc_id])
+
+
+def revisions(store):
+    return dict(store.read("SELECT doc_id, revision FROM documents"))
+
+
+def test_saved_documents_load_back(path):
+    store = LibraryStore(path)
+    orders = documents(3)
+    store.save(documents=orders)
+    loaded = store.load_documents()
+    assert sorted(loaded) == sorted(orders)
+    for doc_id, details in orders.items():
+        assert dict(loaded[doc_id]) == {**details, "downloaded": False, "file_name": f"{doc_id}.pdf"}
+    store.close()
+
+
+def test_each_save_stamps_its_rows_with_the_next_revision(path):
+    store = LibraryStore(path)
+    orders = documents(3)
+    first, second, third = orders
+    store.save(documents=orders)
+    assert store.revision() == 1
+    store.save(documents={second: dict(orders[second], title="Renamed")})
+    store.save(documents={third: dict(orders[third], **FILE_STATE)})
+    assert store.revision() == 3
+    assert revisions(store) == {first: 1, second: 2, third: 3}
+    # Meta alone does not touch the documents
+    store.set_meta("key", "value")
+    assert store.revision() == 3
+    store.close()
+
+
+def test_fields_write_only_the_download_state_over_another_process_change(stores):
+    gui, cli = stores
+    cli.save(documents={DOC_ID: dict(ORDERS[DOC_ID], title="Refreshed")},
+             preserve=library_records.FILE_STATE_FIELDS)
+    # The GUI's copy still has the old title
+    gui.save(documents={DOC_ID: dict(ORDERS[DOC_ID], **FILE_STATE)},
+             fields=library_records.FILE_STATE_FIELDS)
+    row = stored(gui, DOC_ID)
+    assert row["title"] == "Refreshed"
+    assert row["downloaded"] is True
+    assert row["sha256"] == FILE_STATE["sha256"]
+
+
+def test_preserve_keeps_the_download_state_another_process_saved(stores):
+    gui, cli = stores
+    gui.save(documents={DOC_ID: dict(ORDERS[DOC_ID], **FILE_STATE)},
+             fields=library_records.FILE_STATE_FIELDS)
+    # The sync's copy does not know about the download
+    cli.save(documents={DOC_ID: dict(ORDERS[DOC_ID], title="Refreshed", downloaded=False)},
+             preserve=library_records.FILE_STATE_FIELDS)
+    row = stored(cli, DOC_ID)
+    assert row["title"] == "Refreshed"
+    assert row["downloaded"] is True
+    assert row["file_size"] == FILE_STATE["file_size"]
+
+
+def test_a_write_without_fields_replaces_the_record(stores):
+    gui, cli = stores
+    gui.save(documents={DOC_ID: dict(ORDERS[DOC_ID], **FILE_STATE)},
+             fields=library_records.FILE_STATE_FIELDS)
+    cli.save(documents={DOC_ID: dict(ORDERS[DOC_ID], title="Whole")})
+    row = stored(cli, DOC_ID)
+    assert row["title"] == "Whole"
+    assert row["downloaded"] is False
+    assert "sha256" not in row
+
+
+def test_unchanged_rows_are_not_merged(stores):
+    gui, cli = stores
+    cli.save(documents={DOC_ID: dict(ORDERS[DOC_ID], title="Refreshed")},
+             preserve=library_records.FILE_STATE_FIELDS)
+    gui.save(documents={OTHER_DOC_ID: dict(ORDERS[OTHER_DOC_ID], title="Mine", **FILE_STATE)},
+             fields=library_records.FILE_STATE_FIELDS)
+    # Only rows changed elsewhere are merged: the GUI's own record is written as given
+    assert stored(gui, OTHER_DOC_ID)["title"] == "Mine"
+    assert not gui.merged_unread
+
+
+def test_meta_items_update_single_entries(stores):
+    gui, cli = stores
+    gui.save(meta={"sync_state": {"2020": {"closed": True}}})
+    cli.save(meta_items={"sync_state": {"2021": {"next_page": 2}}})
+    gui.save(meta_items={"sync_state": {"2022": {"next_page": 3}}})
+    assert gui.get_meta("sync_state") == {"2020": {"closed": True}, "2021": {"next_page": 2},
+                                          "2022": {"next_page": 3}}
+
+
+def test_change_feed_returns_only_rows_written_elsewhere(stores):
+    gui, cli = stores
+    assert gui.changes() == ({}, None)
+    cli.save(documents={DOC_ID: dict(ORDERS[DOC_ID], title="Refreshed")},
+             preserve=library_records.FILE_STATE_FIELDS)
+    changed, revision = gui.changes()
+    assert list(changed) == [DOC_ID]
+    assert changed[DOC_ID]["title"] == "Refreshed"
+    assert revision == cli.revision()
+    gui.synced(revision)
+    assert gui.changes() == ({}, None)
+    # Nothing more to read, not even the rows read before
+    gui.synced(None)
+    cli.save(meta={"key": "value"})
+    assert gui.changes()[0] == {}
+
+
+def test_change_feed_returns_merged_rows_once(stores):
+    gui, cli = stores
+    cli.save(documents={DOC_ID: dict(ORDERS[DOC_ID], title="Refreshed")},
+             preserve=library_records.FILE_STATE_FIELDS)
+    gui.save(documents={DOC_ID: dict(ORDERS[DOC_ID], **FILE_STATE)}, fields=library_records.FILE_STATE_FIELDS)
+    assert gui.merged_unread
+    changed, revision = gui.changes()
+    assert changed[DOC_ID]["title"] == "Refreshed"
+    assert changed[DOC_ID]["downloaded"] is True
+    gui.synced(revision)
+    assert gui.changes() == ({}, None)
+
+
+def test_has_changes_sees_other_connections_commits(stores):
+    gui, cli = stores
+    assert not gui.has_changes()
+    cli.save(documents={DOC_ID: dict(ORDERS[DOC_ID], title="Refreshed")})
+    assert gui.has_changes()
+    gui.synced(gui.changes()[1])
+    assert not gui.has_changes()
+
+
+def test_reads_do_not_wait_for_a_save_in_progress(stores):
+    gui, cli = stores
+    saving, done = threading.Event(), threading.Event()
+
+    def long_save():
+        # Holds the store's writer lock and transaction, as a save waiting on another process would
+        with gui.lock, gui.transaction():
+            saving.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=long_save)
+    thread.start()
+    saving.wait(5)
+    started = time.monotonic()
+    assert not gui.has_changes()
+    assert gui.get_meta("key", "default") == "default"
+    assert time.monotonic() - started < 1
+    done.set()
+    thread.join()
@@ -0,0 +1,99 @@
+#  test_library_sync.py
+
+import time
+
+import pytest
+
+pytest.importorskip("WrapCapExecOrders")
+from WrapCapExecOrders import ExecutiveOrderManager
+
+import library_records
+from conftest import YEAR, documents
+from federal_register import FederalRegisterClient, PER_PAGE
+from fetch_scheduler import FetchScheduler, FetchCancelled
+from library_store import LibraryStore
+from library_sync import LibrarySync, SYNC_STATE_KEY
+from stub_server import StubServer
+
+ORDERS = 2 * PER_PAGE + PER_PAGE // 2    # three pages
+
+
+class PagedClient(FederalRegisterClient):
+    """Answers page n delays[n] seconds late and records the pages asked for."""
+
+    def __init__(self, base_url, delays=None):
+        super().__init__(base_url)
+        self.delays = delays or {}
+        self.pages = []
+
+    def fetch_page(self, year, since=None, page=1):
+        self.pages.append(page)
+        time.sleep(self.delays.get(page, 0))
+        return super().fetch_page(year, since, page)
+
+
+@pytest.fixture(scope="module")
+def paged_stub():
+    with StubServer(documents(ORDERS)) as server:
+        yield server
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LibraryStore(tmp_path / "library.sqlite3")
+    yield store
+    store.close()
+
+
+def in_progress(store):
+    return store.get_meta(SYNC_STATE_KEY, {}).get(str(YEAR), {}).get("in_progress")
+
+
+def test_pages_finishing_out_of_order_are_merged_in_order(paged_stub, store):
+    # Page 3 arrives before page 2
+    client = PagedClient(paged_stub.url, delays={2: 0.3})
+    manager = ExecutiveOrderManager()
+    checkpoints = []
+
+    def on_progress(year, page, total_pages):
+        checkpoints.append((page, total_pages, in_progress(store), len(manager.executive_orders)))
+
+    sync = LibrarySync(manager, client, store, scheduler=FetchScheduler(concurrency=4, rate=100))
+    result = sync.sync_year(YEAR, on_progress=on_progress)
+
+    assert result.added == ORDERS
+    assert sorted(client.pages) == [1, 2, 3]
+    assert checkpoints == [
+        (1, 3, {"since": None, "next_page": 2}, PER_PAGE),
+        (2, 3, {"since": None, "next_page": 3}, 2 * PER_PAGE),
+        (3, 3, None, ORDERS),
+    ]
+    expected = [result["document_number"] for result in paged_stub.by_year[YEAR]]
+    assert list(manager.executive_orders) == expected
+    assert list(store.load_documents()) == expected
+
+
+def test_cancelled_sync_resumes_at_the_next_page(paged_stub, store):
+    manager = ExecutiveOrderManager()
+    # One request every half second, so page 3 is still waiting for its turn when page 2 is merged
+    scheduler = FetchScheduler(concurrency=1, rate=2, burst=1)
+
+    def cancel_after_page_2(year, page, total_pages):
+        if page == 2:
+            scheduler.cancel()
+
+    sync = LibrarySync(manager, PagedClient(paged_stub.url), store, scheduler=scheduler)
+    with pytest.raises(FetchCancelled):
+        sync.sync_year(YEAR, on_progress=cancel_after_page_2)
+    assert in_progress(store) == {"since": None, "next_page": 3}
+    assert store.count() == 2 * PER_PAGE
+
+    # A later run, e.g. after a restart, asks only for the missing page
+    manager = ExecutiveOrderManager()
+    library_records.set_documents(manager, store.load_documents())
+    client = PagedClient(paged_stub.url)
+    result = LibrarySync(manager, client, store, scheduler=FetchScheduler(rate=100)).sync_year(YEAR)
+    assert client.pages == [3]
+    assert result.added == ORDERS - 2 * PER_PAGE
+    assert in_progress(store) is None
+    assert len(manager.executive_orders) == store.count() == ORDERS
@@ -0,0 +1,70 @@
+#  test_title_filter.py
+
+import pytest
+
+from title_filter import IncrementalFilter
+
+TITLES = {
+    "a": "Climate Crisis at Home and Abroad",
+    "b": "Climate-Related Financial Risk",
+    "c": "Tackling the Climate Crisis",
+    "d": "Promoting Competition",
+}
+
+
+class CountingKeys(dict):
+    """{doc_id: key} that counts the titles looked at."""
+    lookups = 0
+
+    def __getitem__(self, doc_id):
+        self.lookups += 1
+        return super().__getitem__(doc_id)
+
+
+@pytest.fixture
+def title_filter():
+    title_filter = IncrementalFilter()
+    title_filter.set_titles(TITLES)
+    return title_filter
+
+
+def test_match_is_case_insensitive(title_filter):
+    assert title_filter.match("CLIMATE") == {"a", "b", "c"}
+    assert title_filter.match("competition") == {"d"}
+
+
+def test_empty_query_matches_everything(title_filter):
+    assert title_filter.match("climate") == {"a", "b", "c"}
+    assert title_filter.match("") is None
+
+
+def test_a_longer_query_rescans_only_the_previous_matches():
+    title_filter = IncrementalFilter()
+    keys = CountingKeys({doc_id: title.lower() for doc_id, title in TITLES.items()})
+    title_filter.set_keys(keys)
+    assert title_filter.match("c") == {"a", "b", "c", "d"}
+    keys.lookups = 0
+    assert title_filter.match("cl") == {"a", "b", "c"}
+    assert keys.lookups == 4
+    keys.lookups = 0
+    assert title_filter.match("climate cr") == {"a", "c"}
+    assert keys.lookups == 3
+    keys.lookups = 0
+    assert title_filter.match("climate crisis at") == {"a"}
+    assert keys.lookups == 2
+
+
+def test_a_shorter_or_different_query_scans_every_title(title_filter):
+    assert title_filter.match("climate crisis") == {"a", "c"}
+    # Backspace: the previous matches are not enough
+    assert title_filter.match("climate") == {"a", "b", "c"}
+    assert title_filter.match("risk") == {"b"}
+    assert title_filter.match("promoting") == {"d"}
+
+
+def test_updated_and_removed_titles_are_used_at_once(title_filter):
+    assert title_filter.match("climate") == {"a", "b", "c"}
+    title_filter.update("d", "Climate Competition")
+    assert title_filter.match("climate c") == {"a", "c", "d"}
+    title_filter.remove("a")
+    assert title_filter.match("climate cr") == {"c"}